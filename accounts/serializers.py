@@ -48,4 +48,11 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 
                  'is_active', 'date_joined', 'profile', 'addresses')
-        read_only_fields = ('id', 'date_joined', 'is_active')
\ No newline at end of file
+        read_only_fields = ('id', 'date_joined', 'is_active')
+
+class PublicUserSerializer(serializers.ModelSerializer):
+    """Minimal author details that are safe to show on public content."""
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+        read_only_fields = fields
@@ -0,0 +1,20 @@
+"""
+ASGI config for alcom_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with uvicorn workers under gunicorn so the async views can hold many
+concurrent requests per process:
+
+    GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn alcom_project.asgi -c gunicorn.conf.py
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alcom_project.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,79 @@
+"""
+Async counterpart of DRF's APIView for I/O-bound endpoints.
+
+DRF views are synchronous, so under ASGI each request holds a thread for
+as long as it waits on the database or an HTTP API. ``AsyncAPIView`` keeps
+DRF's authentication, permission and parser classes but lets handlers be
+coroutines that await the async ORM and async HTTP clients, so a single
+process can hold many slow requests at once. The DRF classes themselves are
+synchronous and run in a thread before the handler.
+
+Handlers return ``self.respond(data, status)``; API exceptions raised by
+the handler or the checks become JSON error responses as in DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class AsyncAPIView(View):
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Session authentication enforces CSRF itself, as in APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def initialize_request(self, request):
+        return Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+
+    def check_permissions(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def initial(self, request):
+        request.user
+        self.check_permissions(request)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = request = self.initialize_request(request)
+        try:
+            await sync_to_async(self.initial)(request)
+            method = request.method.lower()
+            handler = getattr(self, method, None) if method in self.http_method_names else None
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(request, *args, **kwargs)
+        except Http404:
+            return self.respond({'detail': 'No matching object found.'}, status.HTTP_404_NOT_FOUND)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticate_header = self.request.authenticators[0].authenticate_header(self.request) \
+                if self.request.authenticators else None
+            if authenticate_header:
+                response = self.respond({'detail': exc.detail}, status.HTTP_401_UNAUTHORIZED)
+                response['WWW-Authenticate'] = authenticate_header
+                return response
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return self.respond(detail, exc.status_code)
+
+    def respond(self, data, status=status.HTTP_200_OK):
+        return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
@@ -0,0 +1,97 @@
+"""
+Helpers for streaming large exports without building them in memory.
+
+Rows come from ``values_list(...).iterator()`` querysets, so no model
+instances are created, and output is produced in chunks that can be written
+to a file or passed to ``StreamingHttpResponse``.
+"""
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows, chunk_size=CHUNK_SIZE):
+    """Yields UTF-8 encoded CSV text for `header` and `rows` in ~chunk_size pieces."""
+    writer = csv.writer(_Echo())
+    buffer = [writer.writerow(header)]
+    size = len(buffer[0])
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_ndjson(header, rows, chunk_size=CHUNK_SIZE):
+    """Yields UTF-8 encoded NDJSON, one object per row keyed by `header`."""
+    encoder = DjangoJSONEncoder()
+    buffer, size = [], 0
+    for row in rows:
+        line = encoder.encode(dict(zip(header, row))) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+# format -> (chunk iterator, content type, file extension)
+STREAM_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def gzip_stream(chunks, level=6):
+    """Compresses an iterable of byte chunks into a gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def write_chunks(path, chunks):
+    """Writes byte chunks to `path` and returns the number of bytes written."""
+    written = 0
+    with open(path, 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def streaming_export_response(header, rows, basename, output='csv', compress=True):
+    """
+    Returns a StreamingHttpResponse that sends `rows` as `output` (csv or
+    ndjson), gzipped unless `compress` is false.
+    """
+    iterate, content_type, extension = STREAM_FORMATS[output]
+    chunks = iterate(header, rows)
+    filename = f'{basename}.{extension}'
+    if compress:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
@@ -0,0 +1,203 @@
+"""
+Background generation of resized image variants for uploaded images.
+
+Models with an ``image`` field, a ``content_hash`` and a ``variants`` JSON
+field (ProductImage, ReviewImage) are processed after upload by jobs on the
+``images`` queue (see products/tasks.py): the original is hashed, and
+WebP/JPEG copies are written for each width in ``IMAGE_VARIANT_WIDTHS``
+under a path derived from the hash, so identical uploads share one set of
+files. ``variants`` then maps format -> width -> storage name, which
+serializers turn into URLs without touching the filesystem.
+
+Set ``IMAGE_PIPELINE_WORKERS`` to 0 to process inline (used by tests).
+"""
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# format -> (Pillow format, file extension, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Formats accepted for uploads, with the extension they are stored under.
+UPLOAD_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+def file_hash(file):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def validate_image(file):
+    """
+    Fully decodes an uploaded image and returns its Pillow format, raising
+    ValidationError if it is not a complete image in an accepted format.
+    """
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            if image_format not in UPLOAD_FORMATS:
+                raise ValidationError(f'Unsupported image format: {image_format}.')
+            image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError('Upload a valid image. The file is not an image or is corrupted.')
+    finally:
+        file.seek(0)
+    return image_format
+
+
+def store_uploads(files, field, workers):
+    """
+    Validates and saves uploaded files for the image `field` on a bounded
+    thread pool (Pillow releases the GIL while decoding). Returns one
+    (name, errors) pair per file, in order, with name None if it was rejected.
+    """
+    def store(file):
+        try:
+            image_format = validate_image(file)
+        except ValidationError as exc:
+            return None, exc.messages
+        filename = os.path.splitext(os.path.basename(file.name))[0] + UPLOAD_FORMATS[image_format]
+        name = field.generate_filename(None, filename)
+        return field.storage.save(name, file, max_length=field.max_length), None
+
+    if not files:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files))), thread_name_prefix='image-upload') as pool:
+        return list(pool.map(store, files))
+
+
+def variant_formats():
+    return [name for name in settings.IMAGE_VARIANT_FORMATS if name != 'webp' or features.check('webp')]
+
+
+def variant_name(content_hash, width, extension):
+    return f'image_variants/{content_hash[:2]}/{content_hash}/{width}.{extension}'
+
+
+def build_variants(file, content_hash, storage=default_storage):
+    """
+    Writes resized copies of the image in `file` and returns the variants
+    dict. Widths larger than the original are skipped, except that an image
+    narrower than every configured width still gets one variant at its own
+    width. Files that already exist in storage are not rewritten.
+    """
+    file.seek(0)
+    with Image.open(file) as original:
+        original = ImageOps.exif_transpose(original)
+        width, height = original.size
+        widths = sorted({w for w in settings.IMAGE_VARIANT_WIDTHS if w < width}) or [width]
+        variants = {'width': width, 'height': height}
+        for name in variant_formats():
+            pillow_format, extension, options = VARIANT_FORMATS[name]
+            variants[name] = {}
+            for target in widths:
+                path = variant_name(content_hash, target, extension)
+                if not storage.exists(path):
+                    resized = original.copy()
+                    resized.thumbnail((target, height), Image.LANCZOS)
+                    if pillow_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                        resized = _flatten(resized)
+                    elif resized.mode not in ('RGB', 'RGBA', 'L'):
+                        resized = resized.convert('RGBA')
+                    buffer = io.BytesIO()
+                    resized.save(buffer, pillow_format, **options)
+                    path = storage.save(path, ContentFile(buffer.getvalue()))
+                variants[name][str(target)] = path
+    return variants
+
+
+def _flatten(image):
+    """Composites transparent images onto white for formats without alpha."""
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def process_image(model, pk):
+    """
+    Hashes the image of `model` row `pk` and fills its content_hash and
+    variants, reusing the variants of any image with the same content.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.image:
+        return
+    with instance.image.open('rb') as file:
+        content_hash = file_hash(file)
+        if content_hash == instance.content_hash and instance.variants:
+            return
+        variants = find_variants(content_hash) or build_variants(file, content_hash)
+    model.objects.filter(pk=pk).update(content_hash=content_hash, variants=variants)
+
+
+def find_variants(content_hash):
+    """Returns the variants already generated for `content_hash`, if any."""
+    for model in image_models():
+        variants = model.objects.filter(content_hash=content_hash).exclude(
+            variants={}
+        ).values_list('variants', flat=True).first()
+        if variants:
+            return variants
+    return None
+
+
+def image_models():
+    from products.models import ProductImage
+    from reviews.models import ReviewImage
+    return (ProductImage, ReviewImage)
+
+
+def _process_logged(model, pk):
+    try:
+        process_image(model, pk)
+    except Exception:
+        logger.exception("Could not process %s %s", model._meta.label, pk)
+
+
+def schedule(model, pks):
+    """
+    Queues one processing job per row in the current transaction, or
+    processes the rows inline once it commits when IMAGE_PIPELINE_WORKERS
+    is 0.
+    """
+    pks = list(pks)
+    if settings.IMAGE_PIPELINE_WORKERS:
+        from products.tasks import process_image_variants
+        process_image_variants.defer_many([(model._meta.label, pk) for pk in pks])
+        return
+
+    def process():
+        for pk in pks:
+            _process_logged(model, pk)
+
+    transaction.on_commit(process)
+
+
+def srcset(variants, storage=default_storage):
+    """Turns a variants dict into {format: {width: url}} without filesystem access."""
+    return {
+        name: {width: storage.url(path) for width, path in variants.get(name, {}).items()}
+        for name in VARIANT_FORMATS
+        if variants.get(name)
+    }
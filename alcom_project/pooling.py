@@ -0,0 +1,76 @@
+"""
+Database connection pooling for gunicorn workers.
+
+With ``DATABASE_POOL`` enabled, every PostgreSQL alias uses Django's
+psycopg 3 connection pool instead of persistent connections. Each gunicorn
+worker process gets its own pool: ``GUNICORN_THREADS`` connections are kept
+open, one per request thread, and up to ``DATABASE_POOL_OVERFLOW`` extra
+connections are opened under bursts (e.g. image pipeline threads) and
+closed again after ``DATABASE_POOL_MAX_IDLE`` seconds. The database must
+therefore allow ``WEB_CONCURRENCY * (GUNICORN_THREADS + DATABASE_POOL_OVERFLOW)``
+connections per alias.
+
+``pool_stats()`` reports the pools of the current process for tuning; admins
+can read it at ``/api/system/database-pool/``.
+"""
+from django.db import connections
+
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+
+
+def pool_options(threads, overflow, timeout, max_idle):
+    """Returns psycopg pool options for a worker serving `threads` requests at once."""
+    return {
+        'min_size': threads,
+        'max_size': threads + overflow,
+        'timeout': timeout,
+        'max_idle': max_idle,
+    }
+
+
+def configure_pools(databases, **options):
+    """
+    Enables pooling on every PostgreSQL entry of `databases`. Pooled
+    connections are returned after each request, so persistent connections
+    and per-request health checks are turned off.
+    """
+    for alias, database in databases.items():
+        if database.get('ENGINE') != POSTGRESQL_ENGINE:
+            continue
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = False
+        database.setdefault('OPTIONS', {})['pool'] = {**pool_options(**options), 'name': f'alcom-{alias}'}
+
+
+def summarize(stats):
+    """Turns psycopg_pool get_stats() output into the figures used for tuning."""
+    size = stats.get('pool_size', 0)
+    available = stats.get('pool_available', 0)
+    queued = stats.get('requests_queued', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'size': size,
+        'in_use': size - available,
+        'available': available,
+        'overflow': max(0, size - stats.get('pool_min', 0)),
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': stats.get('requests_num', 0),
+        'queued_requests': queued,
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': round(wait_ms / queued, 2) if queued else 0,
+        'timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def pool_stats():
+    """Returns alias -> summarized stats for every pooled database in this process."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = summarize(pool.get_stats())
+    return stats
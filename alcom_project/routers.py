@@ -0,0 +1,134 @@
+"""
+Read replica routing for catalog, review and analytics reads.
+
+When ``DATABASE_REPLICA_URL`` is set, ``ReplicaRouter`` sends reads of the
+apps in ``REPLICA_APPS`` to the ``replica`` alias during safe (GET, HEAD,
+OPTIONS) requests. Everything else -- writes, reads outside a request,
+reads of other apps and reads after the request has written -- uses
+``default``.
+
+A request that writes to a replicated app sets a short-lived cookie, and
+``ReplicaRoutingMiddleware`` keeps that client's reads on the primary until
+it expires (``DATABASE_REPLICA_PIN_SECONDS``), so users see their own
+changes before replication catches up.
+
+Locally, point ``DATABASE_URL`` and ``DATABASE_REPLICA_URL`` at two SQLite
+files and refresh the replica by copying the primary file.
+"""
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# App labels whose reads may be served by the replica.
+REPLICA_APPS = frozenset({'products', 'reviews', 'analytics'})
+
+# Writes to these apps pin the client to the primary. Analytics events are
+# written on almost every page and never read back by the client sending them.
+PINNING_APPS = REPLICA_APPS - {'analytics'}
+
+PIN_COOKIE = 'db_primary_until'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool = False
+    wrote: bool = False
+    pin: bool = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_enabled():
+    return settings.DATABASE_REPLICA is not None
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = _state.get()
+        if (
+            state is not None and state.use_replica and not state.wrote
+            and replica_enabled() and model._meta.app_label in REPLICA_APPS
+        ):
+            return settings.DATABASE_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            if model._meta.app_label in PINNING_APPS:
+                state.pin = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, settings.DATABASE_REPLICA}
+        if replica_enabled() and obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if replica_enabled() and db == settings.DATABASE_REPLICA:
+            return False
+        return None
+
+
+def is_pinned(request):
+    try:
+        return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Marks safe requests from unpinned clients as eligible for replica reads
+    and pins clients to the primary after they write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        state = RoutingState(use_replica=request.method in SAFE_METHODS and not is_pinned(request))
+        return state, _state.set(state)
+
+    def finish(self, state, response):
+        if state.pin and replica_enabled():
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,113 @@
+"""
+Content-addressed storage for uploaded media.
+
+``ContentAddressedStorage`` names every saved file after the SHA-256 of its
+contents (``blobs/ab/cd/<hash>.<ext>``), so an image uploaded to several
+products or reviews is stored once and every row points at the same blob.
+The upload_to directory is ignored. Blobs are only removed by
+``manage.py collect_media_garbage``, once no ProductImage or ReviewImage
+references them any more.
+"""
+import hashlib
+import os
+import uuid
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(content_hash, extension):
+    return f'{BLOB_DIR}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}'
+
+
+def content_hash(content):
+    """Returns the SHA-256 hex digest of a File, read in chunks."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        extension = os.path.splitext(name)[1].lower()
+        name = blob_name(content_hash(content), extension)
+        if self.exists(name):
+            # The row referencing the blob may not be committed yet; renewing
+            # the modified time keeps collect_media_garbage's grace period
+            # from removing it in the meantime.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content, so an existing file with the
+        # same name already holds the same bytes.
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name and rename into place, so two
+        # concurrent uploads of the same content cannot clash.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def delete(self, name):
+        """
+        Blobs may be shared by several rows, so they are never deleted
+        through a single model field; collect_media_garbage removes them.
+        """
+        if not name.startswith(f'{BLOB_DIR}/'):
+            super().delete(name)
+
+    def purge(self, name):
+        super().delete(name)
+
+    def blobs(self):
+        """Yields (name, modified time) for every stored blob."""
+        for root, _, files in os.walk(self.path(BLOB_DIR)):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                yield name, os.path.getmtime(path)
+
+
+media_storage = ContentAddressedStorage()
+
+
+def reference_counts():
+    """
+    Returns a Counter of stored image name -> number of ProductImage and
+    ReviewImage rows pointing at it, computed with one grouped query per model.
+    """
+    from django.db.models import Count
+    from alcom_project.images import image_models
+
+    counts = Counter()
+    for model in image_models():
+        for name, references in model.objects.exclude(image='').values('image').annotate(
+            references=Count('pk')
+        ).values_list('image', 'references').iterator():
+            counts[name] += references
+    return counts
+
+
+def get_media_storage():
+    """Storage callable for image fields, so migrations do not serialize settings."""
+    return media_storage
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
+from .views import DatabasePoolStatsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -51,6 +52,9 @@ urlpatterns = [
     path('api/payments/', include('payments.urls')),
     path('api/reviews/', include('reviews.urls')),
     path('api/analytics/', include('analytics.urls')),
+
+    # Operations
+    path('api/system/database-pool/', DatabasePoolStatsView.as_view(), name='database-pool'),
     
     # Documentation
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -0,0 +1,21 @@
+"""
+Project-level API views that do not belong to any one app.
+"""
+import os
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .pooling import pool_stats
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Connection pool figures (size, in use, overflow, queued requests and
+    wait time) for the worker process that serves the request.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'pools': pool_stats()})
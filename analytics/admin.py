@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import ProductView, PageView, SalesReport
+from .models import ProductView, PageView, SalesReport, PageViewRollup, ProductViewRollup, ProductTrendingScore, UserBehaviorReport, DashboardCounter
 
 # Register your models here.
 admin.site.register(ProductView)
 admin.site.register(PageView)
 admin.site.register(SalesReport)
+admin.site.register(PageViewRollup)
+admin.site.register(ProductViewRollup)
+admin.site.register(ProductTrendingScore)
+admin.site.register(UserBehaviorReport)
+admin.site.register(DashboardCounter)
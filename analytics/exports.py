@@ -0,0 +1,42 @@
+"""
+Bulk exports of analytics and order data for offline analysis.
+
+Each dataset is read with ``values_list(...).iterator()`` so rows stream
+from a server-side cursor on PostgreSQL without instantiating models.
+"""
+from orders.models import Order, OrderItem
+from .models import PageView, ProductView, day_range
+
+# name -> (model, date field used for the range filter, exported columns)
+EXPORT_DATASETS = {
+    'page_views': (PageView, 'created_at', [
+        'id', 'user_id', 'session_id', 'page_url', 'page_title',
+        'ip_address', 'user_agent', 'created_at',
+    ]),
+    'product_views': (ProductView, 'created_at', [
+        'id', 'product_id', 'user_id', 'session_id', 'view_duration',
+        'ip_address', 'created_at',
+    ]),
+    'orders': (Order, 'created_at', [
+        'id', 'user_id', 'status__name', 'shipping_method_id', 'total_amount',
+        'tracking_number', 'created_at', 'updated_at',
+    ]),
+    'order_items': (OrderItem, 'order__created_at', [
+        'id', 'order_id', 'product_id', 'variant_id', 'quantity',
+        'price_at_purchase', 'price', 'order__created_at',
+    ]),
+}
+
+
+def export_rows(dataset, start_date, end_date, chunk_size=5000):
+    """
+    Returns (columns, rows) for `dataset` between start_date and end_date
+    inclusive, where rows is a lazy iterator of tuples. Rows are unordered so
+    the database can stream them straight off the range scan.
+    """
+    model, date_field, columns = EXPORT_DATASETS[dataset]
+    start, end = day_range(start_date, end_date)
+    rows = model.objects.filter(**{
+        f'{date_field}__gte': start, f'{date_field}__lt': end,
+    }).order_by().values_list(*columns).iterator(chunk_size=chunk_size)
+    return columns, rows
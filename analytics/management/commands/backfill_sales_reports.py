@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.models import SalesReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialize SalesReport rows from orders. With --start/--end the whole "
+        "range is rebuilt in one grouped query; otherwise days that ended since "
+        "the last run are closed and earlier days whose orders changed are "
+        "refreshed, as the scheduled close_sales_reports job does."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to build (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to build (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start or end:
+            if not (start and end):
+                raise CommandError("--start and --end must be given together")
+            if start > end:
+                raise CommandError("--start must not be after --end")
+            reports = SalesReport.objects.materialize(start, end)
+            self.stdout.write(self.style.SUCCESS(f"Built {len(reports)} sales reports."))
+            return
+
+        closed, changed = SalesReport.objects.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {len(closed)} days and refreshed {len(changed)} changed days."
+        ))
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.models import UserBehaviorReport
+
+
+class Command(BaseCommand):
+    help = "Sessionize page/product views into daily UserBehaviorReport rows (defaults to yesterday)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to build (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to build (YYYY-MM-DD)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip")
+
+    def handle(self, *args, **options):
+        yesterday = timezone.now().date() - timedelta(days=1)
+        start = options['start'] or yesterday
+        end = options['end'] or start
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        day = start
+        while day <= end:
+            report = UserBehaviorReport.objects.materialize(day, chunk_size=options['chunk_size'])
+            self.stdout.write(f"{day}: {report.sessions} sessions")
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS("Behavior reports built."))
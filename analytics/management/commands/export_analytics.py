@@ -0,0 +1,47 @@
+import os
+from datetime import date
+from itertools import chain, islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alcom_project.exports import gzip_stream, iter_csv, write_chunks
+from analytics.exports import EXPORT_DATASETS, export_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Export page views, product views, orders and order items for a date "
+        "range to gzipped CSV files, split into parts of --rows-per-file rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day (YYYY-MM-DD), defaults to --start")
+        parser.add_argument('--dataset', action='append', choices=list(EXPORT_DATASETS),
+                            help="Dataset to export; repeat for several (default: all)")
+        parser.add_argument('--output-dir', default='.')
+        parser.add_argument('--rows-per-file', type=int, default=1_000_000)
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or start
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        for dataset in options['dataset'] or EXPORT_DATASETS:
+            columns, rows = export_rows(dataset, start, end)
+            part = 0
+            while True:
+                batch = islice(rows, options['rows_per_file'])
+                first = next(batch, None)
+                if first is None and part:
+                    break
+                part += 1
+                path = os.path.join(options['output_dir'], f"{dataset}_{start}_{end}_part{part:04d}.csv.gz")
+                batch = chain([first], batch) if first is not None else iter(())
+                size = write_chunks(path, gzip_stream(iter_csv(columns, batch)))
+                self.stdout.write(f"Wrote {path} ({size} bytes)")
+                if first is None:
+                    break
+        self.stdout.write(self.style.SUCCESS("Export finished."))
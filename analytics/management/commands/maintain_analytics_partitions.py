@@ -0,0 +1,103 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from alcom_project.exports import gzip_stream, iter_csv, write_chunks
+from analytics.models import PageView, ProductView, PageViewRollup, ProductViewRollup, UserBehaviorReport
+from analytics.partitioning import (
+    add_months, drop_partition, ensure_partitions, is_partitioned, list_partitions, month_bounds, month_start
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly partitions for PageView/ProductView and retire "
+        "months older than the retention period: export them to gzipped CSV, "
+        "then roll them into the rollup tables and drop the partition (or delete "
+        "the month's rows in batches on databases without partitioning) in one "
+        "transaction per table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, default=settings.ANALYTICS_RETENTION_MONTHS)
+        parser.add_argument('--ahead', type=int, default=settings.ANALYTICS_PARTITIONS_AHEAD,
+                            help="Months of partitions to create in advance")
+        parser.add_argument('--archive-dir', default=settings.ANALYTICS_ARCHIVE_DIR)
+        parser.add_argument('--no-export', action='store_true', help="Drop old months without exporting them")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per DELETE when not partitioned")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        current = month_start(timezone.now().date())
+        if not options['dry_run']:
+            for name in ensure_partitions(connection, add_months(current, options['ahead'])):
+                self.stdout.write(f"Ensured partition {name}")
+
+        cutoff = add_months(current, -options['retention_months'])
+        months = sorted({month for model in (PageView, ProductView) for month in self.months_before(model, cutoff)})
+        for month in months:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {month:%Y-%m}")
+                continue
+            self.build_reports(month)
+            for model, rollup_model in ((PageView, PageViewRollup), (ProductView, ProductViewRollup)):
+                # A rerun after a crash finds tables already archived for this
+                # month; rebuilding their rollups from no rows would wipe them.
+                if not model.objects.for_month(month).exists():
+                    continue
+                if not options['no_export']:
+                    self.export(model, month, options['archive_dir'])
+                with transaction.atomic():
+                    rollup_model.objects.rebuild(month, add_months(month, 1) - timedelta(days=1))
+                    self.drop(model, month, options['batch_size'])
+            self.stdout.write(f"Archived {month:%Y-%m}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(months)} month(s) older than {cutoff:%Y-%m}."))
+
+    def months_before(self, model, cutoff):
+        table = model._meta.db_table
+        months = set(month for month in list_partitions(connection, table) if month < cutoff)
+        # Rows can also sit in the DEFAULT partition or in an unpartitioned table.
+        cutoff_start, _ = month_bounds(cutoff)
+        first = model.objects.filter(created_at__lt=cutoff_start).aggregate(first=Min('created_at'))['first']
+        if first is not None:
+            month = month_start(first.date())
+            while month < cutoff:
+                months.add(month)
+                month = add_months(month, 1)
+        return months
+
+    def build_reports(self, month):
+        last_day = add_months(month, 1) - timedelta(days=1)
+        built = set(UserBehaviorReport.objects.filter(
+            report_date__gte=month, report_date__lte=last_day
+        ).values_list('report_date', flat=True))
+        day = month
+        while day <= last_day:
+            if day not in built:
+                UserBehaviorReport.objects.materialize(day)
+            day += timedelta(days=1)
+
+    def export(self, model, month, archive_dir):
+        directory = os.path.join(archive_dir, model._meta.db_table)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{month:%Y-%m}.csv.gz")
+        columns = [field.attname for field in model._meta.concrete_fields]
+        rows = model.objects.for_month(month).order_by().values_list(*columns).iterator(chunk_size=5000)
+        size = write_chunks(path, gzip_stream(iter_csv(columns, rows)))
+        self.stdout.write(f"Exported {model._meta.db_table} {month:%Y-%m} to {path} ({size} bytes)")
+
+    def drop(self, model, month, batch_size):
+        table = model._meta.db_table
+        if is_partitioned(connection, table) and month in list_partitions(connection, table):
+            drop_partition(connection, table, month)
+        rows = model.objects.for_month(month)
+        while True:
+            ids = list(rows.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            model.objects.filter(pk__in=ids).delete()
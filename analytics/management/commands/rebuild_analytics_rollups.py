@@ -0,0 +1,42 @@
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from analytics.models import PageView, ProductView, PageViewRollup, ProductViewRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute hourly and daily page/product view rollups from the raw view tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--days', type=int, default=7, help="Days per rebuild transaction")
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            bounds = [
+                model.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+                for model in (PageView, ProductView)
+            ]
+            firsts = [b['first'] for b in bounds if b['first']]
+            lasts = [b['last'] for b in bounds if b['last']]
+            if not firsts:
+                self.stdout.write("No views to roll up.")
+                return
+            start = start or min(firsts).astimezone(dt_timezone.utc).date()
+            end = end or max(lasts).astimezone(dt_timezone.utc).date()
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        step = timedelta(days=max(options['days'], 1))
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + step - timedelta(days=1), end)
+            PageViewRollup.objects.rebuild(chunk_start, chunk_end)
+            ProductViewRollup.objects.rebuild(chunk_start, chunk_end)
+            self.stdout.write(f"Rebuilt rollups for {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt."))
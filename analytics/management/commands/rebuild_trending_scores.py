@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import ProductTrendingScore
+
+
+class Command(BaseCommand):
+    help = "Recompute time-decayed trending scores for every window from the raw product views."
+
+    def handle(self, *args, **options):
+        ProductTrendingScore.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS("Trending scores rebuilt."))
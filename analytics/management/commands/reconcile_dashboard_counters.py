@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import DashboardCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the dashboard counters from page views, product views and "
+        "orders and correct any drift."
+    )
+
+    def handle(self, *args, **options):
+        drift = DashboardCounter.objects.reconcile()
+        for name, amount in drift.items():
+            self.stdout.write(f"{name}: {amount:+d}")
+        self.stdout.write(self.style.SUCCESS("Dashboard counters reconciled."))
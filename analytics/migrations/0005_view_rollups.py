@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_productview_ip_address'),
+        ('products', '0002_product_stock'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='salesreport',
+            options={'ordering': ['-report_date']},
+        ),
+        migrations.CreateModel(
+            name='PageViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_url', models.CharField(max_length=255)),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='analytics_p_period_0f2a74_idx')],
+                'unique_together': {('page_url', 'period', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_sessions', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='analytics_p_period_270f1e_idx')],
+                'unique_together': {('product', 'period', 'bucket')},
+            },
+        ),
+    ]
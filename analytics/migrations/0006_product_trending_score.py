@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_view_rollups'),
+        ('products', '0002_product_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('1h', '1h'), ('24h', '24h'), ('7d', '7d')], max_length=4)),
+                ('log_score', models.FloatField(help_text='Natural log of the forward-decayed score')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', '-log_score'], name='analytics_p_window_ca3a7e_idx')],
+                'unique_together': {('product', 'window')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_product_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesreport',
+            name='generated_at',
+            field=models.DateTimeField(blank=True, help_text='When the report was last computed from orders', null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_salesreport_generated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBehaviorReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_date', models.DateField(unique=True)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('page_views', models.PositiveIntegerField(default=0)),
+                ('product_views', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.PositiveBigIntegerField(default=0, help_text='Sum of session durations in seconds')),
+                ('converted_sessions', models.PositiveIntegerField(default=0)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-report_date'],
+            },
+        ),
+    ]
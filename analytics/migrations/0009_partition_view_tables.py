@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from analytics.partitioning import PARTITIONED_TABLES, convert_to_partitioned, supports_partitioning
+
+
+def partition_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    if not supports_partitioning(connection):
+        return
+    for table in PARTITIONED_TABLES:
+        convert_to_partitioned(connection, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_user_behavior_report'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pageview',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='productview',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        # Partitioned tables stay partitioned when migrating backwards.
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_partition_view_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesreport',
+            name='is_closed',
+            field=models.BooleanField(default=False, help_text='Computed after the day ended'),
+        ),
+    ]
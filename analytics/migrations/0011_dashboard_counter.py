@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:45
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def seed_counters(apps, schema_editor):
+    DashboardCounter = apps.get_model('analytics', 'DashboardCounter')
+    Order = apps.get_model('orders', 'Order')
+    orders = Order.objects.aggregate(count=Count('id'), revenue=Sum('total_amount'))
+    totals = {
+        'page_views': apps.get_model('analytics', 'PageView').objects.count(),
+        'product_views': apps.get_model('analytics', 'ProductView').objects.count(),
+        'orders': orders['count'],
+        'revenue_cents': int((orders['revenue'] or 0) * 100),
+    }
+    DashboardCounter.objects.bulk_create([
+        DashboardCounter(name=name, shard=0, value=value) for name, value in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_salesreport_is_closed'),
+        ('orders', '0004_orderitem_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('page_views', 'Page views'), ('product_views', 'Product views'), ('orders', 'Orders'), ('revenue_cents', 'Revenue (cents)')], max_length=20)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'shard'), name='unique_dashboard_counter_shard')],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,219 @@
+"""
+Monthly partitioning of the raw analytics event tables.
+
+On PostgreSQL, PageView and ProductView are declaratively partitioned by
+RANGE (created_at) into one table per month plus a DEFAULT partition, so
+old months can be detached and dropped instantly and date-range queries
+only touch the partitions they need.
+
+Other databases keep a single table; a "partition" is then the month's
+created_at range, selected through ``AnalyticsQuerySet.for_month()`` and
+removed with batched deletes.
+"""
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.db import transaction
+
+# Tables are referenced by name so the migration does not depend on the
+# current model definitions.
+PARTITIONED_TABLES = ('analytics_pageview', 'analytics_productview')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Returns the aware UTC datetimes [start, end) covering `month`."""
+    start = datetime.combine(month_start(month), time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(add_months(month, 1), time.min, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def supports_partitioning(connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection, table):
+    if not supports_partitioning(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection, table):
+    """Returns the months that have their own partition, oldest first."""
+    if not is_partitioned(connection, table):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{table}_p'
+    months = []
+    for name in names:
+        if name.startswith(prefix):
+            months.append(datetime.strptime(name[len(prefix):], '%Y_%m').date())
+    return sorted(months)
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def table_exists(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [connection.ops.quote_name(name)])
+        return cursor.fetchone()[0] is not None
+
+
+def default_partition_months(connection, table):
+    """Returns the months that have rows in the DEFAULT partition, oldest first."""
+    default = default_partition_name(table)
+    if not table_exists(connection, default):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') "
+            f"FROM {connection.ops.quote_name(default)}"
+        )
+        return sorted(row[0].date() for row in cursor.fetchall())
+
+
+def create_partition(connection, table, month):
+    """
+    Creates the partition for `month` if it does not exist. PostgreSQL
+    refuses to add a partition while the DEFAULT partition holds rows for
+    its range, so the partition is built as a plain table, those rows are
+    moved into it and it is then attached, all in one transaction.
+    """
+    name = partition_name(table, month)
+    if table_exists(connection, name):
+        return
+    start, end = month_bounds(month)
+    quote = connection.ops.quote_name
+    default = default_partition_name(table)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)")
+        if table_exists(connection, default):
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote(default)} WHERE created_at >= %s AND created_at < %s "
+                f"RETURNING *) INSERT INTO {quote(name)} SELECT * FROM moved",
+                [start, end],
+            )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+
+def ensure_partitions(connection, through_month):
+    """
+    Creates monthly partitions from the current month through
+    `through_month`, plus one for every earlier month whose rows landed in
+    the DEFAULT partition because maintenance did not run in time.
+    """
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        existing = set(list_partitions(connection, table))
+        months = set(default_partition_months(connection, table))
+        month = month_start(datetime.now(dt_timezone.utc).date())
+        while month <= through_month:
+            months.add(month)
+            month = add_months(month, 1)
+        for month in sorted(months - existing):
+            create_partition(connection, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+def drop_partition(connection, table, month):
+    """Detaches and drops the partition for `month` (PostgreSQL only)."""
+    quote = connection.ops.quote_name
+    name = quote(partition_name(table, month))
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+
+
+def convert_to_partitioned(connection, table, months_ahead=3):
+    """
+    Rebuilds `table` as a table partitioned by month on created_at, keeping
+    its rows, index and foreign key names. The primary key becomes
+    (id, created_at) because PostgreSQL requires unique constraints on a
+    partitioned table to include the partition key.
+    """
+    if is_partitioned(connection, table):
+        return
+    quote = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    sequence = f'{table}_id_seq'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+            [table, table],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT MIN(created_at), MAX(id) FROM {quote(table)}")
+        first_created, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"CREATE TABLE {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT")
+
+    month = month_start(first_created.date()) if first_created else month_start(datetime.now(dt_timezone.utc).date())
+    last = add_months(month_start(datetime.now(dt_timezone.utc).date()), months_ahead)
+    while month <= last:
+        create_partition(connection, table, month)
+        month = add_months(month, 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+        # Dropping the old table frees its sequence, key and index names.
+        cursor.execute(f"DROP TABLE {quote(old)}")
+
+        # LIKE does not copy the identity column, so ids now come from a
+        # sequence that continues after the existing rows.
+        cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id")
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, (max_id or 0) + 1])
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence]
+        )
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, created_at)")
+        # Recreate the secondary indexes and foreign keys under their
+        # original names so later migrations can still find them.
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
@@ -1,12 +1,31 @@
 # analytics/serializers.py
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import PageView, ProductView, SalesReport
 
+def validate_event_time(value):
+    """
+    Rejects client timestamps outside [now - TRACKING_MAX_EVENT_AGE, now +
+    TRACKING_MAX_CLOCK_SKEW]; far-off times would skew rollups, sessions
+    and trending scores.
+    """
+    now = timezone.now()
+    if value > now + timedelta(seconds=settings.TRACKING_MAX_CLOCK_SKEW):
+        raise serializers.ValidationError('Event time is in the future.')
+    if value < now - timedelta(seconds=settings.TRACKING_MAX_EVENT_AGE):
+        raise serializers.ValidationError('Event time is too old.')
+    return value
+
 class PageViewSerializer(serializers.ModelSerializer):
     class Meta:
         model = PageView
         fields = '__all__'
 
+    def validate_created_at(self, value):
+        return validate_event_time(value)
+
 class ProductViewSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
 
@@ -14,6 +33,9 @@ class ProductViewSerializer(serializers.ModelSerializer):
         model = ProductView
         fields = '__all__'
 
+    def validate_created_at(self, value):
+        return validate_event_time(value)
+
 class SalesReportSerializer(serializers.ModelSerializer):
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     total_orders = serializers.IntegerField(read_only=True)
@@ -21,4 +43,35 @@ class SalesReportSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SalesReport
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class TrackingEventSerializer(serializers.Serializer):
+    """
+    Validates a single event from a tracking batch without the overhead of a
+    ModelSerializer; rows are built and bulk inserted by the view.
+    """
+    EVENT_TYPES = ('page_view', 'product_view')
+
+    type = serializers.ChoiceField(choices=EVENT_TYPES)
+    session_id = serializers.CharField(max_length=40, required=False, allow_null=True, allow_blank=True)
+    ip_address = serializers.IPAddressField(required=False, allow_null=True)
+    created_at = serializers.DateTimeField(required=False)
+
+    # page_view
+    page_url = serializers.CharField(max_length=255, required=False)
+    page_title = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    user_agent = serializers.CharField(required=False, allow_blank=True, default='')
+
+    # product_view
+    product = serializers.IntegerField(required=False, min_value=1)
+    view_duration = serializers.IntegerField(required=False, min_value=0, default=0)
+
+    def validate_created_at(self, value):
+        return validate_event_time(value)
+
+    def validate(self, attrs):
+        if attrs['type'] == 'page_view' and not attrs.get('page_url'):
+            raise serializers.ValidationError({'page_url': 'This field is required for page views.'})
+        if attrs['type'] == 'product_view' and not attrs.get('product'):
+            raise serializers.ValidationError({'product': 'This field is required for product views.'})
+        return attrs
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from orders.models import Order
+from .models import (
+    PageView, ProductView, PageViewRollup, ProductViewRollup, ProductTrendingScore, DashboardCounter,
+    COUNTER_PAGE_VIEWS, COUNTER_PRODUCT_VIEWS,
+)
+
+
+# Bulk inserts (e.g. the batch tracking endpoint) bypass these receivers and
+# call the rollup managers directly.
+@receiver(post_save, sender=PageView)
+def record_page_view(sender, instance, created, **kwargs):
+    if created:
+        PageViewRollup.objects.record([instance])
+        DashboardCounter.objects.increment(COUNTER_PAGE_VIEWS)
+
+
+@receiver(post_save, sender=ProductView)
+def record_product_view(sender, instance, created, **kwargs):
+    if created:
+        ProductViewRollup.objects.record([instance])
+        ProductTrendingScore.objects.record([instance])
+        DashboardCounter.objects.increment(COUNTER_PRODUCT_VIEWS)
+
+
+@receiver(post_save, sender=Order)
+def record_order(sender, instance, created, **kwargs):
+    # Counted once the order commits, with the total it was saved with by
+    # then (checkout fills it in after the items). Later changes to an
+    # order's total are picked up by reconciliation.
+    if created:
+        transaction.on_commit(lambda: DashboardCounter.objects.record_order(instance))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db.models import Max
+from django.utils import timezone
+
+from jobs.registry import task
+from .models import DashboardCounter, SalesReport, UserBehaviorReport
+
+
+@task(queue='reports', every=timedelta(days=1), offset=timedelta(minutes=15))
+def close_sales_reports():
+    """Closes the SalesReport days that ended since the last run and refreshes late order changes."""
+    SalesReport.objects.close()
+
+
+@task(queue='reports', every=timedelta(days=1), offset=timedelta(minutes=20))
+def build_behavior_reports():
+    """Builds the UserBehaviorReports of the days that ended since the newest report."""
+    yesterday = timezone.now().date() - timedelta(days=1)
+    latest = UserBehaviorReport.objects.aggregate(latest=Max('report_date'))['latest']
+    day = latest + timedelta(days=1) if latest else yesterday
+    while day <= yesterday:
+        UserBehaviorReport.objects.materialize(day)
+        day += timedelta(days=1)
+
+
+@task(queue='reports', every=timedelta(days=1), offset=timedelta(minutes=30))
+def maintain_analytics_partitions():
+    """Creates the coming months' view partitions and archives months past the retention period."""
+    call_command('maintain_analytics_partitions')
+
+
+@task(queue='reports', every=timedelta(days=1), offset=timedelta(minutes=45))
+def reconcile_dashboard_counters():
+    """Corrects drift in the dashboard counters."""
+    DashboardCounter.objects.reconcile()
@@ -4,11 +4,27 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
+import csv
+import gzip
+import math
+import os
+import tempfile
+from io import StringIO
 from products.models import Category, Product, Brand
 from orders.models import Order, OrderItem
-from .models import PageView, ProductView, SalesReport
+from cart.models import Cart, CartItem
+from django.db import transaction
+from django.core.management import call_command
+from alcom_project.pooling import configure_pools, summarize
+from jobs.registry import periodic_tasks
+from .tasks import build_behavior_reports
+from .models import (
+    PageView, ProductView, SalesReport, PageViewRollup, ProductViewRollup,
+    ProductTrendingScore, UserBehaviorReport, DashboardCounter, ROLLUP_DAY, ROLLUP_HOUR,
+    COUNTER_ORDERS, COUNTER_PAGE_VIEWS, COUNTER_PRODUCT_VIEWS, COUNTER_REVENUE_CENTS,
+)
 
 User = get_user_model()
 
@@ -249,6 +265,214 @@ class AnalyticsManagerTests(TestCase):
         # And popular product has more views, so it should be first
         self.assertEqual(popular_products.first().product.name, 'Popular Product')
 
+class ViewRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Test', slug='test')
+        cls.brand = Brand.objects.create(name='RollupBrand', description='Brand')
+        cls.product = Product.objects.create(
+            name='Rollup Product',
+            slug='rollup-product',
+            base_price=Decimal('10.00'),
+            category=cls.category,
+            brand=cls.brand,
+            is_active=True
+        )
+        cls.moment = timezone.make_aware(datetime(2025, 5, 4, 10, 30))
+
+    def test_views_update_rollups_incrementally(self):
+        """Test saving views increments hourly and daily rollups"""
+        ProductView.objects.create(product=self.product, session_id='a', created_at=self.moment)
+        ProductView.objects.create(product=self.product, session_id='a', created_at=self.moment + timedelta(minutes=5))
+        ProductView.objects.create(product=self.product, session_id='b', created_at=self.moment + timedelta(hours=2))
+        PageView.objects.create(page_url='/', created_at=self.moment)
+
+        daily = ProductViewRollup.objects.get(product=self.product, period=ROLLUP_DAY)
+        self.assertEqual((daily.views, daily.unique_sessions), (3, 2))
+        hourly = ProductViewRollup.objects.filter(product=self.product, period=ROLLUP_HOUR).order_by('bucket')
+        self.assertEqual([(r.views, r.unique_sessions) for r in hourly], [(2, 1), (1, 1)])
+        self.assertEqual(PageViewRollup.objects.get(page_url='/', period=ROLLUP_DAY).views, 1)
+
+    def test_rebuild_command_matches_raw_views(self):
+        """Test rebuilding rollups recomputes them from the raw tables"""
+        ProductView.objects.create(product=self.product, session_id='a', created_at=self.moment)
+        ProductView.objects.create(product=self.product, session_id='b', created_at=self.moment)
+        ProductViewRollup.objects.update(views=99, unique_sessions=99)
+
+        call_command('rebuild_analytics_rollups', stdout=StringIO())
+        daily = ProductViewRollup.objects.get(product=self.product, period=ROLLUP_DAY)
+        self.assertEqual((daily.views, daily.unique_sessions), (2, 2))
+        self.assertEqual(ProductViewRollup.objects.filter(period=ROLLUP_HOUR).count(), 1)
+
+class TrendingScoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Test', slug='test')
+        cls.brand = Brand.objects.create(name='TrendBrand', description='Brand')
+        cls.old_hit = Product.objects.create(
+            name='Old Hit', slug='old-hit', base_price=Decimal('10.00'),
+            category=cls.category, brand=cls.brand
+        )
+        cls.new_hit = Product.objects.create(
+            name='New Hit', slug='new-hit', base_price=Decimal('10.00'),
+            category=cls.category, brand=cls.brand
+        )
+        three_days_ago = timezone.now() - timedelta(days=3)
+        for i in range(10):
+            ProductView.objects.create(product=cls.old_hit, session_id=f'old-{i}', created_at=three_days_ago)
+        for i in range(2):
+            ProductView.objects.create(product=cls.new_hit, session_id=f'new-{i}')
+
+    def test_short_window_favours_recent_views(self):
+        """Test recent views outrank older, more numerous views in short windows"""
+        top = ProductTrendingScore.objects.top(window='1h')
+        self.assertEqual([row.product for row in top], [self.new_hit])
+        self.assertAlmostEqual(top[0].score, 2, places=2)
+
+    def test_long_window_keeps_older_views(self):
+        """Test older views still count in long windows"""
+        top = ProductTrendingScore.objects.top(window='7d')
+        self.assertEqual([row.product for row in top], [self.old_hit, self.new_hit])
+
+    def test_large_score_gaps_stay_finite(self):
+        """Test combining scores more than exp()'s range apart neither underflows nor overflows"""
+        score = ProductTrendingScore.objects.get(product=self.new_hit, window='1h')
+        ProductTrendingScore.objects.add(self.new_hit.id, '1h', score.log_score - 5000)
+        self.assertAlmostEqual(ProductTrendingScore.objects.get(pk=score.pk).log_score, score.log_score, places=6)
+        ProductTrendingScore.objects.add(self.new_hit.id, '1h', score.log_score + 5000)
+        self.assertAlmostEqual(
+            ProductTrendingScore.objects.get(pk=score.pk).log_score, score.log_score + 5000, places=6
+        )
+        top = ProductTrendingScore.objects.top(window='1h')
+        self.assertEqual(top[0].product, self.new_hit)
+        self.assertEqual(top[0].score, math.exp(700))
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Test rebuilding from raw views reproduces the incremental scores"""
+        before = {(pk, window): score for pk, window, score in ProductTrendingScore.objects.values_list('product_id', 'window', 'log_score')}
+        call_command('rebuild_trending_scores', stdout=StringIO())
+        after = {(pk, window): score for pk, window, score in ProductTrendingScore.objects.values_list('product_id', 'window', 'log_score')}
+        # Views older than the rebuild horizon (20 half-lives) are dropped.
+        self.assertEqual(set(before) - set(after), {(self.old_hit.id, '1h')})
+        for key, score in after.items():
+            self.assertAlmostEqual(before[key], score, places=6)
+
+class AnalyticsRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Test', slug='test')
+        cls.brand = Brand.objects.create(name='RetentionBrand', description='Brand')
+        cls.product = Product.objects.create(
+            name='Retention Product', slug='retention-product', base_price=Decimal('10.00'),
+            category=cls.category, brand=cls.brand
+        )
+        cls.old = timezone.now() - timedelta(days=800)
+        PageView.objects.create(page_url='/old/', session_id='old', created_at=cls.old)
+        ProductView.objects.create(product=cls.product, session_id='old', created_at=cls.old)
+        PageView.objects.create(page_url='/new/', session_id='new')
+
+    def test_for_month_selects_partition_range(self):
+        """Test the emulated monthly partition filter"""
+        self.assertEqual(PageView.objects.for_month(self.old.date()).get().page_url, '/old/')
+
+    def test_old_months_are_archived_and_dropped(self):
+        """Test old months are rolled up, exported and removed"""
+        PageViewRollup.objects.all().delete()
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command(
+                'maintain_analytics_partitions', '--retention-months=12',
+                f'--archive-dir={archive_dir}', stdout=StringIO()
+            )
+            path = os.path.join(archive_dir, 'analytics_pageview', f'{self.old:%Y-%m}.csv.gz')
+            with gzip.open(path, 'rt') as handle:
+                rows = list(csv.DictReader(handle))
+
+        self.assertEqual([row['page_url'] for row in rows], ['/old/'])
+        self.assertEqual(list(PageView.objects.values_list('page_url', flat=True)), ['/new/'])
+        self.assertFalse(ProductView.objects.exists())
+        # The archived month is still represented in the rollups.
+        self.assertEqual(PageViewRollup.objects.get(page_url='/old/', period=ROLLUP_DAY).views, 1)
+        self.assertEqual(ProductViewRollup.objects.get(product=self.product, period=ROLLUP_DAY).views, 1)
+
+    def test_rerun_keeps_rollups_of_tables_already_archived(self):
+        """Test a rerun after a crash between tables does not wipe the first table's rollups"""
+        month = self.old.date().replace(day=1)
+        PageViewRollup.objects.rebuild(month, month + timedelta(days=40))
+        PageView.objects.for_month(month).delete()
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command(
+                'maintain_analytics_partitions', '--retention-months=12',
+                f'--archive-dir={archive_dir}', stdout=StringIO()
+            )
+            self.assertFalse(os.path.exists(os.path.join(archive_dir, 'analytics_pageview')))
+
+        self.assertEqual(PageViewRollup.objects.get(page_url='/old/', period=ROLLUP_DAY).views, 1)
+        self.assertFalse(ProductView.objects.exists())
+        self.assertEqual(ProductViewRollup.objects.get(product=self.product, period=ROLLUP_DAY).views, 1)
+
+    def test_maintenance_runs_as_a_periodic_job(self):
+        """Test partition maintenance is scheduled daily on the reports queue"""
+        tasks = {task.name: task for task in periodic_tasks(['reports'])}
+        self.assertEqual(tasks['analytics.tasks.maintain_analytics_partitions'].every, timedelta(days=1))
+
+class AnalyticsExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='exportadmin', email='export@example.com', password='adminpass123'
+        )
+        cls.user = User.objects.create_user(
+            username='exportuser', email='exportuser@example.com', password='testpass123'
+        )
+        for i in range(3):
+            PageView.objects.create(page_url=f'/export-{i}/', session_id=f'export-{i}')
+        cls.today = timezone.now().astimezone(dt_timezone.utc).date()
+
+    def test_admin_streams_gzipped_csv(self):
+        """Test admins can stream a dataset as gzipped CSV"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(f'/api/analytics/export/page_views/?start={self.today}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(sorted(row['page_url'] for row in rows), ['/export-0/', '/export-1/', '/export-2/'])
+
+    def test_export_validation(self):
+        """Test unknown datasets and bad dates are rejected"""
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertEqual(self.client.get('/api/analytics/export/users/?start=2025-01-01').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/analytics/export/orders/?start=yesterday').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_rejects_reversed_range(self):
+        """Test a range whose start is after its end is rejected"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/api/analytics/export/orders/?start=2025-02-01&end=2025-01-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_admin(self):
+        """Test regular users cannot export analytics"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(f'/api/analytics/export/page_views/?start={self.today}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command_splits_files(self):
+        """Test the export command writes gzipped CSV parts"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command(
+                'export_analytics', f'--start={self.today}', '--dataset=page_views',
+                f'--output-dir={output_dir}', '--rows-per-file=2', stdout=StringIO()
+            )
+            files = sorted(os.listdir(output_dir))
+            rows = []
+            for name in files:
+                with gzip.open(os.path.join(output_dir, name), 'rt') as handle:
+                    rows.extend(csv.DictReader(handle))
+
+        self.assertEqual(len(files), 2)
+        self.assertEqual(len(rows), 3)
+
 class PageViewAPITests(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -398,6 +622,132 @@ class ProductViewAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class TrackingEventBatchAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='batchuser',
+            email='batch@example.com',
+            password='testpass123'
+        )
+        cls.category = Category.objects.create(name='Test', slug='test')
+        cls.brand = Brand.objects.create(name='BatchBrand', description='Brand')
+        cls.product = Product.objects.create(
+            name='Batch Product',
+            slug='batch-product',
+            base_price=Decimal('10.00'),
+            category=cls.category,
+            brand=cls.brand,
+            is_active=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/analytics/events/batch/'
+
+    def test_batch_from_session_user_needs_no_csrf_token(self):
+        """Test beacon posts from a logged-in browser session are accepted and attributed"""
+        client = APIClient(enforce_csrf_checks=True)
+        client.login(username='batchuser', password='testpass123')
+        for url in (self.url, '/api/analytics/async/events/batch/'):
+            response = client.post(url, [{'type': 'page_view', 'page_url': '/bye/'}], format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(PageView.objects.values_list('user', flat=True)), [self.user.pk, self.user.pk])
+
+    def test_batch_json_array(self):
+        """Test ingesting mixed events from a JSON array"""
+        self.client.force_authenticate(user=self.user)
+        events = [
+            {'type': 'page_view', 'page_url': '/', 'page_title': 'Home', 'session_id': 's1'},
+            {'type': 'product_view', 'product': self.product.id, 'session_id': 's1', 'view_duration': 15},
+            {'type': 'page_view', 'page_url': '/cart/', 'session_id': 's1'},
+        ]
+        response = self.client.post(self.url, events, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['accepted'], {'page_views': 2, 'product_views': 1})
+        self.assertEqual(
+            ProductViewRollup.objects.get(product=self.product, period=ROLLUP_DAY).views, 1
+        )
+        self.assertEqual(PageView.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(ProductView.objects.get(session_id='s1').view_duration, 15)
+
+    def test_batch_ndjson(self):
+        """Test ingesting events sent as NDJSON"""
+        body = (
+            '{"type": "page_view", "page_url": "/a/"}\n'
+            '\n'
+            f'{{"type": "product_view", "product": {self.product.id}}}\n'
+        )
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(PageView.objects.filter(page_url='/a/').count(), 1)
+        self.assertIsNone(PageView.objects.get(page_url='/a/').user)
+        self.assertEqual(ProductView.objects.filter(product=self.product).count(), 1)
+
+    def test_batch_rejects_invalid_events(self):
+        """Test invalid events are reported by index and not stored"""
+        events = [
+            {'type': 'page_view', 'page_url': '/ok/'},
+            {'type': 'page_view'},
+            {'type': 'product_view', 'product': 999},
+            {'type': 'unknown'},
+        ]
+        response = self.client.post(self.url, events, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['index'] for r in response.data['rejected']], [1, 2, 3])
+        self.assertEqual(PageView.objects.count(), 1)
+        self.assertEqual(ProductView.objects.count(), 0)
+
+    def test_batch_rejects_event_times_outside_skew_window(self):
+        """Test far-future and long-backdated events are rejected like other invalid events"""
+        now = timezone.now()
+        events = [
+            {'type': 'page_view', 'page_url': '/ok/', 'created_at': (now - timedelta(hours=1)).isoformat()},
+            {'type': 'product_view', 'product': self.product.id, 'created_at': '2100-01-01T00:00:00Z'},
+            {'type': 'page_view', 'page_url': '/old/', 'created_at': (now - timedelta(days=3)).isoformat()},
+        ]
+        response = self.client.post(self.url, events, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['index'] for r in response.data['rejected']], [1, 2])
+        self.assertEqual(PageView.objects.get().page_url, '/ok/')
+        self.assertFalse(ProductView.objects.exists())
+        self.assertFalse(ProductTrendingScore.objects.exists())
+
+    def test_batch_requires_list(self):
+        """Test a non-list payload is rejected"""
+        response = self.client.post(self.url, {'type': 'page_view'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AsyncTrackingEventBatchAPITests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Test', slug='test')
+        brand = Brand.objects.create(name='AsyncBrand', description='Brand')
+        self.product = Product.objects.create(
+            name='Async Product', slug='async-product', base_price=Decimal('10.00'), category=category, brand=brand
+        )
+
+    def test_async_batch_matches_sync_batch(self):
+        """Test the async endpoint stores events and reports them like the sync one"""
+        events = [
+            {'type': 'page_view', 'page_url': '/', 'session_id': 's1'},
+            {'type': 'product_view', 'product': self.product.id, 'session_id': 's1'},
+            {'type': 'product_view', 'product': 999999},
+            {'type': 'page_view'},
+        ]
+        async_response = self.client.post('/api/analytics/async/events/batch/', events, format='json')
+        sync_response = self.client.post('/api/analytics/events/batch/', events, format='json')
+
+        self.assertEqual(async_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(PageView.objects.count(), 2)
+        self.assertEqual(ProductView.objects.count(), 2)
+
+    def test_async_batch_rejects_non_list(self):
+        """Test the async endpoint validates the batch shape"""
+        response = self.client.post('/api/analytics/async/events/batch/', {'type': 'page_view'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'error': 'Expected a list of events'})
+
 class SalesReportAPITests(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -509,6 +859,171 @@ class SalesReportAPITests(APITestCase):
         self.assertTrue('report_generated' in response.data)
         self.assertTrue('total_revenue' in response.data)
 
+class SalesReportMaterializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pass123')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pass123')
+        cls.day1 = datetime(2025, 3, 1).date()
+        cls.day2 = datetime(2025, 3, 2).date()
+
+    def create_order(self, user, amount, day):
+        order = Order.objects.create(user=user, total_amount=Decimal(amount))
+        moment = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        Order.objects.filter(pk=order.pk).update(created_at=moment)
+        order.refresh_from_db()
+        return order
+
+    def test_materialize_range(self):
+        """Test a date range is materialized including empty days"""
+        self.create_order(self.alice, '100.00', self.day1)
+        self.create_order(self.alice, '50.00', self.day1)
+        self.create_order(self.bob, '30.00', self.day2)
+
+        call_command('backfill_sales_reports', '--start=2025-03-01', '--end=2025-03-03', stdout=StringIO())
+        reports = {r.report_date: r for r in SalesReport.objects.all()}
+        self.assertEqual(len(reports), 3)
+        self.assertEqual(reports[self.day1].total_revenue, Decimal('150.00'))
+        self.assertEqual(reports[self.day1].total_orders, 2)
+        self.assertEqual(reports[self.day1].total_customers, 1)
+        self.assertEqual(reports[self.day1].average_order_value, Decimal('75.00'))
+        self.assertEqual(reports[self.day2].total_revenue, Decimal('30.00'))
+        self.assertEqual(reports[self.day2 + timedelta(days=1)].total_orders, 0)
+
+    def test_refresh_only_changed_days(self):
+        """Test incremental refresh only rewrites days with changed orders"""
+        self.create_order(self.alice, '100.00', self.day1)
+        order = self.create_order(self.bob, '30.00', self.day2)
+        SalesReport.objects.materialize(self.day1, self.day2)
+        SalesReport.objects.filter(report_date=self.day1).update(total_orders=42)
+
+        order.total_amount = Decimal('45.00')
+        order.save()
+        self.assertEqual(SalesReport.objects.refresh_changed(), [self.day2])
+        self.assertEqual(SalesReport.objects.get(report_date=self.day2).total_revenue, Decimal('45.00'))
+        # The untouched day keeps its stored values.
+        self.assertEqual(SalesReport.objects.get(report_date=self.day1).total_orders, 42)
+
+    def test_materialize_fills_every_field_in_one_query(self):
+        """Test items sold and new customers come from the same grouped query"""
+        category = Category.objects.create(name='Sales', slug='sales')
+        brand = Brand.objects.create(name='SalesBrand', description='Brand')
+        product = Product.objects.create(
+            name='Sales Product', slug='sales-product', base_price=Decimal('10.00'), category=category, brand=brand
+        )
+        first = self.create_order(self.alice, '30.00', self.day1)
+        second = self.create_order(self.alice, '20.00', self.day2)
+        third = self.create_order(self.bob, '10.00', self.day2)
+        OrderItem.objects.create(order=first, product=product, quantity=3, price=Decimal('10.00'))
+        OrderItem.objects.create(order=second, product=product, quantity=1, price=Decimal('10.00'))
+        OrderItem.objects.create(order=second, product=product, quantity=1, price=Decimal('10.00'))
+        OrderItem.objects.create(order=third, product=product, quantity=1, price=Decimal('10.00'))
+
+        # One grouped SELECT plus one upsert.
+        with self.assertNumQueries(2):
+            SalesReport.objects.materialize(self.day1, self.day2)
+        day1 = SalesReport.objects.get(report_date=self.day1)
+        day2 = SalesReport.objects.get(report_date=self.day2)
+        self.assertEqual((day1.products_sold, day1.new_customers), (3, 1))
+        # Alice already ordered on day 1, so only Bob is new on day 2.
+        self.assertEqual((day2.products_sold, day2.new_customers, day2.total_customers), (3, 1, 2))
+        self.assertEqual(day2.total_revenue, Decimal('30.00'))
+
+    def test_close_days_backfills_missed_days_once(self):
+        """Test closing materializes every ended day in one range and is safe to re-run"""
+        self.create_order(self.alice, '100.00', self.day1)
+        self.create_order(self.bob, '30.00', self.day2)
+        day4 = self.day1 + timedelta(days=3)
+        run_at = timezone.make_aware(datetime.combine(day4, datetime.min.time())) + timedelta(minutes=15)
+
+        closed = SalesReport.objects.close_days(generated_at=run_at)
+        self.assertEqual([report.report_date for report in closed], [self.day1, self.day2, self.day1 + timedelta(days=2)])
+        self.assertTrue(all(report.is_closed for report in SalesReport.objects.all()))
+        self.assertEqual(SalesReport.objects.close_days(generated_at=run_at), [])
+        # The next night closes only the day that has just ended.
+        closed = SalesReport.objects.close_days(generated_at=run_at + timedelta(days=1))
+        self.assertEqual([report.report_date for report in closed], [day4])
+
+    def test_close_refreshes_late_changes_to_closed_days(self):
+        """Test the nightly run also picks up orders changed after their day was closed"""
+        order = self.create_order(self.alice, '100.00', self.day1)
+        SalesReport.objects.materialize(self.day1, self.day1)
+        order.total_amount = Decimal('80.00')
+        order.save()
+
+        closed, refreshed = SalesReport.objects.close()
+        self.assertIn(self.day1, refreshed)
+        report = SalesReport.objects.get(report_date=self.day1)
+        self.assertEqual(report.total_revenue, Decimal('80.00'))
+        self.assertTrue(report.is_closed)
+
+class UserBehaviorReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', email='shopper@example.com', password='pass123')
+        cls.category = Category.objects.create(name='Test', slug='test')
+        cls.brand = Brand.objects.create(name='BehaviorBrand', description='Brand')
+        cls.product = Product.objects.create(
+            name='Behavior Product', slug='behavior-product', base_price=Decimal('10.00'),
+            category=cls.category, brand=cls.brand
+        )
+        cls.day = datetime(2025, 6, 1).date()
+        cls.start = timezone.make_aware(datetime(2025, 6, 1, 9, 0))
+
+    def test_sessionization(self):
+        """Test views are split into sessions by id and idle timeout"""
+        at = lambda minutes: self.start + timedelta(minutes=minutes)
+        # Session A: two page views and a product view over 10 minutes, then
+        # a new session after an hour of inactivity.
+        PageView.objects.create(page_url='/', session_id='A', user=self.user, created_at=at(0))
+        ProductView.objects.create(product=self.product, session_id='A', user=self.user, created_at=at(5), view_duration=0)
+        PageView.objects.create(page_url='/cart/', session_id='A', user=self.user, created_at=at(10))
+        PageView.objects.create(page_url='/', session_id='A', created_at=at(70))
+        # Session B: a single anonymous product view lasting 30 seconds.
+        ProductView.objects.create(product=self.product, session_id='B', created_at=at(3), view_duration=30)
+        # Outside the day.
+        PageView.objects.create(page_url='/', session_id='C', created_at=at(60 * 24))
+
+        order = Order.objects.create(user=self.user, total_amount=Decimal('10.00'))
+        Order.objects.filter(pk=order.pk).update(created_at=at(12))
+
+        call_command('build_behavior_reports', '--start=2025-06-01', '--chunk-size=2', stdout=StringIO())
+        report = UserBehaviorReport.objects.get(report_date=self.day)
+        self.assertEqual(report.sessions, 3)
+        self.assertEqual(report.page_views, 3)
+        self.assertEqual(report.product_views, 2)
+        self.assertEqual(report.total_duration, 600 + 0 + 30)
+        self.assertEqual(report.converted_sessions, 1)
+
+        summary = UserBehaviorReport.objects.summary(self.day, self.day)
+        self.assertEqual(summary['average_session_duration'], 210)
+        self.assertEqual(summary['page_views_per_session'], 1)
+        self.assertEqual(summary['conversion_rate'], round(100 / 3, 2))
+
+    def test_signed_in_views_without_session_id_are_sessionized_per_user(self):
+        """Test views of a logged-in user without a session id count as that user's session"""
+        at = lambda minutes: self.start + timedelta(minutes=minutes)
+        PageView.objects.create(page_url='/', user=self.user, created_at=at(0))
+        ProductView.objects.create(product=self.product, user=self.user, session_id='', created_at=at(4), view_duration=20)
+        # Anonymous views without a session id cannot be attributed.
+        PageView.objects.create(page_url='/', created_at=at(1))
+
+        report = UserBehaviorReport.objects.materialize(self.day)
+        self.assertEqual((report.sessions, report.page_views, report.product_views), (1, 1, 1))
+        self.assertEqual(report.total_duration, 240 + 20)
+
+    def test_periodic_job_builds_the_days_since_the_newest_report(self):
+        """Test the daily job catches up on every ended day without a report"""
+        today = timezone.now().date()
+        UserBehaviorReport.objects.materialize(today - timedelta(days=3))
+        PageView.objects.create(page_url='/', session_id='late', created_at=timezone.now() - timedelta(days=2))
+        build_behavior_reports()
+        self.assertEqual(
+            sorted(UserBehaviorReport.objects.values_list('report_date', flat=True)),
+            [today - timedelta(days=days) for days in (3, 2, 1)],
+        )
+        self.assertEqual(UserBehaviorReport.objects.get(report_date=today - timedelta(days=2)).page_views, 1)
+
 class AnalyticsDashboardAPITests(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -604,6 +1119,11 @@ class AnalyticsDashboardAPITests(APITestCase):
         expected_count = ProductView.objects.filter(product=popular_product).count()
         self.assertEqual(response.data[0]['view_count'], expected_count)
 
+    def test_trending_products_invalid_window(self):
+        """Test unknown trending windows are rejected"""
+        response = self.client.get('/api/analytics/trending-products/?window=1y')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_revenue_analytics(self):
         """Test getting revenue analytics data"""
         url = '/api/analytics/revenue-analytics/'
@@ -614,6 +1134,12 @@ class AnalyticsDashboardAPITests(APITestCase):
         self.assertTrue('weekly_trend' in response.data)
         self.assertTrue('monthly_summary' in response.data)
 
+        self.assertEqual(len(response.data['daily_revenue']), 7)
+        self.assertEqual(response.data['daily_revenue'][-1]['revenue'], Decimal('1000.00'))
+        total = sum(week['revenue'] for week in response.data['weekly_trend'])
+        self.assertEqual(total, Decimal('7000.00') + Decimal('2100.00'))
+        self.assertEqual(sum(month['orders'] for month in response.data['monthly_summary']), 161)
+
     def test_get_user_behavior_analytics(self):
         """Test getting user behavior analytics"""
         url = '/api/analytics/user-behavior/'
@@ -636,3 +1162,126 @@ class AnalyticsDashboardAPITests(APITestCase):
         url = '/api/analytics/dashboard-stats/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DashboardCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='counteradmin', email='counteradmin@example.com', password='adminpass123'
+        )
+        cls.category = Category.objects.create(name='Counters', slug='counters')
+        cls.brand = Brand.objects.create(name='CounterBrand', description='Brand')
+        cls.product = Product.objects.create(
+            name='Counter Product', slug='counter-product', base_price=Decimal('10.00'),
+            category=cls.category, brand=cls.brand
+        )
+
+    def test_ingestion_and_checkout_increment_counters(self):
+        """Test batch tracking and new orders feed the dashboard counters"""
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.post('/api/analytics/events/batch/', [
+            {'type': 'page_view', 'page_url': '/', 'session_id': 's1'},
+            {'type': 'page_view', 'page_url': '/cart/', 'session_id': 's1'},
+            {'type': 'product_view', 'product': self.product.id, 'session_id': 's1'},
+        ], format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.admin_user, total_amount=Decimal('19.99'))
+            Order.objects.create(user=self.admin_user, total_amount=Decimal('5.01'))
+
+        with self.assertNumQueries(1):
+            totals = DashboardCounter.objects.totals()
+        self.assertEqual(totals, {
+            COUNTER_PAGE_VIEWS: 2, COUNTER_PRODUCT_VIEWS: 1, COUNTER_ORDERS: 2, COUNTER_REVENUE_CENTS: 2500,
+        })
+        response = self.client.get('/api/analytics/dashboard-stats/')
+        self.assertEqual(response.data['total_page_views'], 2)
+        self.assertEqual(response.data['total_orders'], 2)
+        self.assertEqual(response.data['total_revenue'], Decimal('25.00'))
+
+    def test_checkout_counts_committed_orders_at_their_computed_total(self):
+        """Test revenue uses the server-side order total and rolled-back orders are not counted"""
+        cart = Cart.objects.create(user=self.admin_user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.client.force_authenticate(user=self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/orders/', {'total_amount': '999.00'}, format='json')
+            with self.assertRaises(ValueError), transaction.atomic():
+                Order.objects.create(user=self.admin_user, total_amount=Decimal('50.00'))
+                raise ValueError
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        totals = DashboardCounter.objects.totals()
+        self.assertEqual((totals[COUNTER_ORDERS], totals[COUNTER_REVENUE_CENTS]), (1, 2000))
+
+    def test_reconcile_corrects_drift(self):
+        """Test the reconcile command brings counters back in line with the source tables"""
+        for i in range(3):
+            PageView.objects.create(page_url=f'/page-{i}/')
+        order = Order.objects.create(user=self.admin_user, total_amount=Decimal('40.00'))
+        # Neither a bulk delete nor an update of the total reaches the counters.
+        PageView.objects.filter(page_url='/page-0/').delete()
+        Order.objects.filter(pk=order.pk).update(total_amount=Decimal('45.50'))
+        self.assertEqual(DashboardCounter.objects.totals()[COUNTER_PAGE_VIEWS], 3)
+
+        call_command('reconcile_dashboard_counters', stdout=StringIO())
+        totals = DashboardCounter.objects.totals()
+        self.assertEqual(totals[COUNTER_PAGE_VIEWS], 2)
+        self.assertEqual(totals[COUNTER_REVENUE_CENTS], 4550)
+        self.assertEqual(DashboardCounter.objects.reconcile(), dict.fromkeys(totals, 0))
+
+    def test_reconcile_keeps_views_dropped_by_retention(self):
+        """Test months archived by retention still count through their rollups"""
+        old = timezone.now() - timedelta(days=800)
+        PageView.objects.create(page_url='/old/', created_at=old)
+        ProductView.objects.create(product=self.product, created_at=old)
+        PageView.objects.create(page_url='/new/')
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command(
+                'maintain_analytics_partitions', '--retention-months=12',
+                f'--archive-dir={archive_dir}', stdout=StringIO()
+            )
+        self.assertEqual(PageView.objects.count(), 1)
+
+        self.assertEqual(DashboardCounter.objects.reconcile()[COUNTER_PAGE_VIEWS], 0)
+        totals = DashboardCounter.objects.totals()
+        self.assertEqual((totals[COUNTER_PAGE_VIEWS], totals[COUNTER_PRODUCT_VIEWS]), (2, 1))
+
+class DatabasePoolTests(APITestCase):
+    def test_configure_pools_sizes_from_threads(self):
+        """Test pooled PostgreSQL aliases drop persistent connections and get one connection per thread"""
+        databases = {
+            'default': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+            'local': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 600},
+        }
+        configure_pools(databases, threads=4, overflow=2, timeout=10, max_idle=300)
+
+        self.assertEqual(databases['default']['CONN_MAX_AGE'], 0)
+        self.assertFalse(databases['default']['CONN_HEALTH_CHECKS'])
+        self.assertEqual(databases['default']['OPTIONS']['pool'], {
+            'min_size': 4, 'max_size': 6, 'timeout': 10, 'max_idle': 300, 'name': 'alcom-default',
+        })
+        self.assertNotIn('OPTIONS', databases['local'])
+
+    def test_summarize_pool_stats(self):
+        """Test raw psycopg pool stats are turned into in-use, overflow and wait figures"""
+        summary = summarize({
+            'pool_min': 4, 'pool_max': 6, 'pool_size': 6, 'pool_available': 1,
+            'requests_num': 120, 'requests_queued': 8, 'requests_wait_ms': 100, 'requests_errors': 1,
+        })
+        self.assertEqual(summary['in_use'], 5)
+        self.assertEqual(summary['overflow'], 2)
+        self.assertEqual(summary['wait_ms_avg'], 12.5)
+        self.assertEqual(summary['timeouts'], 1)
+
+    def test_pool_stats_endpoint(self):
+        """Test pool stats are admin-only and empty without a pooled database"""
+        user = User.objects.create_user(username='pooluser', email='pool@example.com', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/system/database-pool/').status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get('/api/system/database-pool/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pools'], {})
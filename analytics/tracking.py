@@ -0,0 +1,115 @@
+"""
+Tracking event ingestion shared by the sync and async batch endpoints.
+
+A batch is validated event by event, turned into unsaved PageView and
+ProductView rows, and stored with one bulk insert per model plus the
+rollup and trending updates that bulk_create would otherwise skip.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+
+from .models import (
+    PageView, PageViewRollup, ProductTrendingScore, ProductView, ProductViewRollup, DashboardCounter,
+    COUNTER_PAGE_VIEWS, COUNTER_PRODUCT_VIEWS,
+)
+from .serializers import TrackingEventSerializer
+
+
+class BatchError(ValueError):
+    pass
+
+
+class BeaconSessionAuthentication(SessionAuthentication):
+    """
+    Session authentication without the CSRF check. navigator.sendBeacon on
+    page unload cannot send a CSRF token, and a forged request can only add
+    view events for the signed-in user.
+    """
+    def enforce_csrf(self, request):
+        return
+
+
+# Authentication for the batch endpoints, which accept beacon posts.
+TRACKING_AUTHENTICATION_CLASSES = [TokenAuthentication, BeaconSessionAuthentication]
+
+
+def validate_events(events, max_events):
+    """
+    Returns ([(index, validated data)], [rejections]) for a batch, raising
+    BatchError if it is not a list or holds more than `max_events` events.
+    """
+    if not isinstance(events, list):
+        raise BatchError('Expected a list of events')
+    if len(events) > max_events:
+        raise BatchError(f'A batch may contain at most {max_events} events')
+
+    valid, rejected = [], []
+    for index, event in enumerate(events):
+        serializer = TrackingEventSerializer(data=event)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            rejected.append({'index': index, 'errors': serializer.errors})
+    return valid, rejected
+
+
+def product_ids(valid):
+    return {data['product'] for _, data in valid if data['type'] == 'product_view'}
+
+
+def build_views(valid, existing_ids, user, remote_addr, user_agent):
+    """
+    Builds unsaved PageView and ProductView rows for validated events.
+    Returns (page_views, product_views, rejections for unknown products).
+    """
+    now = timezone.now()
+    page_views, product_views, rejected = [], [], []
+    for index, data in valid:
+        common = {
+            'user': user,
+            'session_id': data.get('session_id'),
+            'ip_address': data.get('ip_address') or remote_addr,
+            'created_at': data.get('created_at') or now,
+        }
+        if data['type'] == 'page_view':
+            page_views.append(PageView(
+                page_url=data['page_url'],
+                page_title=data['page_title'],
+                user_agent=data['user_agent'] or user_agent,
+                **common
+            ))
+        elif data['product'] in existing_ids:
+            product_views.append(ProductView(
+                product_id=data['product'],
+                view_duration=data['view_duration'],
+                **common
+            ))
+        else:
+            rejected.append({'index': index, 'errors': {'product': ['Invalid product.']}})
+    return page_views, product_views, rejected
+
+
+def store_views(page_views, product_views):
+    with transaction.atomic():
+        PageView.objects.bulk_create(page_views)
+        ProductView.objects.bulk_create(product_views)
+        # bulk_create skips post_save, so feed the rollups explicitly.
+        PageViewRollup.objects.record(page_views)
+        ProductViewRollup.objects.record(product_views)
+        ProductTrendingScore.objects.record(product_views)
+        DashboardCounter.objects.increment(COUNTER_PAGE_VIEWS, len(page_views))
+        DashboardCounter.objects.increment(COUNTER_PRODUCT_VIEWS, len(product_views))
+
+
+def batch_result(page_views, product_views, rejected):
+    """Returns the (payload, status code) reported for a stored batch."""
+    accepted = len(page_views) + len(product_views)
+    return {
+        'accepted': {
+            'page_views': len(page_views),
+            'product_views': len(product_views),
+        },
+        'rejected': sorted(rejected, key=lambda item: item['index']),
+    }, status.HTTP_201_CREATED if accepted or not rejected else status.HTTP_400_BAD_REQUEST
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PageViewViewSet, ProductViewViewSet, SalesReportViewSet
+from .views import (
+    PageViewViewSet, ProductViewViewSet, SalesReportViewSet,
+    TrackingEventBatchView, AsyncTrackingEventBatchView, AnalyticsExportView
+)
 
 router = DefaultRouter()
 router.register(r'page-views', PageViewViewSet, basename='page-views')
@@ -13,6 +16,9 @@ router.register(r'sales-reports', SalesReportViewSet, basename='sales-reports')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/batch/', TrackingEventBatchView.as_view(), name='events-batch'),
+    path('async/events/batch/', AsyncTrackingEventBatchView.as_view(), name='events-batch-async'),
+    path('export/<str:dataset>/', AnalyticsExportView.as_view(), name='analytics-export'),
     # Dashboard-like actions that the tests might expect at the top level
     path('dashboard-stats/', SalesReportViewSet.as_view({'get': 'dashboard_stats'}), name='dashboard-stats'),
     path('trending-products/', SalesReportViewSet.as_view({'get': 'trending_products'}), name='trending-products'),
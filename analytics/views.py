@@ -1,13 +1,31 @@
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from django.db.models import Sum, Count, Avg
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils import timezone
-from .models import PageView, ProductView, SalesReport
-from .serializers import PageViewSerializer, ProductViewSerializer, SalesReportSerializer
+from .models import (
+    PageView, ProductView, SalesReport, ProductViewRollup,
+    ProductTrendingScore, UserBehaviorReport, DashboardCounter, TRENDING_HALF_LIVES, TRENDING_DEFAULT_WINDOW,
+    COUNTER_ORDERS, COUNTER_PAGE_VIEWS, COUNTER_PRODUCT_VIEWS, COUNTER_REVENUE_CENTS,
+)
+from .exports import EXPORT_DATASETS, export_rows
+from .tracking import (
+    TRACKING_AUTHENTICATION_CLASSES, BatchError, batch_result, build_views, product_ids, store_views,
+    validate_events,
+)
+from .parsers import NDJSONParser
+from .serializers import (
+    PageViewSerializer, ProductViewSerializer, SalesReportSerializer
+)
 from products.models import Product
-from orders.models import Order
+from alcom_project.asyncviews import AsyncAPIView
+from alcom_project.exports import streaming_export_response
 from decimal import Decimal
+from datetime import date, timedelta
 
 class PageViewViewSet(viewsets.ModelViewSet):
     queryset = PageView.objects.all()
@@ -40,6 +58,95 @@ class ProductViewViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+class TrackingEventBatchView(APIView):
+    """
+    Accepts a JSON array or NDJSON stream of mixed page/product view events
+    and stores them with one bulk insert per model.
+    """
+    authentication_classes = TRACKING_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser, NDJSONParser]
+    max_events = 500
+
+    def post(self, request):
+        try:
+            valid, rejected = validate_events(request.data, self.max_events)
+        except BatchError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        existing_ids = set(Product.objects.filter(id__in=product_ids(valid)).values_list('id', flat=True))
+        page_views, product_views, unknown = build_views(
+            valid, existing_ids,
+            request.user if request.user.is_authenticated else None,
+            request.META.get('REMOTE_ADDR'), request.META.get('HTTP_USER_AGENT', ''),
+        )
+        store_views(page_views, product_views)
+        payload, status_code = batch_result(page_views, product_views, rejected + unknown)
+        return Response(payload, status=status_code)
+
+class AsyncTrackingEventBatchView(AsyncAPIView):
+    """
+    Async variant of TrackingEventBatchView for ASGI deployments: the
+    product lookup uses the async ORM and the inserts run in a worker
+    thread, so waiting on the database does not hold the event loop.
+    """
+    authentication_classes = TRACKING_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser, NDJSONParser]
+    max_events = TrackingEventBatchView.max_events
+
+    async def post(self, request):
+        try:
+            valid, rejected = validate_events(request.data, self.max_events)
+        except BatchError as e:
+            return self.respond({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        existing_ids = {
+            pk async for pk in Product.objects.filter(id__in=product_ids(valid)).values_list('id', flat=True)
+        }
+        page_views, product_views, unknown = build_views(
+            valid, existing_ids,
+            request.user if request.user.is_authenticated else None,
+            request.META.get('REMOTE_ADDR'), request.META.get('HTTP_USER_AGENT', ''),
+        )
+        await sync_to_async(store_views)(page_views, product_views)
+        payload, status_code = batch_result(page_views, product_views, rejected + unknown)
+        return self.respond(payload, status_code)
+
+class AnalyticsExportView(APIView):
+    """
+    Streams a dataset (page_views, product_views, orders, order_items) for
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD as gzipped CSV (?compression=none for
+    plain CSV) without loading it into memory.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, dataset):
+        if dataset not in EXPORT_DATASETS:
+            return Response(
+                {'error': f"dataset must be one of: {', '.join(EXPORT_DATASETS)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            start = date.fromisoformat(request.query_params['start'])
+            end = date.fromisoformat(request.query_params.get('end', request.query_params['start']))
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'start (and optionally end) must be given as YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'error': 'start must not be after end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        columns, rows = export_rows(dataset, start, end)
+        return streaming_export_response(
+            columns, rows, f'{dataset}_{start}_{end}',
+            compress=request.query_params.get('compression', 'gzip') != 'none',
+        )
+
 class SalesReportViewSet(viewsets.ModelViewSet):
     queryset = SalesReport.objects.all()
     serializer_class = SalesReportSerializer
@@ -47,67 +154,117 @@ class SalesReportViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='generate-daily-report')
     def generate_daily_report(self, request):
+        """
+        Provisional report for today. Finished days are closed by the
+        scheduled close_sales_reports job, which this also catches up on.
+        """
+        SalesReport.objects.close_days()
         today = timezone.now().date()
-        orders_today = Order.objects.filter(created_at__date=today)
-        
-        total_revenue = orders_today.aggregate(Sum('total_amount'))['total_amount__sum'] or Decimal('0.00')
-        total_orders = orders_today.count()
-        total_customers = orders_today.values('user').distinct().count()
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else Decimal('0.00')
-        
-        report, created = SalesReport.objects.update_or_create(
-            report_date=today,
-            defaults={
-                'total_revenue': total_revenue,
-                'total_orders': total_orders,
-                'total_customers': total_customers,
-                'average_order_value': avg_order_value,
-            }
-        )
-        
+        report, = SalesReport.objects.materialize(today, today)
+
         return Response({
             'report_generated': True,
             'report_date': today,
-            'total_revenue': total_revenue,
-            'total_orders': total_orders
+            'total_revenue': report.total_revenue,
+            'total_orders': report.total_orders,
+            'total_customers': report.total_customers,
+            'products_sold': report.products_sold,
+            'new_customers': report.new_customers,
         })
 
     @action(detail=False, methods=['get'], url_path='dashboard-stats')
     def dashboard_stats(self, request):
+        # One small grouped read of the maintained counters.
+        counters = DashboardCounter.objects.totals()
         stats = {
-            'total_page_views': PageView.objects.count(),
-            'total_product_views': ProductView.objects.count(),
-            'total_revenue': SalesReport.objects.aggregate(Sum('total_revenue'))['total_revenue__sum'] or 0,
-            'total_orders': SalesReport.objects.aggregate(Sum('total_orders'))['total_orders__sum'] or 0,
+            'total_page_views': counters[COUNTER_PAGE_VIEWS],
+            'total_product_views': counters[COUNTER_PRODUCT_VIEWS],
+            'total_revenue': Decimal(counters[COUNTER_REVENUE_CENTS]) / 100,
+            'total_orders': counters[COUNTER_ORDERS],
         }
         return Response(stats)
 
     @action(detail=False, methods=['get'], url_path='trending-products')
     def trending_products(self, request):
-        # We'll use the manager method we implemented
-        popular_views = ProductView.objects.get_popular_products(limit=10)
-        data = []
-        for view in popular_views:
-            if view.product:
-                data.append({
-                    'id': view.product.id,
-                    'name': view.product.name,
-                    'view_count': ProductView.objects.filter(product=view.product).count()
-                })
+        window = request.query_params.get('window', TRENDING_DEFAULT_WINDOW)
+        if window not in TRENDING_HALF_LIVES:
+            return Response(
+                {'error': f"window must be one of: {', '.join(TRENDING_HALF_LIVES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            limit = 10
+
+        top = ProductTrendingScore.objects.top(window=window, limit=limit)
+        view_counts = dict(ProductViewRollup.objects.for_period().filter(
+            product_id__in=[row.product_id for row in top]
+        ).values('product_id').annotate(total=Sum('views')).values_list('product_id', 'total'))
+        data = [
+            {
+                'id': row.product_id,
+                'name': row.product.name,
+                'view_count': view_counts.get(row.product_id, 0),
+                'score': round(row.score, 4),
+            }
+            for row in top
+        ]
         return Response(data)
 
     @action(detail=False, methods=['get'], url_path='revenue-analytics')
     def revenue_analytics(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            days = 30
+        today = timezone.now().date()
+
+        daily = SalesReport.objects.filter(
+            report_date__gt=today - timedelta(days=days)
+        ).order_by('report_date').values('report_date', 'total_revenue', 'total_orders')
+        daily_revenue = [
+            {'date': row['report_date'], 'revenue': row['total_revenue'], 'orders': row['total_orders']}
+            for row in daily
+        ]
+
+        def summarize(trunc, since):
+            rows = SalesReport.objects.filter(report_date__gte=since).annotate(
+                period=trunc('report_date')
+            ).values('period').annotate(
+                revenue=Sum('total_revenue'), orders=Sum('total_orders')
+            ).order_by('period')
+            return [
+                {
+                    'period': row['period'],
+                    'revenue': row['revenue'],
+                    'orders': row['orders'],
+                    'average_order_value': (row['revenue'] / row['orders']).quantize(Decimal('0.01'))
+                    if row['orders'] else Decimal('0.00'),
+                }
+                for row in rows
+            ]
+
+        weekly_trend = summarize(TruncWeek, today - timedelta(weeks=12))
+        previous = None
+        for week in weekly_trend:
+            week['change'] = (
+                ((week['revenue'] - previous) / previous * 100).quantize(Decimal('0.01'))
+                if previous else None
+            )
+            previous = week['revenue']
+
         return Response({
-            'daily_revenue': [],
-            'weekly_trend': [],
-            'monthly_summary': []
+            'daily_revenue': daily_revenue,
+            'weekly_trend': weekly_trend,
+            'monthly_summary': summarize(TruncMonth, today.replace(day=1) - timedelta(days=365)),
         })
 
     @action(detail=False, methods=['get'], url_path='user-behavior')
     def user_behavior(self, request):
-        return Response({
-            'average_session_duration': 0,
-            'page_views_per_session': 0,
-            'conversion_rate': 0
-        })
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            days = 30
+        today = timezone.now().date()
+        return Response(UserBehaviorReport.objects.summary(today - timedelta(days=days - 1), today))
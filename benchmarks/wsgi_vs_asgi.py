@@ -0,0 +1,123 @@
+"""
+Compares the sync endpoints served by gunicorn (WSGI) with their async
+variants served by uvicorn workers (ASGI) under concurrent load.
+
+Start both servers against the same database, e.g.:
+
+    gunicorn alcom_project.wsgi -c gunicorn.conf.py -b 127.0.0.1:8000
+    GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker \\
+        gunicorn alcom_project.asgi -c gunicorn.conf.py -b 127.0.0.1:8001
+
+then run:
+
+    python benchmarks/wsgi_vs_asgi.py --token <api token> --concurrency 64 --requests 2000
+
+Each scenario sends the same requests to the sync path on the WSGI server
+and to the async path on the ASGI server, and reports throughput and
+latency percentiles. Only the standard library is used, so the client can
+run anywhere.
+
+The payment scenario needs --order and --payment-method (a method named
+Stripe owned by the token's user). Run both servers with
+PAYMENT_GATEWAY=fake and e.g. FAKE_GATEWAY_LATENCY_MS=200 to measure
+payment throughput without network access.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def tracking_batch(size=20):
+    return [
+        {'type': 'page_view', 'page_url': f'/benchmark/{index}', 'session_id': 'benchmark'}
+        for index in range(size)
+    ]
+
+
+# name -> (method, sync path, async path, JSON body)
+SCENARIOS = {
+    'cart': ('GET', '/api/cart/carts/my_cart/', '/api/cart/async/cart/', None),
+    'tracking': ('POST', '/api/analytics/events/batch/', '/api/analytics/async/events/batch/', tracking_batch()),
+}
+
+
+def send(url, method, body, token, timeout):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    request.add_header('Content-Type', 'application/json')
+    if token:
+        request.add_header('Authorization', f'Token {token}')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run(url, method, body, token, concurrency, total, timeout):
+    """Sends `total` requests from `concurrency` threads and returns the results."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        elapsed, ok = send(url, method, body, token, timeout)
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests/s': total / wall,
+        'p50 ms': statistics.median(latencies) * 1000,
+        'p95 ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'p99 ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help='Base URL of the WSGI server')
+    parser.add_argument('--asgi', default='http://127.0.0.1:8001', help='Base URL of the ASGI server')
+    parser.add_argument('--token', default='', help='API token used for authenticated scenarios')
+    parser.add_argument(
+        '--scenario', action='append', choices=[*SCENARIOS, 'payment'], help='Scenarios to run (default: all)'
+    )
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--order', type=int, help='Order id used by the payment scenario')
+    parser.add_argument('--payment-method', type=int, help='Payment method id used by the payment scenario')
+    options = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if options.order and options.payment_method:
+        body = {'order': options.order, 'payment_method': options.payment_method, 'amount': '10.00'}
+        scenarios['payment'] = ('POST', '/api/payments/payments/', '/api/payments/async/payments/', body)
+    elif 'payment' in (options.scenario or []):
+        parser.error('the payment scenario needs --order and --payment-method')
+
+    columns = ('requests/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors')
+    print(f"{'scenario':<10} {'mode':<5} " + ' '.join(f'{column:>11}' for column in columns))
+    for name in options.scenario or scenarios:
+        method, sync_path, async_path, body = scenarios[name]
+        for mode, url in (('wsgi', options.wsgi + sync_path), ('asgi', options.asgi + async_path)):
+            result = run(url, method, body, options.token, options.concurrency, options.requests, options.timeout)
+            print(f'{name:<10} {mode:<5} ' + ' '.join(f'{result[column]:>11.1f}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -227,6 +227,32 @@ class CartAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class AsyncCartAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asynccart', email='asynccart@example.com', password='testpass123')
+        category = Category.objects.create(name='Test', slug='test')
+        brand = Brand.objects.create(name='AsyncCartBrand', description='Brand')
+        product = Product.objects.create(
+            name='Async Cart Product', slug='async-cart-product', base_price=Decimal('12.50'),
+            category=category, brand=brand, stock=5
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+    def test_async_cart_matches_sync_cart(self):
+        """Test the async cart read returns the same payload as the sync one"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/cart/async/cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.client.get('/api/cart/carts/my_cart/').json())
+        self.assertEqual(response.json()['total_price'], 25.0)
+
+    def test_async_cart_requires_authentication(self):
+        """Test anonymous users get the same 401 as from DRF views"""
+        response = self.client.get('/api/cart/async/cart/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
 class CouponAPITests(APITestCase):
     def setUp(self):
         self.client = APIClient()
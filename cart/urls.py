@@ -1,7 +1,7 @@
 # cart/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CartViewSet, CartItemViewSet, CouponViewSet
+from .views import AsyncCartView, CartViewSet, CartItemViewSet, CouponViewSet
 
 router = DefaultRouter()
 router.register(r'carts', CartViewSet, basename='carts')
@@ -9,5 +9,6 @@ router.register(r'cart-items', CartItemViewSet, basename='cart-items')
 router.register(r'coupons', CouponViewSet, basename='coupons')
 
 urlpatterns = [
+    path('async/cart/', AsyncCartView.as_view(), name='cart-async'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -3,6 +3,9 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, aprefetch_related_objects
+from alcom_project.asyncviews import AsyncAPIView
 from .models import Cart, CartItem, Coupon
 from .serializers import CartSerializer, CartItemSerializer, CouponSerializer
 
@@ -70,6 +73,22 @@ class CartViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
 
+class AsyncCartView(AsyncAPIView):
+    """
+    Async read of the user's cart for ASGI deployments. The cart and its
+    items are loaded with the async ORM; the nested product serializer
+    still queries per product, so serialization runs in a worker thread.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        cart, _ = await Cart.objects.select_related('coupon').aget_or_create(user=request.user)
+        await aprefetch_related_objects([cart], Prefetch(
+            'items', queryset=CartItem.objects.select_related('product__category', 'product__brand')
+        ))
+        data = await sync_to_async(lambda: CartSerializer(cart, context={'request': request}).data)()
+        return self.respond(data)
+
 class CartItemViewSet(viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
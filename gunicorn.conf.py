@@ -0,0 +1,19 @@
+"""
+Gunicorn settings. Workers and threads come from the same environment
+variables that size the database connection pool in settings.py, so each
+request thread can hold one pooled connection.
+"""
+from decouple import config
+
+workers = config('WEB_CONCURRENCY', default=2, cast=int)
+threads = config('GUNICORN_THREADS', default=4, cast=int)
+# Set GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker to serve
+# alcom_project.asgi instead of alcom_project.wsgi.
+worker_class = config('GUNICORN_WORKER_CLASS', default='gthread' if threads > 1 else 'sync')
+timeout = config('GUNICORN_TIMEOUT', default=30, cast=int)
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot accumulate.
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,36 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the database queue. Serves every queue in "
+        "JOB_QUEUES (or those given with --queue) with its concurrency limit "
+        "until stopped, or until no job is due with --burst."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', help="Queue to serve (repeatable)")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due")
+        parser.add_argument('--no-schedule', action='store_true', help="Do not queue periodic tasks")
+
+    def handle(self, *args, **options):
+        names = options['queues'] or list(settings.JOB_QUEUES)
+        unknown = set(names) - set(settings.JOB_QUEUES)
+        if unknown:
+            raise CommandError(f"Unknown queue(s): {', '.join(sorted(unknown))}")
+        worker = Worker({name: settings.JOB_QUEUES[name] for name in names}, schedule=not options['no_schedule'])
+
+        if options['burst']:
+            processed = worker.run_burst()
+        else:
+            # Let running jobs finish on shutdown.
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: worker.stop())
+            self.stdout.write(f"Worker {worker.name} serving {', '.join(names)}")
+            processed = worker.run()
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} job(s)."))
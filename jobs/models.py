@@ -0,0 +1,165 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.conf import settings
+from django.utils import timezone
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_CHOICES = [
+    ('QUEUED', 'Queued'),
+    ('RUNNING', 'Running'),
+    ('SUCCEEDED', 'Succeeded'),
+    ('FAILED', 'Failed'),
+]
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the `attempts`-th failed run, capped at JOB_RETRY_BACKOFF_MAX."""
+    seconds = settings.JOB_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.JOB_RETRY_BACKOFF_MAX))
+
+
+class JobManager(models.Manager):
+    def _build(self, task, args=(), kwargs=None, run_at=None, priority=None, unique_key=None):
+        return self.model(
+            queue=task.queue,
+            task=task.name,
+            args=list(args),
+            kwargs=kwargs or {},
+            priority=task.priority if priority is None else priority,
+            run_at=run_at or timezone.now(),
+            max_attempts=task.max_attempts,
+            unique_key=unique_key,
+        )
+
+    def enqueue(self, task, args=(), kwargs=None, run_at=None, priority=None):
+        job = self._build(task, args, kwargs, run_at, priority)
+        job.save()
+        return job
+
+    def enqueue_many(self, task, arguments):
+        return self.bulk_create([self._build(task, args) for args in arguments], batch_size=500)
+
+    def enqueue_periodic(self, tasks, now=None):
+        """
+        Queues the current period's run of each periodic task. A run that is
+        already queued (by this or another worker) is left alone.
+        """
+        now = now or timezone.now()
+        jobs = []
+        for task in tasks:
+            start = task.period_start(now)
+            jobs.append(self._build(task, run_at=start, unique_key=f'{task.name}@{start.isoformat()}'))
+        self.bulk_create(jobs, ignore_conflicts=True)
+
+    def claim(self, queue, concurrency, worker, now=None):
+        """
+        Marks the next due jobs of `queue` as running on `worker` and returns
+        them, highest priority then oldest first. At most `concurrency` jobs
+        of the queue run at once, counting those already running on any
+        worker; rows another worker is claiming are skipped. Two workers
+        claiming the same queue at the same moment can overshoot the limit
+        by one claim.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            free = concurrency - self.filter(queue=queue, status='RUNNING').count()
+            if free <= 0:
+                return []
+            jobs = list(
+                self.filter(queue=queue, status='QUEUED', run_at__lte=now)
+                .order_by('-priority', 'run_at', 'id')
+                .select_for_update(skip_locked=True)[:free]
+            )
+            for job in jobs:
+                job.status = 'RUNNING'
+                job.attempts += 1
+                job.worker = worker
+                job.started_at = now
+            self.bulk_update(jobs, ['status', 'attempts', 'worker', 'started_at'])
+        return jobs
+
+    def requeue_stale(self, timeout, now=None):
+        """
+        Puts back jobs that have been running for longer than `timeout`
+        (their worker died or hung), or fails them when they are out of
+        attempts. Returns the number of jobs changed.
+        """
+        now = now or timezone.now()
+        stale = self.filter(status='RUNNING', started_at__lt=now - timeout)
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status='FAILED', finished_at=now, last_error='Timed out.'
+        )
+        return failed + stale.update(status='QUEUED', run_at=now, last_error='Timed out.')
+
+    def purge(self, before):
+        """Deletes succeeded jobs that finished before `before`."""
+        return self.filter(status='SUCCEEDED', finished_at__lt=before).delete()[0]
+
+class Job(models.Model):
+    """
+    A deferred call of a registered task, run by `manage.py run_jobs`.
+    """
+    queue = models.CharField(max_length=50)
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+    status = models.CharField(max_length=20, choices=JOB_STATUS_CHOICES, default='QUEUED')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    unique_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                F('queue'), F('priority').desc(), F('run_at'), name='job_queued_idx',
+                condition=Q(status='QUEUED'),
+            ),
+            models.Index(fields=['queue', 'started_at'], name='job_running_idx', condition=Q(status='RUNNING')),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
+
+    def run(self):
+        """Runs the task of a claimed job and records the outcome. Returns True on success."""
+        try:
+            get_task(self.task)(*self.args, **self.kwargs)
+        except Exception:
+            logger.exception("Job %s (%s) failed", self.pk, self.task)
+            self.fail(traceback.format_exc())
+            return False
+        self.succeed()
+        return True
+
+    def succeed(self):
+        self.status = 'SUCCEEDED'
+        self.finished_at = timezone.now()
+        self.last_error = ''
+        self.save(update_fields=['status', 'finished_at', 'last_error'])
+
+    def fail(self, error):
+        """Queues a retry after a backoff delay, or fails the job when it is out of attempts."""
+        now = timezone.now()
+        self.last_error = error
+        if self.attempts < self.max_attempts:
+            self.status = 'QUEUED'
+            self.run_at = now + retry_delay(self.attempts)
+        else:
+            self.status = 'FAILED'
+            self.finished_at = now
+        self.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
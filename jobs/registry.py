@@ -0,0 +1,93 @@
+"""
+Task registry for the background job queue.
+
+Functions decorated with ``@task`` in an app's ``tasks.py`` are run by
+``manage.py run_jobs``. Calling a task runs it inline; ``.defer()`` stores
+a Job row instead. The row is written in the caller's transaction, so a
+rolled-back request leaves no job behind and a worker never picks up a job
+before the rows it refers to are committed. Arguments must be
+JSON-serializable: pass primary keys, not model instances.
+
+Tasks declared with ``every`` are periodic. Workers enqueue one job per
+period, starting ``offset`` after midnight UTC; the period's unique key
+keeps several workers from enqueuing it twice.
+"""
+import functools
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+# Periods of periodic tasks are counted from this (UTC) midnight.
+SCHEDULE_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, queue, priority, max_attempts, every, offset):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.every = every
+        self.offset = offset
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def defer(self, *args, **kwargs):
+        """Queues one run of the task with these arguments."""
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, run_at=None, delay=None, priority=None):
+        """Queues one run at `run_at` or after `delay`, optionally with another priority."""
+        from .models import Job
+
+        if delay is not None:
+            run_at = timezone.now() + delay
+        return Job.objects.enqueue(self, args, kwargs, run_at=run_at, priority=priority)
+
+    def defer_many(self, arguments):
+        """Queues one run per args tuple in `arguments` with a single insert."""
+        from .models import Job
+
+        return Job.objects.enqueue_many(self, arguments)
+
+    def period_start(self, now):
+        """Returns the start of the period of a periodic task that contains `now`."""
+        return now - (now - SCHEDULE_EPOCH - self.offset) % self.every
+
+
+def task(queue='default', priority=0, max_attempts=3, every=None, offset=timedelta(0), name=None):
+    """
+    Registers the decorated function as a task on `queue`. Jobs with a
+    higher `priority` run first. Failed runs are retried with exponential
+    backoff until `max_attempts` runs have been made.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        if task_name in _registry:
+            raise ImproperlyConfigured(f'Task {task_name} is registered twice.')
+        _registry[task_name] = Task(func, task_name, queue, priority, max_attempts, every, offset)
+        return _registry[task_name]
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Unknown task: {name}')
+
+
+def periodic_tasks(queues=None):
+    return [
+        task for task in _registry.values()
+        if task.every is not None and (queues is None or task.queue in queues)
+    ]
@@ -0,0 +1,13 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+from .registry import task
+
+
+@task(queue='default', every=timedelta(days=1), offset=timedelta(hours=3))
+def purge_finished_jobs():
+    """Deletes succeeded jobs older than JOB_RETENTION_DAYS; failed jobs are kept for inspection."""
+    Job.objects.purge(timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS))
@@ -0,0 +1,132 @@
+# jobs/tests.py
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from .models import Job
+from .registry import task
+from .worker import Worker
+
+calls = []
+
+
+@task(queue='default', name='jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(queue='default', max_attempts=2, name='jobs.tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+@task(queue='reports', every=timedelta(days=1), offset=timedelta(hours=2), name='jobs.tests.nightly')
+def nightly():
+    calls.append('nightly')
+
+
+@override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=15)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_jobs(self, queues=None):
+        return Worker(queues or {'default': 2}, name='test', schedule=False).run_burst()
+
+    def test_defer_is_part_of_the_callers_transaction(self):
+        """Test a deferred job is stored with the transaction and dropped on rollback"""
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                record.defer('rolled back')
+                raise ValueError
+        record.defer('kept')
+        self.assertEqual(list(Job.objects.values_list('args', flat=True)), [['kept']])
+
+        self.assertEqual(self.run_jobs(), 1)
+        self.assertEqual(calls, ['kept'])
+        self.assertEqual(Job.objects.get().status, 'SUCCEEDED')
+
+    def test_claim_orders_by_priority_and_respects_concurrency(self):
+        """Test higher priority jobs are claimed first, up to the queue's free slots"""
+        low = record.defer('low')
+        high = record.schedule(('high',), priority=10)
+        other = record.defer('other')
+        self.assertEqual(Job.objects.claim('default', 2, 'a'), [high, low])
+        # Both slots are taken until a running job finishes.
+        self.assertEqual(Job.objects.claim('default', 2, 'b'), [])
+        high.refresh_from_db()
+        high.run()
+        self.assertEqual(Job.objects.claim('default', 2, 'b'), [other])
+
+    def test_scheduled_jobs_wait_until_due(self):
+        """Test a delayed job is not run before its time"""
+        job = record.schedule(('later',), delay=timedelta(minutes=5))
+        self.assertEqual(self.run_jobs(), 0)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(self.run_jobs(), 1)
+        self.assertEqual(calls, ['later'])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Test a failing job is requeued after a backoff and fails once out of attempts"""
+        job = explode.defer()
+        before = timezone.now()
+        self.assertEqual(self.run_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+
+    def test_stale_running_jobs_are_requeued(self):
+        """Test jobs left running by a dead worker go back to the queue"""
+        job = record.defer('lost')
+        Job.objects.claim('default', 1, 'dead-worker')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Job.objects.requeue_stale(timedelta(minutes=15)), 1)
+        self.assertEqual(self.run_jobs(), 1)
+        self.assertEqual(calls, ['lost'])
+
+    def test_periodic_task_is_queued_once_per_period(self):
+        """Test several workers queue a periodic task once per period, at the period start"""
+        now = datetime(2025, 3, 10, 1, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual(nightly.period_start(now), datetime(2025, 3, 9, 2, 0, tzinfo=dt_timezone.utc))
+        for name in ('a', 'b'):
+            Worker({'reports': 1}, name=name).enqueue_periodic(now)
+        Worker({'reports': 1}, name='c').enqueue_periodic(now + timedelta(hours=1))
+        self.assertEqual(
+            list(Job.objects.filter(task='jobs.tests.nightly').order_by('run_at').values_list('run_at', flat=True)),
+            [datetime(2025, 3, 9, 2, 0, tzinfo=dt_timezone.utc), datetime(2025, 3, 10, 2, 0, tzinfo=dt_timezone.utc)],
+        )
+
+    def test_purge_keeps_failed_jobs(self):
+        """Test purging deletes old succeeded jobs only"""
+        record.defer('done')
+        self.run_jobs()
+        Job.objects.create(queue='default', task='jobs.tests.explode', status='FAILED', finished_at=timezone.now())
+        self.assertEqual(Job.objects.purge(timezone.now() + timedelta(seconds=1)), 1)
+        self.assertEqual(Job.objects.get().status, 'FAILED')
+
+
+class RunJobsCommandTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_runs_due_jobs_of_the_queue(self):
+        """Test the worker command runs the deferred jobs of its queues and exits"""
+        record.defer('deferred')
+        out = StringIO()
+        call_command('run_jobs', '--burst', '--no-schedule', '--queue=default', stdout=out)
+        self.assertIn('Ran 1 job(s).', out.getvalue())
+        self.assertEqual(calls, ['deferred'])
+
+    def test_unknown_queue_is_rejected(self):
+        """Test the worker command refuses queues missing from JOB_QUEUES"""
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', '--burst', '--queue=nope', stdout=StringIO())
@@ -0,0 +1,101 @@
+"""
+Worker loop for the background job queue.
+
+A worker serves a set of queues, each with a concurrency limit (see
+``JOB_QUEUES``). Every poll it queues the current run of each periodic
+task, returns stale running jobs to their queue and claims as many due
+jobs per queue as the limit leaves free. Claimed jobs run on a thread pool
+sized to the sum of the limits; a finishing job wakes the loop so its slot
+is refilled without waiting for the next poll.
+
+In burst mode jobs run one at a time in the calling thread until no job
+is due, which suits cron-driven deployments and tests.
+"""
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Job
+from .registry import periodic_tasks
+
+
+class Worker:
+    def __init__(self, queues, name=None, poll_interval=None, timeout=None, schedule=True):
+        self.queues = dict(queues)
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.timeout = timedelta(seconds=settings.JOB_TIMEOUT if timeout is None else timeout)
+        self.schedule = schedule
+        self.processed = 0
+        self._periods = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def enqueue_periodic(self, now):
+        """Queues periodic runs whose period started since the last poll."""
+        due = []
+        for task in periodic_tasks(self.queues):
+            start = task.period_start(now)
+            if self._periods.get(task.name) != start:
+                self._periods[task.name] = start
+                due.append(task)
+        if due:
+            Job.objects.enqueue_periodic(due, now)
+
+    def claim(self):
+        now = timezone.now()
+        if self.schedule:
+            self.enqueue_periodic(now)
+        Job.objects.requeue_stale(self.timeout, now)
+        jobs = []
+        for queue, concurrency in self.queues.items():
+            jobs.extend(Job.objects.claim(queue, concurrency, self.name, now))
+        return jobs
+
+    def run_job(self, job):
+        try:
+            job.run()
+        finally:
+            with self._lock:
+                self.processed += 1
+
+    def _run_in_thread(self, job):
+        try:
+            self.run_job(job)
+        finally:
+            # Pool threads hold their own database connections.
+            close_old_connections()
+            self._wakeup.set()
+
+    def run_burst(self):
+        """Runs due jobs in this thread until none are left. Returns the number run."""
+        while not self._stopping.is_set():
+            jobs = self.claim()
+            if not jobs:
+                break
+            for job in jobs:
+                self.run_job(job)
+        return self.processed
+
+    def run(self):
+        """Polls and runs jobs on a thread pool until stop() is called."""
+        threads = max(1, sum(self.queues.values()))
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job-worker') as pool:
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                close_old_connections()
+                for job in self.claim():
+                    pool.submit(self._run_in_thread, job)
+                self._wakeup.wait(self.poll_interval)
+        return self.processed
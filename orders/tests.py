@@ -66,7 +66,8 @@ class OrderAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Order.objects.count(), 1)
-        self.assertEqual(Order.objects.get().total_amount, Decimal('150.00'))
+        # The total is the items plus shipping; the client's figure is ignored.
+        self.assertEqual(Order.objects.get().total_amount, Decimal('105.00'))
 
     def test_list_orders(self):
         """Test listing user's orders"""
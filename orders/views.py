@@ -3,6 +3,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from decimal import Decimal
 from .models import Order, OrderItem, ShippingMethod
 from .serializers import (
     OrderListSerializer, OrderDetailSerializer, 
@@ -41,25 +43,35 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create order from cart
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        order = serializer.save(user=request.user)
+        # The order, its items and the emptied cart are saved together, so a
+        # failure part-way leaves no order behind.
+        with transaction.atomic():
+            order = serializer.save(user=request.user)
 
-        # Move cart items to order
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price_at_purchase=cart_item.product.base_price,
-                price=cart_item.product.base_price
-            )
+            # Move cart items to order
+            subtotal = Decimal('0.00')
+            for cart_item in cart.items.select_related('product'):
+                OrderItem.objects.create(
+                    order=order,
+                    product=cart_item.product,
+                    quantity=cart_item.quantity,
+                    price_at_purchase=cart_item.product.base_price,
+                    price=cart_item.product.base_price
+                )
+                subtotal += cart_item.product.base_price * cart_item.quantity
+
+            # The total is computed here, not taken from the request.
+            discount = cart.coupon.calculate_discount(subtotal) if cart.coupon and cart.coupon.is_valid() else 0
+            shipping = order.shipping_method.cost if order.shipping_method else 0
+            order.total_amount = subtotal - discount + shipping
+            order.save(update_fields=['total_amount'])
 
-        # Clear cart
-        cart.items.all().delete()
-        cart.coupon = None
-        cart.save()
+            # Clear cart
+            cart.items.all().delete()
+            cart.coupon = None
+            cart.save()
 
         # Return order details
         order_serializer = OrderDetailSerializer(order)
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import Payment, PaymentMethod, Transaction, Refund
+from .models import GatewayEvent, Payment, PaymentMethod, Transaction, Refund
 
 # Register your models here.
 admin.site.register(Payment)
 admin.site.register(PaymentMethod)
 admin.site.register(Transaction)
-admin.site.register(Refund)
\ No newline at end of file
+admin.site.register(Refund)
+admin.site.register(GatewayEvent)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Streaming finance reports over orders, order items, payments, transactions
+and refunds.
+
+Each report is a single joined ``values_list`` query, so related names and
+amounts come back in one pass and rows stream from a server-side cursor on
+PostgreSQL without instantiating models.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from orders.models import Order, OrderItem
+from .models import Payment, Refund, Transaction
+
+# name -> (model, date field, status field, exported columns)
+REPORT_DATASETS = {
+    'orders': (Order, 'created_at', 'status__name', [
+        'id', 'user_id', 'user__email', 'status__name', 'shipping_method__name',
+        'total_amount', 'tracking_number', 'created_at', 'updated_at',
+    ]),
+    'order_items': (OrderItem, 'order__created_at', 'order__status__name', [
+        'id', 'order_id', 'order__status__name', 'product_id', 'product__name',
+        'variant__sku', 'quantity', 'price_at_purchase', 'price', 'order__created_at',
+    ]),
+    'payments': (Payment, 'timestamp', 'status', [
+        'id', 'order_id', 'order__user__email', 'payment_method__name', 'amount',
+        'currency', 'status', 'timestamp',
+    ]),
+    'transactions': (Transaction, 'timestamp', 'payment__status', [
+        'id', 'transaction_id', 'payment_id', 'payment__order_id', 'payment__status',
+        'payment__currency', 'is_success', 'amount', 'timestamp',
+    ]),
+    'refunds': (Refund, 'timestamp', 'status', [
+        'id', 'payment_id', 'payment__order_id', 'payment__amount', 'amount',
+        'status', 'reason', 'timestamp', 'processed_at',
+    ]),
+}
+
+
+def report_rows(dataset, start_date=None, end_date=None, status=None, chunk_size=2000):
+    """
+    Returns (columns, rows) for the `dataset` report, where rows is a lazy
+    iterator of tuples. start_date and end_date are inclusive UTC days and
+    `status` matches the dataset's status field case-insensitively.
+    """
+    model, date_field, status_field, columns = REPORT_DATASETS[dataset]
+    queryset = model.objects.order_by()
+    if start_date:
+        queryset = queryset.filter(**{
+            f'{date_field}__gte': datetime.combine(start_date, time.min, tzinfo=dt_timezone.utc)
+        })
+    if end_date:
+        queryset = queryset.filter(**{
+            f'{date_field}__lt': datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+        })
+    if status:
+        queryset = queryset.filter(**{f'{status_field}__iexact': status})
+    return columns, queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def parse_report_dates(start, end):
+    """Parses optional YYYY-MM-DD strings, raising ValueError if invalid or reversed."""
+    start = date.fromisoformat(start) if start else None
+    end = date.fromisoformat(end) if end else None
+    if start and end and start > end:
+        raise ValueError('start must not be after end')
+    return start, end
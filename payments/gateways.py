@@ -0,0 +1,271 @@
+"""
+Payment gateway clients.
+
+Views talk to a ``PaymentGateway`` instead of a provider SDK. The gateway
+used by this process comes from ``PAYMENT_GATEWAY``:
+
+- ``stripe``: ``StripeGateway``, which reuses one keep-alive HTTP session
+  per process (sized from ``PAYMENT_GATEWAY_POOL_SIZE``), bounds every call
+  with ``PAYMENT_GATEWAY_TIMEOUT`` and lets the Stripe client retry network
+  errors ``PAYMENT_GATEWAY_MAX_RETRIES`` times under an idempotency key.
+- ``fake``: ``FakeGateway``, a deterministic in-process gateway for tests and
+  load tests. It never touches the network; ``FAKE_GATEWAY_LATENCY_MS`` adds
+  a simulated round trip.
+
+Gateways also verify and parse their webhook deliveries into
+``WebhookEvent`` objects, which payments.models.GatewayEvent queues.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class GatewayError(Exception):
+    """Raised when the gateway declines a request or cannot be reached."""
+
+
+@dataclass(frozen=True)
+class Intent:
+    reference: str
+    status: str
+    client_secret: str = ''
+
+    @property
+    def succeeded(self):
+        return self.status == 'succeeded'
+
+
+@dataclass(frozen=True)
+class WebhookEvent:
+    id: str
+    type: str
+    reference: str
+    payload: dict
+
+
+def minor_units(amount):
+    """Converts a Decimal amount to the integer minor units gateways expect."""
+    return int((Decimal(amount) * 100).quantize(Decimal('1')))
+
+
+class PaymentGateway:
+    """
+    Interface implemented by every gateway. `idempotency_key` lets a retried
+    create return the intent made by the first attempt.
+    """
+    name = ''
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        raise NotImplementedError
+
+    def retrieve_intent(self, reference):
+        raise NotImplementedError
+
+    async def acreate_intent(self, amount, currency, metadata, idempotency_key):
+        raise NotImplementedError
+
+    async def aretrieve_intent(self, reference):
+        raise NotImplementedError
+
+    def parse_webhook(self, payload, headers):
+        """
+        Verifies the signature of a webhook delivery (raw body bytes and
+        request headers) and returns its WebhookEvent, raising GatewayError
+        if it is not authentic.
+        """
+        raise NotImplementedError
+
+
+def _payment_intent_event(event):
+    """Builds a WebhookEvent from a Stripe-shaped event dict."""
+    try:
+        return WebhookEvent(
+            id=event['id'], type=event['type'],
+            reference=event['data']['object'].get('id', ''), payload=event,
+        )
+    except (KeyError, TypeError, AttributeError):
+        raise GatewayError('Malformed webhook event.')
+
+
+class StripeGateway(PaymentGateway):
+    name = 'stripe'
+
+    def __init__(self, api_key, timeout, max_retries, pool_size, webhook_secret=''):
+        import requests
+        import stripe
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        try:
+            async_client = stripe.HTTPXClient(timeout=timeout)
+        except ImportError:
+            async_client = None
+        http_client = stripe.RequestsClient(timeout=timeout, session=session, async_fallback_client=async_client)
+        self.stripe = stripe
+        self.client = stripe.StripeClient(api_key, http_client=http_client, max_network_retries=max_retries)
+        self.webhook_secret = webhook_secret
+
+    def _intent(self, intent):
+        return Intent(reference=intent.id, status=intent.status, client_secret=intent.client_secret or '')
+
+    def _params(self, amount, currency, metadata):
+        return {'amount': minor_units(amount), 'currency': currency.lower(), 'metadata': metadata}
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        try:
+            return self._intent(self.client.v1.payment_intents.create(
+                self._params(amount, currency, metadata), {'idempotency_key': idempotency_key}
+            ))
+        except self.stripe.StripeError as e:
+            raise GatewayError(str(e)) from e
+
+    def retrieve_intent(self, reference):
+        try:
+            return self._intent(self.client.v1.payment_intents.retrieve(reference))
+        except self.stripe.StripeError as e:
+            raise GatewayError(str(e)) from e
+
+    async def acreate_intent(self, amount, currency, metadata, idempotency_key):
+        try:
+            return self._intent(await self.client.v1.payment_intents.create_async(
+                self._params(amount, currency, metadata), {'idempotency_key': idempotency_key}
+            ))
+        except self.stripe.StripeError as e:
+            raise GatewayError(str(e)) from e
+
+    async def aretrieve_intent(self, reference):
+        try:
+            return self._intent(await self.client.v1.payment_intents.retrieve_async(reference))
+        except self.stripe.StripeError as e:
+            raise GatewayError(str(e)) from e
+
+    def parse_webhook(self, payload, headers):
+        try:
+            self.stripe.WebhookSignature.verify_header(
+                payload.decode('utf-8'), headers.get('Stripe-Signature', ''), self.webhook_secret
+            )
+            return _payment_intent_event(json.loads(payload))
+        except (self.stripe.SignatureVerificationError, UnicodeDecodeError, ValueError) as e:
+            raise GatewayError(str(e)) from e
+
+
+class FakeGateway(PaymentGateway):
+    """
+    Deterministic gateway kept in process memory. References are derived
+    from the idempotency key, so the same payment always gets the same
+    intent. Amounts with 13 cents (e.g. 10.13) are declined; every other
+    intent succeeds once it is retrieved. Webhooks use Stripe's event shape,
+    signed with an HMAC-SHA256 of the body in the Fake-Signature header;
+    ``webhook()`` builds signed deliveries for tests and load tests.
+    """
+    name = 'fake'
+    declined_cents = 13
+
+    def __init__(self, latency=0, webhook_secret=''):
+        self.latency = latency
+        self.webhook_secret = webhook_secret
+        self.intents = {}
+        self._lock = threading.Lock()
+
+    def _create(self, amount, currency, metadata, idempotency_key):
+        if minor_units(amount) % 100 == self.declined_cents:
+            raise GatewayError('Your card was declined.')
+        reference = 'fake_pi_' + hashlib.sha1(idempotency_key.encode()).hexdigest()[:24]
+        with self._lock:
+            intent = self.intents.setdefault(
+                reference, Intent(reference, 'requires_confirmation', f'{reference}_secret')
+            )
+        return intent
+
+    def _retrieve(self, reference):
+        with self._lock:
+            intent = self.intents.get(reference)
+            if intent is None:
+                raise GatewayError(f'No such payment_intent: {reference}')
+            intent = self.intents[reference] = Intent(reference, 'succeeded', intent.client_secret)
+        return intent
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        time.sleep(self.latency)
+        return self._create(amount, currency, metadata, idempotency_key)
+
+    def retrieve_intent(self, reference):
+        time.sleep(self.latency)
+        return self._retrieve(reference)
+
+    async def acreate_intent(self, amount, currency, metadata, idempotency_key):
+        await asyncio.sleep(self.latency)
+        return self._create(amount, currency, metadata, idempotency_key)
+
+    async def aretrieve_intent(self, reference):
+        await asyncio.sleep(self.latency)
+        return self._retrieve(reference)
+
+    def sign(self, payload):
+        return hmac.new(self.webhook_secret.encode(), payload, hashlib.sha256).hexdigest()
+
+    def webhook(self, event_type, reference, status='succeeded'):
+        """Returns (body, signature) for a payment intent event."""
+        event_id = 'evt_' + hashlib.sha1(f'{event_type}:{reference}'.encode()).hexdigest()[:24]
+        payload = json.dumps({
+            'id': event_id, 'type': event_type,
+            'data': {'object': {'id': reference, 'object': 'payment_intent', 'status': status}},
+        }).encode()
+        return payload, self.sign(payload)
+
+    def parse_webhook(self, payload, headers):
+        if not hmac.compare_digest(self.sign(payload), headers.get('Fake-Signature', '')):
+            raise GatewayError('Invalid webhook signature.')
+        try:
+            event = json.loads(payload)
+        except ValueError as e:
+            raise GatewayError(str(e)) from e
+        return _payment_intent_event(event)
+
+
+def build_gateway(name):
+    if name == StripeGateway.name:
+        return StripeGateway(
+            settings.STRIPE_SECRET_KEY,
+            timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
+            max_retries=settings.PAYMENT_GATEWAY_MAX_RETRIES,
+            pool_size=settings.PAYMENT_GATEWAY_POOL_SIZE,
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+        )
+    if name == FakeGateway.name:
+        return FakeGateway(
+            latency=settings.FAKE_GATEWAY_LATENCY_MS / 1000,
+            webhook_secret=settings.FAKE_GATEWAY_WEBHOOK_SECRET,
+        )
+    raise ValueError(f'Unknown payment gateway: {name}')
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Returns this process's gateway, created on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = build_gateway(settings.PAYMENT_GATEWAY)
+        return _gateway
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    global _gateway
+    if setting.startswith(('PAYMENT_GATEWAY', 'STRIPE_', 'FAKE_GATEWAY')):
+        with _gateway_lock:
+            _gateway = None
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alcom_project.exports import STREAM_FORMATS, gzip_stream, write_chunks
+from payments.exports import REPORT_DATASETS, parse_report_dates, report_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream order, order item, payment, transaction and refund reports to "
+        "CSV or NDJSON files (or stdout), filtered by date and status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reports', nargs='*',
+                            help=f"Reports to export: {', '.join(REPORT_DATASETS)} (default: all)")
+        parser.add_argument('--start', help="First day (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last day (YYYY-MM-DD)")
+        parser.add_argument('--status', help="Only rows with this status")
+        parser.add_argument('--output', choices=list(STREAM_FORMATS), default='csv')
+        parser.add_argument('--output-dir', help="Directory for <report>.<ext>.gz files; writes to stdout if omitted")
+
+    def handle(self, *args, **options):
+        try:
+            start, end = parse_report_dates(options['start'], options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        iterate, _, extension = STREAM_FORMATS[options['output']]
+        reports = options['reports'] or list(REPORT_DATASETS)
+        unknown = set(reports) - set(REPORT_DATASETS)
+        if unknown:
+            raise CommandError(f"Unknown report(s): {', '.join(sorted(unknown))}")
+        if options['output_dir'] is None and len(reports) > 1:
+            raise CommandError("Name a single report when writing to stdout.")
+
+        for report in reports:
+            columns, rows = report_rows(report, start, end, options['status'])
+            chunks = iterate(columns, rows)
+            if options['output_dir'] is None:
+                for chunk in chunks:
+                    self.stdout.write(chunk.decode('utf-8'), ending='')
+                continue
+            os.makedirs(options['output_dir'], exist_ok=True)
+            path = os.path.join(options['output_dir'], f'{report}.{extension}.gz')
+            size = write_chunks(path, gzip_stream(chunks))
+            self.stderr.write(f"Wrote {path} ({size} bytes)")
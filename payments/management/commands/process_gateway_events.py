@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.models import GatewayEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply queued payment gateway webhook events to payments, transactions "
+        "and orders in batches. Runs until the queue is empty, or keeps polling "
+        "with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = GatewayEvent.objects.process_pending(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} gateway event(s)."))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_alter_payment_currency'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='payment',
+            options={'ordering': ['-timestamp']},
+        ),
+        migrations.AlterModelOptions(
+            name='paymentmethod',
+            options={'ordering': ['name']},
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='gateway',
+            field=models.CharField(blank=True, help_text='Gateway that holds the payment intent', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='gateway_reference',
+            field=models.CharField(blank=True, db_index=True, help_text='Payment intent id at the gateway', max_length=255),
+        ),
+    ]
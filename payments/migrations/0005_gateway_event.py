@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_payment_gateway_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatewayEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway', models.CharField(max_length=20)),
+                ('event_id', models.CharField(max_length=255)),
+                ('type', models.CharField(max_length=100)),
+                ('reference', models.CharField(blank=True, help_text='Payment intent id the event is about', max_length=255)),
+                ('payload', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at', 'id'], name='gateway_event_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gateway', 'event_id'), name='unique_gateway_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_gateway_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatewayevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
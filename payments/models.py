@@ -1,6 +1,9 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
 from django.conf import settings
-from orders.models import Order
+from django.db.models import Q
+from django.utils import timezone
+from orders.models import Order, OrderStatus
 
 # 1. PaymentMethod Model
 class PaymentMethod(models.Model):
@@ -35,6 +38,8 @@ class Payment(models.Model):
     currency = models.CharField(max_length=10, default='USD')
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='PENDING')
     timestamp = models.DateTimeField(auto_now_add=True)
+    gateway = models.CharField(max_length=20, blank=True, help_text="Gateway that holds the payment intent")
+    gateway_reference = models.CharField(max_length=255, blank=True, db_index=True, help_text="Payment intent id at the gateway")
 
     class Meta:
         ordering = ['-timestamp']
@@ -44,6 +49,26 @@ class Payment(models.Model):
             return f"Payment of {self.amount} for Order {self.order.id}"
         return f"Payment of {self.amount}"
 
+    @property
+    def uses_gateway(self):
+        return bool(self.payment_method and self.payment_method.name.lower() == 'stripe')
+
+    @property
+    def idempotency_key(self):
+        return f'payment-{self.pk}'
+
+    def gateway_metadata(self):
+        return {'payment_id': self.pk, 'order_id': self.order_id}
+
+    def attach_intent(self, gateway, intent):
+        self.gateway = gateway.name
+        self.gateway_reference = intent.reference
+        self.save(update_fields=['gateway', 'gateway_reference'])
+
+    def mark_failed(self):
+        self.status = 'FAILED'
+        self.save(update_fields=['status'])
+
 # 3. Transaction Model
 class Transaction(models.Model):
     """
@@ -73,4 +98,123 @@ class Refund(models.Model):
     processed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"Refund of {self.amount} for Payment {self.payment.id}"
\ No newline at end of file
+        return f"Refund of {self.amount} for Payment {self.payment.id}"
+
+# 5. GatewayEvent Model
+# Payment status each webhook event type moves a payment to.
+EVENT_PAYMENT_STATUS = {
+    'payment_intent.succeeded': 'COMPLETED',
+    'payment_intent.payment_failed': 'FAILED',
+    'payment_intent.canceled': 'FAILED',
+}
+
+class GatewayEventManager(models.Manager):
+    def enqueue(self, gateway, event):
+        """
+        Stores a verified WebhookEvent for the processor. Redelivered events
+        are ignored, so the receiver stays a single INSERT.
+        """
+        self.bulk_create([self.model(
+            gateway=gateway, event_id=event.id, type=event.type,
+            reference=event.reference, payload=event.payload,
+        )], ignore_conflicts=True)
+
+    def process_pending(self, batch_size=100):
+        """
+        Applies up to `batch_size` unprocessed events, oldest first, with a
+        handful of bulk queries. Succeeded intents complete their payment,
+        record a Transaction keyed on the intent and move the order to
+        Processing; failures only affect payments that are still pending.
+        Events whose payment is not known yet are retried on later runs,
+        with a delay that doubles after each attempt, up to
+        GatewayEvent.MAX_ATTEMPTS times. Returns the number of events
+        handled: applied, given up on or put back for a later attempt.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                self.filter(processed_at__isnull=True, next_attempt_at__lte=now).order_by('received_at', 'id')
+                .select_for_update(skip_locked=True)[:batch_size]
+            )
+            if not events:
+                return 0
+            payments = {
+                (payment.gateway, payment.gateway_reference): payment
+                for payment in Payment.objects.filter(
+                    gateway_reference__in={event.reference for event in events if event.reference}
+                )
+            }
+
+            completed, failed, done, retry = {}, set(), [], []
+            for event in events:
+                new_status = EVENT_PAYMENT_STATUS.get(event.type)
+                payment = payments.get((event.gateway, event.reference))
+                if new_status and payment is None:
+                    event.attempts += 1
+                    event.last_error = 'No payment with this gateway reference.'
+                    event.next_attempt_at = now + GatewayEvent.RETRY_DELAY * 2 ** (event.attempts - 1)
+                    (done if event.attempts >= GatewayEvent.MAX_ATTEMPTS else retry).append(event)
+                    continue
+                if new_status == 'COMPLETED':
+                    completed[payment.pk] = (payment, event)
+                    failed.discard(payment.pk)
+                elif new_status == 'FAILED' and payment.pk not in completed:
+                    failed.add(payment.pk)
+                done.append(event)
+
+            newly_completed = [payment for payment, _ in completed.values() if payment.status != 'COMPLETED']
+            Payment.objects.filter(pk__in=[payment.pk for payment in newly_completed]).update(status='COMPLETED')
+            Transaction.objects.bulk_create([
+                Transaction(
+                    payment=payment, transaction_id=payment.gateway_reference, is_success=True,
+                    amount=payment.amount, response_data={'event_id': event.event_id, 'type': event.type},
+                )
+                for payment, event in completed.values()
+            ], ignore_conflicts=True)
+            order_ids = [payment.order_id for payment in newly_completed if payment.order_id]
+            if order_ids:
+                processing, _ = OrderStatus.objects.get_or_create(name='Processing')
+                Order.objects.filter(pk__in=order_ids).update(status=processing)
+            Payment.objects.filter(pk__in=failed, status='PENDING').update(status='FAILED')
+
+            for event in done:
+                event.processed_at = now
+            self.bulk_update(done + retry, ['processed_at', 'attempts', 'last_error', 'next_attempt_at'])
+        return len(events)
+
+class GatewayEvent(models.Model):
+    """
+    A verified webhook event from the payment gateway, queued by the
+    webhook receiver and applied by the `process_gateway_events` job,
+    which the receiver defers and the worker also runs every minute.
+    """
+    MAX_ATTEMPTS = 5
+    # Delay before the second attempt; it doubles after every further one.
+    RETRY_DELAY = timedelta(seconds=30)
+
+    gateway = models.CharField(max_length=20)
+    event_id = models.CharField(max_length=255)
+    type = models.CharField(max_length=100)
+    reference = models.CharField(max_length=255, blank=True, help_text="Payment intent id the event is about")
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    objects = GatewayEventManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'event_id'], name='unique_gateway_event'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['received_at', 'id'], name='gateway_event_pending_idx',
+                condition=Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
@@ -0,0 +1,11 @@
+from datetime import timedelta
+
+from jobs.registry import task
+from .models import GatewayEvent
+
+
+@task(queue='default', every=timedelta(minutes=1))
+def process_gateway_events(batch_size=100):
+    """Applies the webhook events queued since the last run, batch by batch."""
+    while GatewayEvent.objects.process_pending(batch_size):
+        pass
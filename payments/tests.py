@@ -3,10 +3,21 @@ from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
 from decimal import Decimal
-from orders.models import Order
+from io import StringIO
+import csv
+import gzip
+import json
+from orders.models import Order, OrderStatus
+from .gateways import FakeGateway, GatewayError, StripeGateway, get_gateway
 from accounts.models import Address
-from .models import Payment, PaymentMethod
+from jobs.models import Job
+from jobs.worker import Worker
+from .models import GatewayEvent, Payment, PaymentMethod, Refund, Transaction
+from .tasks import process_gateway_events
 
 User = get_user_model()
 
@@ -154,4 +165,267 @@ class PaymentAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         self.assertEqual(response.data['payment_method'], self.credit_card.id)
-        self.assertEqual(str(response.data['amount']), '99.99')
\ No newline at end of file
+        self.assertEqual(str(response.data['amount']), '99.99')
+
+
+class AsyncPaymentAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncpay', email='asyncpay@example.com', password='testpass123')
+        self.order = Order.objects.create(user=self.user, total_amount=Decimal('99.99'))
+        self.credit_card = PaymentMethod.objects.create(name='Credit Card', description='CC', is_active=True)
+        self.client.force_authenticate(user=self.user)
+
+    def test_async_create_payment(self):
+        """Test creating a payment through the async endpoint"""
+        data = {'order': self.order.id, 'payment_method': self.credit_card.id, 'amount': '99.99'}
+        response = self.client.post('/api/payments/async/payments/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['payment_method_display'], 'Credit Card')
+        self.assertEqual(Payment.objects.get().amount, Decimal('99.99'))
+
+    def test_async_create_validates(self):
+        """Test serializer errors and foreign orders are rejected"""
+        response = self.client.post('/api/payments/async/payments/', {'order': self.order.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('amount', response.json())
+
+        other = User.objects.create_user(username='asyncother', email='asyncother@example.com', password='testpass123')
+        other_order = Order.objects.create(user=other, total_amount=Decimal('5.00'))
+        data = {'order': other_order.id, 'payment_method': self.credit_card.id, 'amount': '5.00'}
+        response = self.client.post('/api/payments/async/payments/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_async_confirm(self):
+        """Test confirming is limited to the user's own Stripe payments"""
+        payment = Payment.objects.create(order=self.order, payment_method=self.credit_card, amount=Decimal('99.99'))
+        response = self.client.post(f'/api/payments/async/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user(username='asyncother', email='asyncother@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.post(f'/api/payments/async/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+@override_settings(PAYMENT_GATEWAY='fake')
+class PaymentGatewayTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='gatewayuser', email='gateway@example.com', password='testpass123')
+        self.order = Order.objects.create(user=self.user, total_amount=Decimal('25.00'))
+        self.stripe = PaymentMethod.objects.create(name='Stripe', description='Cards', is_active=True)
+        self.client.force_authenticate(user=self.user)
+
+    def pay(self, amount, prefix=''):
+        data = {'order': self.order.id, 'payment_method': self.stripe.id, 'amount': amount}
+        return self.client.post(f'/api/payments/{prefix}payments/', data, format='json')
+
+    def deliver(self, event_type, reference, **headers):
+        body, signature = get_gateway().webhook(event_type, reference)
+        headers.setdefault('HTTP_FAKE_SIGNATURE', signature)
+        return self.client.post('/api/payments/webhooks/fake/', body, content_type='application/json', **headers)
+
+    def test_create_and_confirm_through_webhook(self):
+        """Test a gateway payment completes once its succeeded webhook is processed"""
+        response = self.pay('25.00')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.gateway, 'fake')
+        self.assertTrue(payment.gateway_reference.startswith('fake_pi_'))
+        self.assertEqual(response.data['client_secret'], f'{payment.gateway_reference}_secret')
+
+        response = self.client.post(f'/api/payments/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['payment']['status'], 'PENDING')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.deliver('payment_intent.succeeded', payment.gateway_reference)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The receiver deferred a processing job for the event.
+        self.assertEqual(Job.objects.get().task, 'payments.tasks.process_gateway_events')
+        Worker({'default': 1}, name='test', schedule=False).run_burst()
+        self.assertEqual(Job.objects.get().status, 'SUCCEEDED')
+
+        response = self.client.post(f'/api/payments/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status.name, 'Processing')
+        self.assertEqual(Transaction.objects.get().transaction_id, payment.gateway_reference)
+
+    def test_redelivered_webhook_is_applied_once(self):
+        """Test the same gateway event is queued and applied only once"""
+        self.pay('25.00')
+        payment = Payment.objects.get()
+        self.deliver('payment_intent.succeeded', payment.gateway_reference)
+        self.deliver('payment_intent.succeeded', payment.gateway_reference)
+        self.assertEqual(GatewayEvent.objects.count(), 1)
+        self.assertEqual(GatewayEvent.objects.process_pending(), 1)
+
+        # A late redelivery after processing changes nothing either.
+        self.deliver('payment_intent.succeeded', payment.gateway_reference)
+        self.assertEqual(GatewayEvent.objects.process_pending(), 0)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_webhook_rejects_bad_signature_and_other_gateways(self):
+        """Test unsigned deliveries and deliveries for an inactive gateway are refused"""
+        response = self.deliver('payment_intent.succeeded', 'fake_pi_x', HTTP_FAKE_SIGNATURE='forged')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/payments/webhooks/stripe/', b'{}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(GatewayEvent.objects.exists())
+
+    def test_failed_webhook_fails_pending_payment(self):
+        """Test a payment_failed event fails the payment and confirm reports it"""
+        self.pay('25.00')
+        payment = Payment.objects.get()
+        self.deliver('payment_intent.payment_failed', payment.gateway_reference)
+        GatewayEvent.objects.process_pending()
+
+        response = self.client.post(f'/api/payments/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['payment']['status'], 'FAILED')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_event_for_unknown_payment_is_retried(self):
+        """Test events that arrive before their payment are retried, then given up"""
+        self.deliver('payment_intent.succeeded', 'fake_pi_unknown')
+        self.assertEqual(GatewayEvent.objects.process_pending(), 1)
+        # The retry waits for its backoff delay.
+        self.assertEqual(GatewayEvent.objects.process_pending(), 0)
+        event = GatewayEvent.objects.get()
+        self.assertGreater(event.next_attempt_at, timezone.now() + GatewayEvent.RETRY_DELAY / 2)
+
+        for _ in range(GatewayEvent.MAX_ATTEMPTS - 1):
+            GatewayEvent.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(GatewayEvent.objects.process_pending(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, GatewayEvent.MAX_ATTEMPTS)
+        self.assertIsNotNone(event.processed_at)
+
+    def test_retried_event_does_not_block_later_events(self):
+        """Test one run attempts an early unknown event once and still applies newer events"""
+        self.pay('25.00')
+        payment = Payment.objects.get()
+        self.deliver('payment_intent.succeeded', 'fake_pi_unknown')
+        self.deliver('payment_intent.succeeded', payment.gateway_reference)
+
+        process_gateway_events(batch_size=1)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'COMPLETED')
+        unknown = GatewayEvent.objects.get(reference='fake_pi_unknown')
+        self.assertEqual((unknown.attempts, unknown.processed_at), (1, None))
+
+    def test_batch_is_processed_with_constant_queries(self):
+        """Test a batch of events costs the same number of queries as a single event"""
+        OrderStatus.objects.create(name='Processing')
+        references = []
+        for index in range(5):
+            order = Order.objects.create(user=self.user, total_amount=Decimal('25.00'))
+            payment = Payment.objects.create(
+                order=order, payment_method=self.stripe, amount=Decimal('25.00'),
+                gateway='fake', gateway_reference=f'fake_pi_batch{index}',
+            )
+            references.append(payment.gateway_reference)
+        self.deliver('payment_intent.succeeded', references[0])
+        with self.assertNumQueries(9):
+            GatewayEvent.objects.process_pending()
+        for reference in references[1:]:
+            self.deliver('payment_intent.succeeded', reference)
+        with self.assertNumQueries(9):
+            self.assertEqual(GatewayEvent.objects.process_pending(), 4)
+        self.assertEqual(Payment.objects.filter(status='COMPLETED').count(), 5)
+
+    def test_declined_payment_fails(self):
+        """Test a gateway decline marks the payment failed"""
+        response = self.pay('10.13')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Payment.objects.get().status, 'FAILED')
+
+    def test_async_create_and_confirm_through_gateway(self):
+        """Test the async endpoints report the same webhook-driven status"""
+        response = self.pay('25.00', prefix='async/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payment = Payment.objects.get()
+        response = self.client.post(f'/api/payments/async/payments/{payment.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.deliver('payment_intent.succeeded', payment.gateway_reference)
+        GatewayEvent.objects.process_pending()
+        response = self.client.post(f'/api/payments/async/payments/{payment.id}/confirm/')
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+        self.assertTrue(Transaction.objects.filter(payment=payment).exists())
+
+    def test_fake_gateway_is_deterministic(self):
+        """Test the fake gateway derives references from the idempotency key"""
+        gateway = FakeGateway()
+        first = gateway.create_intent(Decimal('5.00'), 'USD', {}, 'payment-1')
+        self.assertEqual(gateway.create_intent(Decimal('5.00'), 'USD', {}, 'payment-1'), first)
+        self.assertNotEqual(gateway.create_intent(Decimal('5.00'), 'USD', {}, 'payment-2'), first)
+        self.assertTrue(gateway.retrieve_intent(first.reference).succeeded)
+        with self.assertRaises(GatewayError):
+            gateway.retrieve_intent('fake_pi_missing')
+        self.assertIsInstance(get_gateway(), FakeGateway)
+
+    def test_stripe_gateway_reuses_bounded_session(self):
+        """Test the Stripe client shares one pooled session with a timeout"""
+        gateway = StripeGateway('sk_test_123', timeout=5, max_retries=2, pool_size=8)
+        http_client = gateway.client._requestor._client
+        self.assertEqual(http_client._timeout, 5)
+        self.assertEqual(http_client._session.get_adapter('https://api.stripe.com')._pool_maxsize, 8)
+
+class ReportExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            username='financeadmin', email='finance@example.com', password='adminpass123'
+        )
+        cls.user = User.objects.create_user(
+            username='financeuser', email='financeuser@example.com', password='testpass123'
+        )
+        order = Order.objects.create(user=cls.user, total_amount=Decimal('50.00'))
+        method = PaymentMethod.objects.create(name='Card')
+        cls.completed = Payment.objects.create(
+            order=order, payment_method=method, amount=Decimal('50.00'), status='COMPLETED'
+        )
+        Payment.objects.create(order=order, payment_method=method, amount=Decimal('5.00'), status='FAILED')
+        Transaction.objects.create(
+            payment=cls.completed, transaction_id='txn_1', is_success=True, amount=Decimal('50.00')
+        )
+        Refund.objects.create(payment=cls.completed, reason='Damaged', amount=Decimal('10.00'))
+
+    def test_payments_csv_is_joined_and_filtered(self):
+        """Test the payments report joins related rows and filters by status"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/api/payments/reports/payments/?status=completed&compression=none')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['order__user__email'], 'financeuser@example.com')
+        self.assertEqual(rows[0]['payment_method__name'], 'Card')
+
+    def test_refunds_ndjson_gzipped(self):
+        """Test the refunds report streams gzipped NDJSON"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/api/payments/reports/refunds/?output=ndjson')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        refund = json.loads(lines[0])
+        self.assertEqual(refund['payment__order_id'], self.completed.order_id)
+        self.assertEqual(refund['amount'], '10.00')
+
+    def test_report_validation_and_permissions(self):
+        """Test bad parameters are rejected and non-admins are forbidden"""
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertEqual(self.client.get('/api/payments/reports/users/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/payments/reports/orders/?start=2025-02-01&end=2025-01-01').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/payments/reports/orders/?output=xml').status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get('/api/payments/reports/orders/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command_to_stdout(self):
+        """Test the command streams a single report to stdout"""
+        out = StringIO()
+        call_command('export_finance_reports', 'transactions', '--output=ndjson', stdout=out, stderr=StringIO())
+        self.assertEqual(json.loads(out.getvalue())['transaction_id'], 'txn_1')
@@ -1,12 +1,19 @@
 # payments/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PaymentViewSet, PaymentMethodViewSet
+from .views import (
+    AsyncPaymentConfirmView, AsyncPaymentCreateView, GatewayWebhookView, PaymentViewSet, PaymentMethodViewSet,
+    ReportExportView
+)
 
 router = DefaultRouter()
 router.register(r'payments', PaymentViewSet, basename='payments')
 router.register(r'payment-methods', PaymentMethodViewSet, basename='payment-methods')
 
 urlpatterns = [
+    path('async/payments/', AsyncPaymentCreateView.as_view(), name='payments-async-create'),
+    path('async/payments/<int:pk>/confirm/', AsyncPaymentConfirmView.as_view(), name='payments-async-confirm'),
+    path('webhooks/<str:gateway>/', GatewayWebhookView.as_view(), name='gateway-webhook'),
+    path('reports/<str:dataset>/', ReportExportView.as_view(), name='report-export'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
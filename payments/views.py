@@ -2,9 +2,17 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-import stripe
-from .models import Payment, PaymentMethod
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.shortcuts import aget_object_or_404
+from alcom_project.asyncviews import AsyncAPIView
+from alcom_project.exports import STREAM_FORMATS, streaming_export_response
+from .exports import REPORT_DATASETS, parse_report_dates, report_rows
+from .gateways import GatewayError, get_gateway
+from .models import GatewayEvent, Payment, PaymentMethod
+from .tasks import process_gateway_events
 from .serializers import PaymentSerializer, PaymentCreateSerializer, PaymentMethodSerializer
 from orders.models import Order
 
@@ -37,61 +45,151 @@ class PaymentViewSet(viewsets.ModelViewSet):
         # Create payment
         payment = serializer.save()
 
-        # Process payment based on method
-        if payment.payment_method and payment.payment_method.name.lower() == 'stripe':
-            # Implement Stripe payment logic
+        if payment.uses_gateway:
+            gateway = get_gateway()
             try:
-                # This is a simplified example
-                intent = stripe.PaymentIntent.create(
-                    amount=int(payment.amount * 100),  # Convert to cents
-                    currency=payment.currency,
-                    metadata={'order_id': order.id}
+                intent = gateway.create_intent(
+                    payment.amount, payment.currency, payment.gateway_metadata(), payment.idempotency_key
                 )
-                payment.stripe_payment_intent_id = intent.id
-                payment.save()
-                
-                return Response({
-                    'client_secret': intent.client_secret,
-                    'payment': PaymentSerializer(payment).data
-                })
-            except stripe.error.StripeError as e:
-                payment.status = 'failed'
-                payment.save()
+            except GatewayError as e:
+                payment.mark_failed()
                 return Response(
                     {'error': str(e)}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            payment.attach_intent(gateway, intent)
+            return Response({
+                'client_secret': intent.client_secret,
+                'payment': PaymentSerializer(payment).data
+            })
 
         return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
+        """
+        Reports whether a gateway payment has completed. The status is set
+        by the webhook processor, so this only reads the database.
+        """
         payment = self.get_object()
-        
-        if payment.payment_method and payment.payment_method.name.lower() == 'stripe':
+        payload, status_code = _confirmation(payment, PaymentSerializer(payment).data)
+        return Response(payload, status=status_code)
+
+def _confirmation(payment, data):
+    """Returns the (payload, status code) of a confirm call for `payment`."""
+    if not payment.uses_gateway or not payment.gateway_reference:
+        return {'error': 'Only gateway payments can be confirmed'}, status.HTTP_400_BAD_REQUEST
+    if payment.status == 'FAILED':
+        return {'error': 'Payment failed', 'payment': data}, status.HTTP_400_BAD_REQUEST
+    if payment.status != 'COMPLETED':
+        return {'detail': 'Payment not completed yet', 'payment': data}, status.HTTP_202_ACCEPTED
+    return data, status.HTTP_200_OK
+
+class GatewayWebhookView(APIView):
+    """
+    Receives webhook deliveries for the configured gateway. The signature
+    is verified and the event queued with a single insert. Once that
+    commits a `process_gateway_events` job is deferred to apply it; the
+    same task also runs every minute to pick up retries and anything a
+    lost job missed.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, gateway):
+        active = get_gateway()
+        if gateway != active.name:
+            return Response({'error': 'Unknown gateway'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            event = active.parse_webhook(request.body, request.headers)
+        except GatewayError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        GatewayEvent.objects.enqueue(active.name, event)
+        transaction.on_commit(process_gateway_events.defer)
+        return Response({'received': True})
+
+_serialize_payment = sync_to_async(lambda payment: PaymentSerializer(payment).data)
+
+class AsyncPaymentCreateView(AsyncAPIView):
+    """
+    Async variant of PaymentViewSet.create for ASGI deployments. The gateway
+    call is awaited, so a request waiting on the gateway does not hold a
+    worker thread.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        serializer = PaymentCreateSerializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+        order = serializer.validated_data['order']
+        if order is None or order.user_id != request.user.id:
+            return self.respond({'error': 'Order not found'}, status.HTTP_400_BAD_REQUEST)
+
+        payment = await sync_to_async(serializer.save)()
+        if payment.uses_gateway:
+            gateway = get_gateway()
             try:
-                intent = stripe.PaymentIntent.retrieve(payment.stripe_payment_intent_id)
-                if intent.status == 'succeeded':
-                    payment.status = 'completed'
-                    payment.save()
-                    
-                    # Update order status
-                    payment.order.status = 'processing'
-                    payment.order.save()
-                    
-                    serializer = PaymentSerializer(payment)
-                    return Response(serializer.data)
-                
-                return Response(
-                    {'error': 'Payment not completed'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            except stripe.error.StripeError as e:
-                return Response(
-                    {'error': str(e)}, 
-                    status=status.HTTP_400_BAD_REQUEST
+                intent = await gateway.acreate_intent(
+                    payment.amount, payment.currency, payment.gateway_metadata(), payment.idempotency_key
                 )
+            except GatewayError as e:
+                await sync_to_async(payment.mark_failed)()
+                return self.respond({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+            await sync_to_async(payment.attach_intent)(gateway, intent)
+            return self.respond({
+                'client_secret': intent.client_secret,
+                'payment': await _serialize_payment(payment)
+            })
+
+        return self.respond(await _serialize_payment(payment), status.HTTP_201_CREATED)
+
+class AsyncPaymentConfirmView(AsyncAPIView):
+    """Async variant of PaymentViewSet.confirm for ASGI deployments; reads the database only."""
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request, pk):
+        payment = await aget_object_or_404(
+            Payment.objects.select_related('payment_method'), pk=pk, order__user=request.user
+        )
+        payload, status_code = _confirmation(payment, await _serialize_payment(payment))
+        return self.respond(payload, status_code)
 
 class PaymentMethodViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = PaymentMethod.objects.filter(is_active=True)
-    serializer_class = PaymentMethodSerializer
\ No newline at end of file
+    serializer_class = PaymentMethodSerializer
+
+class ReportExportView(APIView):
+    """
+    Streams an order/payment report (orders, order_items, payments,
+    transactions, refunds) filtered by ?start=, ?end= (YYYY-MM-DD) and
+    ?status=. ?output=csv|ndjson picks the format and ?compression=none
+    disables gzip.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, dataset):
+        if dataset not in REPORT_DATASETS:
+            return Response(
+                {'error': f"report must be one of: {', '.join(REPORT_DATASETS)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        output = request.query_params.get('output', 'csv')
+        if output not in STREAM_FORMATS:
+            return Response(
+                {'error': f"output must be one of: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start, end = parse_report_dates(
+                request.query_params.get('start'), request.query_params.get('end')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns, rows = report_rows(dataset, start, end, request.query_params.get('status'))
+        basename = '_'.join(str(part) for part in (dataset, start, end) if part)
+        return streaming_export_response(
+            columns, rows, basename, output,
+            compress=request.query_params.get('compression', 'gzip') != 'none',
+        )
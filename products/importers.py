@@ -0,0 +1,446 @@
+"""
+Bulk catalog import from CSV or JSON Lines supplier feeds.
+
+A feed has one row per variant (or per product when ``sku`` is empty):
+
+    slug, name, description, base_price, stock, brand, category, tags,
+    is_active, sku, size, color, variant_price_adjustment, images
+
+A product's rows must be consecutive; a row that returns to a product
+after other products is rejected. Batches never split a product's rows,
+so each product is written, and its ``sync_hash`` computed, from all of
+its rows at once.
+
+``tags`` and ``images`` are ``|``-separated in CSV and may be lists in
+JSONL; ``images`` are paths already present in media storage. Brands,
+categories and tags are resolved by name through in-memory maps (missing
+ones are created), products are upserted on ``slug`` and variants on
+``sku`` with ``bulk_create(update_conflicts=True)``, and tags are linked
+through the M2M through table. Each batch commits on its own, so an
+interrupted import can resume from the last committed row.
+
+Every written product and variant stores a hash of its feed values in
+``sync_hash``; sync mode compares against it to write only changed rows.
+"""
+import csv
+import hashlib
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from alcom_project import images as image_pipeline
+from .models import Brand, Category, Product, ProductImage, ProductVariant, Tag
+
+FEED_FORMATS = ('csv', 'jsonl')
+
+PRODUCT_FIELDS = ('name', 'description', 'base_price', 'stock', 'is_active')
+VARIANT_FIELDS = ('size', 'color', 'variant_price_adjustment')
+LIST_SEPARATOR = '|'
+REQUIRED = object()
+COUNT_KEYS = ('products', 'variants', 'images', 'unchanged', 'deactivated')
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_feed(handle, feed_format):
+    """
+    Yields (row_number, row) from a binary file-like object, where row is a
+    dict, or a ValueError for JSONL lines that cannot be decoded.
+    """
+    text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+    if feed_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row
+        return
+    row_number = 0
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as exc:
+            row = ValueError(f'invalid JSON: {exc}')
+        yield row_number, row
+
+
+def row_hash(values):
+    """Returns a stable hash of a product or variant's imported values."""
+    encoded = json.dumps(values, sort_keys=True, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def product_key(row):
+    """Returns the slug a raw feed row belongs to, or None for unreadable rows."""
+    if not isinstance(row, dict):
+        return None
+    return row.get('slug') or slugify(row.get('name') or '') or None
+
+
+def group_rows(rows):
+    """Yields lists of consecutive (row_number, row) pairs of the same product."""
+    group, key = [], None
+    for number, row in rows:
+        row_key = product_key(row)
+        if group and (row_key is None or row_key != key):
+            yield group
+            group = []
+        group.append((number, row))
+        key = row_key
+    if group:
+        yield group
+
+
+def _split(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _clean(model, name, value):
+    """Runs a model field's to_python and validators without full_clean()."""
+    if isinstance(value, str):
+        value = value.strip()
+    field = model._meta.get_field(name)
+    if field.get_internal_type() == 'BooleanField' and isinstance(value, str):
+        value = value.lower() in ('1', 'true', 'yes', 'y')
+    try:
+        return field.clean(value, None)
+    except ValidationError as exc:
+        raise ValidationError({name: exc.messages})
+
+
+def parse_row(row):
+    """Validates a feed row and returns the cleaned values, raising ValidationError."""
+    if isinstance(row, Exception):
+        raise ValidationError(str(row))
+    errors = {}
+    cleaned = {}
+
+    def clean(model, name, default=REQUIRED):
+        value = row.get(name)
+        if _blank(value):
+            if default is REQUIRED:
+                errors[name] = ['This field is required.']
+            else:
+                cleaned[name] = default
+            return
+        try:
+            cleaned[name] = _clean(model, name, value)
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+
+    clean(Product, 'name')
+    if _blank(row.get('slug')) and not _blank(row.get('name')):
+        row = {**row, 'slug': slugify(row['name'])}
+    clean(Product, 'slug')
+    clean(Product, 'description', default='')
+    clean(Product, 'base_price')
+    clean(Product, 'stock', default=0)
+    clean(Product, 'is_active', default=True)
+    for name, max_length in (('brand', 100), ('category', 100)):
+        value = '' if row.get(name) is None else str(row[name]).strip()
+        if not value:
+            errors[name] = ['This field is required.']
+        elif len(value) > max_length:
+            errors[name] = [f'Ensure this value has at most {max_length} characters.']
+        cleaned[name] = value
+
+    if 'tags' in row:
+        cleaned['tags'] = _split(row['tags'])
+        if any(len(tag) > 50 for tag in cleaned['tags']):
+            errors['tags'] = ['Tag names have at most 50 characters.']
+    cleaned['images'] = _split(row.get('images'))
+
+    if not _blank(row.get('sku')):
+        clean(ProductVariant, 'sku')
+        clean(ProductVariant, 'size', default=None)
+        clean(ProductVariant, 'color', default=None)
+        clean(ProductVariant, 'variant_price_adjustment', default=0)
+
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+class CatalogImporter:
+    """
+    Imports parsed feed rows in batches. Create one per import so the
+    name -> id maps are shared across batches.
+
+    With ``sync=True`` the feed is treated as the full catalog: products and
+    variants whose stored ``sync_hash`` matches the feed are skipped, and
+    previously imported products missing from the feed are deactivated once
+    the whole feed has been read.
+    """
+
+    def __init__(self, batch_size=1000, create_missing=True, sync=False):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.sync = sync
+        self.brands = dict(Brand.objects.values_list('name', 'id'))
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.tags = dict(Tag.objects.values_list('name', 'id'))
+
+    def run(self, rows, start_row=0, max_rows=None, on_batch=None):
+        """
+        Imports (row_number, row) pairs after `start_row`, stopping after
+        `max_rows` rows (or after the rest of the last product's rows).
+        `on_batch(last_row)` is called after each batch commits so callers
+        can checkpoint. Returns a report dict with counts, per-row errors,
+        `last_row` and whether the feed is `complete`.
+        """
+        report = {
+            'rows': 0, 'errors': [], 'last_row': start_row, 'complete': False,
+            **dict.fromkeys(COUNT_KEYS, 0),
+        }
+        seen = set()
+
+        def pending():
+            previous = None
+            for number, row in rows:
+                slug = product_key(row)
+                if slug is not None:
+                    if slug != previous and slug in seen:
+                        row = ValueError(f"Rows of product {slug} must be consecutive in the feed.")
+                    else:
+                        seen.add(slug)
+                        previous = slug
+                if number > start_row:
+                    yield number, row
+            report['complete'] = True
+
+        groups = group_rows(pending())
+        while max_rows is None or report['rows'] < max_rows:
+            limit = self.batch_size if max_rows is None else min(self.batch_size, max_rows - report['rows'])
+            # A batch is filled with whole products, so it may exceed the limit.
+            batch = []
+            for group in groups:
+                batch.extend(group)
+                if len(batch) >= limit:
+                    break
+            if not batch:
+                break
+            self._import_batch(batch, report)
+            report['rows'] += len(batch)
+            report['last_row'] = batch[-1][0]
+            if on_batch:
+                on_batch(report['last_row'])
+        if self.sync and report['complete']:
+            report['deactivated'] = self.deactivate_missing(seen)
+        return report
+
+    def deactivate_missing(self, seen_slugs):
+        """
+        Deactivates active, previously imported products whose slug is not in
+        `seen_slugs`, clearing their hash so they are rewritten if they return.
+        """
+        missing = [
+            product_id for product_id, slug in Product.objects.filter(is_active=True).exclude(
+                sync_hash=''
+            ).values_list('id', 'slug').iterator(chunk_size=self.batch_size)
+            if slug not in seen_slugs
+        ]
+        now = timezone.now()
+        for offset in range(0, len(missing), self.batch_size):
+            Product.objects.filter(id__in=missing[offset:offset + self.batch_size]).update(
+                is_active=False, sync_hash='', updated_at=now
+            )
+        return len(missing)
+
+    def _import_batch(self, batch, report):
+        parsed = []
+        for row_number, row in batch:
+            try:
+                parsed.append((row_number, parse_row(row)))
+            except ValidationError as exc:
+                report['errors'].append({'row': row_number, 'errors': _messages(exc)})
+        if not parsed:
+            return
+        if len(parsed) == 1:
+            counts = self._write_atomic(parsed, report) or {}
+        else:
+            counts = self._write_atomic(parsed)
+        if counts is None:
+            # Retry row by row so a single bad row does not sink the batch.
+            counts = dict.fromkeys(COUNT_KEYS, 0)
+            for entry in parsed:
+                row_counts = self._write_atomic([entry], report) or {}
+                for key, value in row_counts.items():
+                    counts[key] += value
+        for key, value in counts.items():
+            report[key] += value
+
+    def _write_atomic(self, parsed, report=None):
+        """
+        Writes `parsed` in one transaction and returns its counts, or None if
+        it failed, in which case the error is added to `report` if given.
+        """
+        maps = (dict(self.brands), dict(self.categories), dict(self.tags))
+        try:
+            with transaction.atomic():
+                return self._write(parsed)
+        except (DatabaseError, ValidationError) as exc:
+            # Names created inside the rolled back transaction are gone again.
+            self.brands, self.categories, self.tags = maps
+            if report is not None:
+                report['errors'].append({'row': parsed[0][0], 'errors': _messages(exc)})
+            return None
+
+    def _resolve(self, model, cache, names, **defaults):
+        missing = {name for name in names if name not in cache}
+        if not missing:
+            return
+        if not self.create_missing:
+            raise ValidationError(f"Unknown {model._meta.verbose_name}: {', '.join(sorted(missing))}")
+        model.objects.bulk_create(
+            [model(name=name, **{key: make(name) for key, make in defaults.items()}) for name in missing],
+            ignore_conflicts=True,
+        )
+        cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        still_missing = missing - cache.keys()
+        if still_missing:
+            # e.g. a generated slug collided with an existing row's slug.
+            raise ValidationError(f"Could not create {model._meta.verbose_name}: {', '.join(sorted(still_missing))}")
+
+    def _write(self, parsed):
+        rows = [cleaned for _, cleaned in parsed]
+        self._resolve(Brand, self.brands, {row['brand'] for row in rows})
+        self._resolve(Category, self.categories, {row['category'] for row in rows}, slug=slugify)
+        self._resolve(Tag, self.tags, {tag for row in rows for tag in row.get('tags', ())}, slug=slugify)
+
+        # Later rows for the same slug/sku win; images accumulate.
+        products = {}
+        variants = {}
+        for row in rows:
+            state = products.setdefault(row['slug'], {'tags': None, 'images': []})
+            state.update({name: row[name] for name in (*PRODUCT_FIELDS, 'brand', 'category')})
+            if 'tags' in row:
+                state['tags'] = list(dict.fromkeys(row['tags']))
+            state['images'] += [path for path in row['images'] if path not in state['images']]
+            if 'sku' in row:
+                variants[row['sku']] = {'product': row['slug'], **{name: row[name] for name in VARIANT_FIELDS}}
+
+        existing = {
+            slug: (product_id, sync_hash)
+            for slug, product_id, sync_hash in Product.objects.filter(
+                slug__in=products
+            ).values_list('slug', 'id', 'sync_hash')
+        }
+        changed = {}
+        for slug, state in products.items():
+            state_hash = row_hash(state)
+            if not self.sync or existing.get(slug, (None, None))[1] != state_hash:
+                changed[slug] = (state, state_hash)
+        unchanged = len(products) - len(changed)
+
+        if changed:
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        slug=slug, sync_hash=state_hash,
+                        brand_id=self.brands[state['brand']],
+                        category_id=self.categories[state['category']],
+                        **{name: state[name] for name in PRODUCT_FIELDS}
+                    )
+                    for slug, (state, state_hash) in changed.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=[*PRODUCT_FIELDS, 'brand', 'category', 'sync_hash', 'updated_at'],
+            )
+        product_ids = {slug: product_id for slug, (product_id, _) in existing.items()}
+        if any(slug not in product_ids for slug in changed):
+            product_ids.update(Product.objects.filter(slug__in=changed).values_list('slug', 'id'))
+
+        if variants and self.sync:
+            stored = dict(ProductVariant.objects.filter(sku__in=variants).values_list('sku', 'sync_hash'))
+            variants = {
+                sku: variant for sku, variant in variants.items()
+                if stored.get(sku) != row_hash(variant)
+            }
+        if variants:
+            ProductVariant.objects.bulk_create(
+                [
+                    ProductVariant(
+                        sku=sku, product_id=product_ids[variant['product']], sync_hash=row_hash(variant),
+                        **{name: variant[name] for name in VARIANT_FIELDS}
+                    )
+                    for sku, variant in variants.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=['product', *VARIANT_FIELDS, 'sync_hash'],
+            )
+
+        tags = {slug: state['tags'] for slug, (state, _) in changed.items() if state['tags'] is not None}
+        if tags:
+            through = Product.tags.through
+            through.objects.filter(product_id__in=[product_ids[slug] for slug in tags]).delete()
+            through.objects.bulk_create([
+                through(product_id=product_ids[slug], tag_id=self.tags[name])
+                for slug, names in tags.items()
+                for name in names
+            ])
+
+        images = {slug: state['images'] for slug, (state, _) in changed.items() if state['images']}
+        created_images = self._link_images(images, product_ids)
+        return {
+            'products': len(changed), 'variants': len(variants),
+            'images': created_images, 'unchanged': unchanged,
+        }
+
+    def _link_images(self, images, product_ids):
+        if not images:
+            return 0
+        ids = [product_ids[slug] for slug in images]
+        existing = {}
+        has_main = set()
+        for product_id, path, is_main, order in ProductImage.objects.filter(
+            product_id__in=ids
+        ).values_list('product_id', 'image', 'is_main', 'order'):
+            existing.setdefault(product_id, [set(), -1])
+            existing[product_id][0].add(path)
+            existing[product_id][1] = max(existing[product_id][1], order)
+            if is_main:
+                has_main.add(product_id)
+
+        new_images = []
+        for slug, paths in images.items():
+            product_id = product_ids[slug]
+            known, last_order = existing.get(product_id, (set(), -1))
+            for path in paths:
+                if path in known:
+                    continue
+                last_order += 1
+                new_images.append(ProductImage(
+                    product_id=product_id, image=path, order=last_order,
+                    is_main=product_id not in has_main,
+                ))
+                has_main.add(product_id)
+        ProductImage.objects.bulk_create(new_images)
+        # bulk_create skips post_save, so queue the thumbnails explicitly.
+        image_pipeline.schedule(ProductImage, [image.pk for image in new_images if image.pk])
+        return len(new_images)
+
+
+def _messages(exc):
+    if isinstance(exc, ValidationError):
+        return exc.message_dict if hasattr(exc, 'error_dict') else {'non_field_errors': exc.messages}
+    return {'non_field_errors': [str(exc)]}
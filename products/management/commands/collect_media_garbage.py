@@ -0,0 +1,54 @@
+import os
+import shutil
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from alcom_project.images import image_models
+from alcom_project.storage import media_storage, reference_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed media blobs and generated image variants "
+        "that no ProductImage or ReviewImage references any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Keep blobs newer than this, as their rows may not be committed yet")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['grace_hours'] * 3600
+        counts = reference_counts()
+        removed = kept = 0
+        for name, modified in media_storage.blobs():
+            if counts[name] or modified > cutoff:
+                kept += 1
+                continue
+            removed += 1
+            if options['dry_run']:
+                self.stdout.write(f"Would delete {name}")
+            else:
+                media_storage.purge(name)
+        self.stdout.write(f"Blobs: {removed} unreferenced removed, {kept} kept")
+
+        hashes = set()
+        for model in image_models():
+            hashes.update(model.objects.exclude(content_hash='').values_list('content_hash', flat=True).distinct())
+        variants_removed = 0
+        root = default_storage.path('image_variants')
+        for prefix in os.listdir(root) if os.path.isdir(root) else []:
+            for content_hash in os.listdir(os.path.join(root, prefix)):
+                path = os.path.join(root, prefix, content_hash)
+                if content_hash in hashes or os.path.getmtime(path) > cutoff:
+                    continue
+                variants_removed += 1
+                if options['dry_run']:
+                    self.stdout.write(f"Would delete variants {content_hash}")
+                else:
+                    shutil.rmtree(path)
+        self.stdout.write(f"Variant sets: {variants_removed} unreferenced removed")
+        self.stdout.write(self.style.SUCCESS("Media garbage collected."))
@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import FEED_FORMATS, CatalogImporter, detect_format, read_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import products, variants, tags and images from a CSV or JSONL "
+        "feed. Progress is checkpointed after every batch; --resume continues "
+        "after the last committed row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help="Path to the .csv or .jsonl feed")
+        parser.add_argument('--format', dest='feed_format', choices=FEED_FORMATS,
+                            help="Feed format (default: from the file extension)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: <feed>.checkpoint)")
+        parser.add_argument('--resume', action='store_true', help="Skip rows committed by a previous run")
+        parser.add_argument('--errors', help="Write per-row errors to this JSONL file")
+        parser.add_argument('--sync', action='store_true',
+                            help="Write only rows whose values changed and deactivate products missing from the feed")
+        parser.add_argument('--no-create-missing', action='store_true',
+                            help="Reject rows whose brand, category or tag does not exist")
+
+    def handle(self, *args, **options):
+        feed = options['feed']
+        if not os.path.exists(feed):
+            raise CommandError(f"{feed} does not exist")
+        checkpoint = options['checkpoint'] or f'{feed}.checkpoint'
+        start_row = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as handle:
+                start_row = int(handle.read().strip() or 0)
+            self.stdout.write(f"Resuming after row {start_row}")
+
+        def save_checkpoint(last_row):
+            with open(checkpoint, 'w') as handle:
+                handle.write(str(last_row))
+            self.stdout.write(f"Committed through row {last_row}")
+
+        importer = CatalogImporter(
+            batch_size=max(options['batch_size'], 1),
+            create_missing=not options['no_create_missing'],
+            sync=options['sync'],
+        )
+        with open(feed, 'rb') as handle:
+            report = importer.run(
+                read_feed(handle, options['feed_format'] or detect_format(feed)),
+                start_row=start_row, on_batch=save_checkpoint,
+            )
+
+        if options['errors'] and report['errors']:
+            with open(options['errors'], 'w') as handle:
+                for error in report['errors']:
+                    handle.write(json.dumps(error) + '\n')
+        for error in report['errors'][:20]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows']} rows: {report['products']} products written, "
+            f"{report['unchanged']} unchanged, {report['deactivated']} deactivated, "
+            f"{report['variants']} variants, {report['images']} images, "
+            f"{len(report['errors'])} errors."
+        ))
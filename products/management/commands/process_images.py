@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from alcom_project.images import image_models, process_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized variants for product and review images that do not "
+        "have them yet (e.g. uploads queued before a restart)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-check every image, not only unprocessed ones")
+
+    def handle(self, *args, **options):
+        for model in image_models():
+            queryset = model.objects.exclude(image='')
+            if not options['all']:
+                queryset = queryset.filter(variants={})
+            pks = list(queryset.values_list('pk', flat=True))
+            for pk in pks:
+                process_image(model, pk)
+            self.stdout.write(f"Processed {len(pks)} {model._meta.verbose_name_plural}")
+        self.stdout.write(self.style.SUCCESS("Images processed."))
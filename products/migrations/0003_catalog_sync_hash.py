@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sync_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash of the values last imported from a catalog feed', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='sync_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash of the values last imported from a catalog feed', max_length=40),
+        ),
+    ]
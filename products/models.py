@@ -1,4 +1,5 @@
 from django.db import models
+from alcom_project.storage import get_media_storage
 
 class Brand(models.Model):
     """Stores product brand information."""
@@ -58,6 +59,7 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    sync_hash = models.CharField(max_length=40, blank=True, default='', editable=False, help_text="Hash of the values last imported from a catalog feed")
 
     def __str__(self):
         return self.name
@@ -78,6 +80,7 @@ class ProductVariant(models.Model):
         decimal_places=2, 
         default=0
     )
+    sync_hash = models.CharField(max_length=40, blank=True, default='', editable=False, help_text="Hash of the values last imported from a catalog feed")
 
     class Meta:
         # Ensures that a product doesn't have duplicate size/color variants
@@ -89,10 +92,12 @@ class ProductVariant(models.Model):
 class ProductImage(models.Model):
     """Stores images associated with a product."""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='product_images/')
+    image = models.ImageField(upload_to='product_images/', storage=get_media_storage)
     alt_text = models.CharField(max_length=255, blank=True)
     is_main = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0) # To control display order
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies by format and width")
 
     class Meta:
         ordering = ['order']
@@ -1,6 +1,7 @@
 # products/serializers.py
 from django.db.models import Avg
 from rest_framework import serializers
+from alcom_project.images import srcset
 from .models import Category, Product, ProductImage, ProductVariant, Brand, Tag
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -24,35 +25,51 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.products.count()
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = '__all__'
+        exclude = ('content_hash', 'variants')
+
+    def get_srcset(self, obj):
+        return srcset(obj.variants)
 
 class ProductVariantSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
-        fields = '__all__'
+        exclude = ('sync_hash',)
+
+def _main_image(product):
+    """Returns the product's main image, looked up once per serialized product."""
+    if not hasattr(product, '_main_image'):
+        product._main_image = product.images.filter(is_main=True).first()
+    return product._main_image
 
 class ProductListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = (
             'id', 'name', 'slug', 'base_price', 'category', 'category_name',
-            'brand', 'brand_name', 'main_image', 'average_rating',
+            'brand', 'brand_name', 'main_image', 'main_image_srcset', 'average_rating',
             'is_active', 'created_at',
         )
 
     def get_main_image(self, obj):
-        main_image = obj.images.filter(is_main=True).first()
+        main_image = _main_image(obj)
         if main_image:
             return main_image.image.url
         return None
 
+    def get_main_image_srcset(self, obj):
+        main_image = _main_image(obj)
+        return srcset(main_image.variants) if main_image else {}
+
     def get_average_rating(self, obj):
         return obj.ratings.aggregate(Avg('rating')).get('rating__avg') or 0
 
@@ -60,6 +77,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
@@ -71,14 +89,18 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'base_price',
             'category', 'category_name', 'brand', 'brand_name',
             'images', 'variants', 'tags', 'is_active',
-            'created_at', 'updated_at', 'main_image', 'average_rating',
+            'created_at', 'updated_at', 'main_image', 'main_image_srcset', 'average_rating',
         )
 
     def get_main_image(self, obj):
-        main_image = obj.images.filter(is_main=True).first()
+        main_image = _main_image(obj)
         if main_image:
             return main_image.image.url
         return None
 
+    def get_main_image_srcset(self, obj):
+        main_image = _main_image(obj)
+        return srcset(main_image.variants) if main_image else {}
+
     def get_average_rating(self, obj):
         return obj.ratings.aggregate(Avg('rating')).get('rating__avg') or 0
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from alcom_project import images
+from .models import ProductImage
+
+
+@receiver(post_save, sender=ProductImage)
+def process_product_image(sender, instance, created, **kwargs):
+    # update() from the pipeline itself does not send post_save.
+    if instance.image and (created or not instance.variants):
+        images.schedule(ProductImage, [instance.pk])
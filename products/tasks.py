@@ -0,0 +1,10 @@
+from django.apps import apps
+
+from alcom_project import images
+from jobs.registry import task
+
+
+@task(queue='images', max_attempts=3)
+def process_image_variants(model_label, pk):
+    """Hashes an uploaded ProductImage/ReviewImage and generates its variants."""
+    images.process_image(apps.get_model(model_label), pk)
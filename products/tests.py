@@ -1,9 +1,29 @@
 # products/tests.py
 from django.test import TestCase
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APITransactionTestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Category, Product, Brand, ProductImage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from decimal import Decimal
+from io import BytesIO, StringIO
+import json
+import os
+import tempfile
+import time
+import unittest
+from alcom_project.routers import PIN_COOKIE, ReplicaRoutingMiddleware
+from alcom_project.storage import media_storage
+from analytics.models import PageView
+from .importers import CatalogImporter, read_feed
+from .models import Category, Product, Brand, ProductImage, ProductVariant, Tag
+from .serializers import ProductListSerializer
 
 User = get_user_model()
 
@@ -97,6 +117,140 @@ class ProductImageModelTests(TestCase):
         self.assertEqual(str(image), f"Image for {self.product.name} (Order: {image.order})")
         self.assertTrue(image.is_main)
 
+def make_image(name='photo.png', size=(120, 80), color=(200, 30, 30, 128)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImagePipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root.name, IMAGE_PIPELINE_WORKERS=0,
+            IMAGE_VARIANT_WIDTHS=[50, 100, 400], IMAGE_VARIANT_FORMATS=['webp', 'jpeg'],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root.name
+        category = Category.objects.create(name='Test', slug='test')
+        brand = Brand.objects.create(name='PipelineBrand', description='Brand')
+        self.product = Product.objects.create(
+            name='Pipeline Product', slug='pipeline-product', base_price=10,
+            category=category, brand=brand
+        )
+
+    def upload(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=make_image(), **kwargs)
+        image.refresh_from_db()
+        return image
+
+    def test_variants_generated_after_upload(self):
+        """Test WebP and JPEG variants are written for widths below the original"""
+        image = self.upload(is_main=True)
+
+        self.assertEqual(len(image.content_hash), 64)
+        self.assertEqual(sorted(image.variants['webp']), ['100', '50'])
+        self.assertEqual(sorted(image.variants['jpeg']), ['100', '50'])
+        with Image.open(os.path.join(self.media_root, image.variants['jpeg']['50'])) as variant:
+            self.assertEqual(variant.size, (50, 33))
+            self.assertEqual(variant.format, 'JPEG')
+
+    def test_identical_uploads_share_blob_and_variants(self):
+        """Test a re-upload of the same content is stored once and reuses its variants"""
+        first = self.upload()
+        second = self.upload()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, f'blobs/{first.content_hash[:2]}/{first.content_hash[2:4]}/{first.content_hash}.png')
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(first.variants, second.variants)
+
+    def test_garbage_collection_keeps_referenced_blobs(self):
+        """Test unreferenced blobs and variants are removed, shared ones kept"""
+        kept = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped = ProductImage.objects.create(
+                product=self.product, image=make_image(color=(0, 0, 255, 255))
+            )
+        dropped.refresh_from_db()
+        self.upload()
+        kept.delete()
+        dropped.delete()
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, dropped.image.name)))
+
+        call_command('collect_media_garbage', '--grace-hours=0', stdout=StringIO())
+
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, kept.image.name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, dropped.image.name)))
+        self.assertFalse(os.path.exists(os.path.join(
+            self.media_root, 'image_variants', dropped.content_hash[:2], dropped.content_hash
+        )))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, kept.variants['webp']['50'])))
+
+    def test_reupload_renews_grace_period_of_unreferenced_blob(self):
+        """Test saving content that is already stored protects its blob until the new row commits"""
+        image = self.upload()
+        path = os.path.join(self.media_root, image.image.name)
+        image.delete()
+        stale = time.time() - 48 * 3600
+        os.utime(path, (stale, stale))
+
+        # A new upload of the same bytes whose row is not committed yet.
+        self.assertEqual(media_storage.save('again.png', make_image()), image.image.name)
+        call_command('collect_media_garbage', '--grace-hours=24', stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+
+    def test_serializers_expose_srcset(self):
+        """Test serializers return variant URLs"""
+        self.upload(is_main=True)
+        data = ProductListSerializer(Product.objects.get()).data
+        self.assertEqual(data['main_image_srcset']['webp']['100'].split('/')[1], 'media')
+        self.assertTrue(data['main_image_srcset']['jpeg']['50'].endswith('/50.jpg'))
+
+    def test_bulk_upload_endpoint(self):
+        """Test several images are validated, stored and ordered in one request"""
+        admin = User.objects.create_superuser(username='imageadmin', email='imageadmin@example.com', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        ProductImage.objects.create(product=self.product, image=make_image(), order=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/products/products/{self.product.id}/images/', {
+                'images': [
+                    make_image('front.png', color=(1, 2, 3, 255)),
+                    SimpleUploadedFile('notes.png', b'not an image'),
+                    make_image('back.png', color=(4, 5, 6, 255)),
+                ],
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([error['file'] for error in response.data['rejected']], ['notes.png'])
+        created = list(self.product.images.filter(order__gt=4).order_by('order'))
+        self.assertEqual([image.order for image in created], [5, 6])
+        self.assertEqual([image.is_main for image in created], [True, False])
+        self.assertTrue(all(image.variants for image in created))
+        self.assertEqual(response.data['images'][0]['id'], created[0].id)
+
+    def test_bulk_upload_requires_admin(self):
+        """Test regular users cannot bulk upload images"""
+        user = User.objects.create_user(username='imageuser', email='imageuser@example.com', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(f'/api/products/products/{self.product.id}/images/', {
+            'images': [make_image()],
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_process_images_command(self):
+        """Test the command fills in images that missed the pipeline"""
+        image = ProductImage.objects.create(product=self.product, image=make_image())
+        self.assertEqual(image.variants, {})
+        call_command('process_images', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertIn('webp', image.variants)
+
 class CategoryAPITests(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -199,4 +353,246 @@ class ProductAPITests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
-        self.assertEqual(response.data['results'][0]['name'], 'Product One')
\ No newline at end of file
+        self.assertEqual(response.data['results'][0]['name'], 'Product One')
+
+
+CATALOG_CSV = (
+    "slug,name,description,base_price,stock,brand,category,tags,sku,size,color,images\n"
+    "tee,Tee,Cotton tee,19.99,5,Acme,Shirts,summer|cotton,TEE-S,S,Red,product_images/tee.jpg\n"
+    "tee,Tee,Cotton tee,19.99,5,Acme,Shirts,summer|cotton,TEE-M,M,Red,\n"
+    "mug,Mug,,abc,1,Acme,Kitchen,,,,,\n"
+    "cap,Cap,Wool cap,9.50,2,NewBrand,Hats,winter,,,,\n"
+)
+
+
+class CatalogImportTests(APITestCase):
+    def import_csv(self, content, **kwargs):
+        return CatalogImporter(batch_size=kwargs.pop('batch_size', 100)).run(
+            read_feed(BytesIO(content.encode()), 'csv'), **kwargs
+        )
+
+    def test_import_creates_catalog(self):
+        """Test products, variants, tags, images and lookups are created in bulk"""
+        report = self.import_csv(CATALOG_CSV)
+
+        self.assertEqual(report['rows'], 4)
+        self.assertEqual([error['row'] for error in report['errors']], [3])
+        self.assertIn('base_price', report['errors'][0]['errors'])
+        tee = Product.objects.get(slug='tee')
+        self.assertEqual(tee.brand.name, 'Acme')
+        self.assertEqual(sorted(tee.tags.values_list('name', flat=True)), ['cotton', 'summer'])
+        self.assertEqual(sorted(tee.variants.values_list('sku', flat=True)), ['TEE-M', 'TEE-S'])
+        self.assertTrue(tee.images.get().is_main)
+        self.assertTrue(Brand.objects.filter(name='NewBrand').exists())
+        self.assertEqual(Category.objects.get(name='Hats').slug, 'hats')
+        self.assertFalse(Product.objects.filter(slug='mug').exists())
+
+    def test_reimport_updates_in_place(self):
+        """Test re-importing upserts on slug/sku and replaces tags"""
+        self.import_csv(CATALOG_CSV)
+        self.import_csv(
+            "slug,name,description,base_price,stock,brand,category,tags,sku,size,color\n"
+            "tee,Tee v2,Cotton tee,24.00,9,Acme,Shirts,sale,TEE-S,S,Blue\n"
+        )
+
+        tee = Product.objects.get(slug='tee')
+        self.assertEqual(tee.name, 'Tee v2')
+        self.assertEqual(tee.base_price, Decimal('24.00'))
+        self.assertEqual(list(tee.tags.values_list('name', flat=True)), ['sale'])
+        self.assertEqual(ProductVariant.objects.get(sku='TEE-S').color, 'Blue')
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Tag.objects.filter(name='summer').count(), 1)
+
+    def test_conflicting_row_fails_alone(self):
+        """Test a database conflict only rejects the offending row"""
+        report = self.import_csv(
+            "slug,name,base_price,brand,category,sku,size,color\n"
+            "hat,Hat,5,Acme,Hats,HAT-1,L,Red\n"
+            "hat,Hat,5,Acme,Hats,HAT-2,L,Red\n"
+            "scarf,Scarf,5,Acme,Hats,,,\n"
+        )
+
+        self.assertEqual([error['row'] for error in report['errors']], [2])
+        self.assertTrue(Product.objects.filter(slug='scarf').exists())
+        self.assertEqual(list(ProductVariant.objects.values_list('sku', flat=True)), ['HAT-1'])
+
+    def test_sync_writes_only_changes(self):
+        """Test sync mode skips unchanged rows and deactivates missing products"""
+        self.import_csv(CATALOG_CSV)
+        Product.objects.filter(slug='tee').update(updated_at='2020-01-01T00:00:00Z')
+        tee_updated = Product.objects.get(slug='tee').updated_at
+
+        changed = CATALOG_CSV.replace('9.50,2', '9.75,2')
+        report = CatalogImporter(sync=True).run(read_feed(BytesIO(changed.encode()), 'csv'))
+
+        self.assertTrue(report['complete'])
+        self.assertEqual((report['products'], report['unchanged'], report['variants']), (1, 1, 0))
+        self.assertEqual(Product.objects.get(slug='tee').updated_at, tee_updated)
+        self.assertEqual(Product.objects.get(slug='cap').base_price, Decimal('9.75'))
+
+        feed = "\n".join(line for line in CATALOG_CSV.splitlines() if not line.startswith('cap,')) + "\n"
+        report = CatalogImporter(sync=True).run(read_feed(BytesIO(feed.encode()), 'csv'))
+        self.assertEqual(report['deactivated'], 1)
+        self.assertFalse(Product.objects.get(slug='cap').is_active)
+        self.assertTrue(Product.objects.get(slug='tee').is_active)
+
+    def test_product_rows_are_not_split_across_batches(self):
+        """Test a product's rows share a batch, so a repeated sync finds it unchanged"""
+        for _ in range(2):
+            report = CatalogImporter(batch_size=1, sync=True).run(read_feed(BytesIO(CATALOG_CSV.encode()), 'csv'))
+        self.assertEqual((report['products'], report['unchanged'], report['variants']), (0, 2, 0))
+        tee = Product.objects.get(slug='tee')
+        self.assertEqual(sorted(tee.variants.values_list('sku', flat=True)), ['TEE-M', 'TEE-S'])
+        self.assertEqual(tee.images.count(), 1)
+
+    def test_scattered_product_rows_are_rejected(self):
+        """Test a row returning to a product after other products is an error"""
+        report = self.import_csv(CATALOG_CSV + "tee,Tee,Cotton tee,19.99,5,Acme,Shirts,,TEE-L,L,Red,\n")
+        self.assertEqual([error['row'] for error in report['errors']], [3, 5])
+        self.assertIn('consecutive', report['errors'][1]['errors']['non_field_errors'][0])
+        self.assertFalse(ProductVariant.objects.filter(sku='TEE-L').exists())
+
+    def test_partial_sync_does_not_deactivate(self):
+        """Test products are only deactivated once the whole feed was read"""
+        self.import_csv(CATALOG_CSV)
+        feed = "\n".join(CATALOG_CSV.splitlines()[:2]) + "\n"
+        report = CatalogImporter(sync=True).run(read_feed(BytesIO(CATALOG_CSV.encode()), 'csv'), max_rows=1)
+        self.assertFalse(report['complete'])
+        report = CatalogImporter(sync=True).run(read_feed(BytesIO(feed.encode()), 'csv'), start_row=1)
+        self.assertTrue(report['complete'])
+        self.assertEqual(report['deactivated'], 1)
+        self.assertTrue(Product.objects.get(slug='tee').is_active)
+
+    def test_import_resumes_from_row(self):
+        """Test rows up to start_row are skipped"""
+        report = self.import_csv(CATALOG_CSV, start_row=3)
+        self.assertEqual(report['rows'], 1)
+        self.assertEqual(list(Product.objects.values_list('slug', flat=True)), ['cap'])
+
+    def test_jsonl_command_with_checkpoint(self):
+        """Test the command imports JSONL and resumes from its checkpoint"""
+        with tempfile.TemporaryDirectory() as tmp:
+            feed = os.path.join(tmp, 'feed.jsonl')
+            with open(feed, 'w') as handle:
+                for slug in ('one', 'two', 'three'):
+                    handle.write(json.dumps({
+                        'slug': slug, 'name': slug.title(), 'base_price': 3,
+                        'brand': 'Acme', 'category': 'Misc', 'tags': ['a', 'b'],
+                    }) + '\n')
+            with open(feed + '.checkpoint', 'w') as handle:
+                handle.write('2')
+            call_command('import_catalog', feed, '--resume', stdout=StringIO(), stderr=StringIO())
+            self.assertFalse(os.path.exists(feed + '.checkpoint'))
+
+        self.assertEqual(list(Product.objects.values_list('slug', flat=True)), ['three'])
+        self.assertEqual(Product.objects.get().tags.count(), 2)
+
+    def test_admin_import_endpoint(self):
+        """Test admins can import a feed in resumable slices"""
+        admin = User.objects.create_superuser(username='catalogadmin', email='catalog@example.com', password='pass12345')
+        self.client.force_authenticate(user=admin)
+        url = '/api/products/products/import/'
+
+        response = self.client.post(url, {
+            'file': SimpleUploadedFile('feed.csv', CATALOG_CSV.encode()), 'max_rows': 2,
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['next_row'], 2)
+
+        response = self.client.post(url, {
+            'file': SimpleUploadedFile('feed.csv', CATALOG_CSV.encode()), 'start_row': 2, 'max_rows': 5,
+        }, format='multipart')
+        self.assertIsNone(response.data['next_row'])
+        self.assertEqual(len(response.data['errors']), 1)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_import_endpoint_requires_admin(self):
+        """Test regular users cannot import catalogs"""
+        user = User.objects.create_user(username='catalogshopper', email='shopper@example.com', password='pass12345')
+        self.client.force_authenticate(user=user)
+        response = self.client.post('/api/products/products/import/', {
+            'file': SimpleUploadedFile('feed.csv', CATALOG_CSV.encode()),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def route(self, request, write=None):
+        """Runs `request` through the middleware and returns (read aliases, response)"""
+        reads = {}
+
+        def view(request):
+            if write is not None:
+                router.db_for_write(write)
+            reads['product'] = router.db_for_read(Product)
+            reads['user'] = router.db_for_read(User)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return reads, response
+
+    def test_catalog_reads_use_replica(self):
+        """Test safe requests read catalog models from the replica and the rest from the primary"""
+        reads, response = self.route(self.factory.get('/api/products/products/'))
+        self.assertEqual(reads, {'product': 'replica', 'user': 'default'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_unsafe_requests_and_writes_use_primary(self):
+        """Test writes, and reads after a write in the same request, stay on the primary"""
+        reads, _ = self.route(self.factory.post('/api/products/products/'))
+        self.assertEqual(reads['product'], 'default')
+        reads, _ = self.route(self.factory.get('/api/products/products/'), write=Product)
+        self.assertEqual(reads['product'], 'default')
+
+    def test_writes_pin_client_to_primary(self):
+        """Test a catalog write sets a cookie that keeps the client's reads on the primary"""
+        _, response = self.route(self.factory.post('/api/reviews/'), write=Product)
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.DATABASE_REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/api/products/products/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        reads, _ = self.route(request)
+        self.assertEqual(reads['product'], 'default')
+
+        request.COOKIES[PIN_COOKIE] = str(int(time.time()) - 1)
+        reads, _ = self.route(request)
+        self.assertEqual(reads['product'], 'replica')
+
+    def test_analytics_writes_do_not_pin(self):
+        """Test event ingestion does not pin clients to the primary"""
+        _, response = self.route(self.factory.post('/api/analytics/track/'), write=PageView)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICA, 'DATABASE_REPLICA_URL is not configured')
+class ReplicaDatabaseTests(APITransactionTestCase):
+    databases = {'default', 'replica'} if settings.DATABASE_REPLICA else {'default'}
+
+    def setUp(self):
+        category = Category.objects.create(name='Replica', slug='replica')
+        brand = Brand.objects.create(name='ReplicaBrand', description='Brand')
+        self.product = Product.objects.create(
+            name='Replica Product', slug='replica-product', base_price=10, category=category, brand=brand
+        )
+        self.admin = User.objects.create_user(
+            username='replicaadmin', email='replicaadmin@example.com', password='testpass123', is_staff=True
+        )
+
+    def test_reads_follow_routing(self):
+        """Test listing reads the replica until the client writes to the catalog"""
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get('/api/products/products/')
+        self.assertTrue(replica_queries.captured_queries)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(f'/api/products/products/{self.product.id}/', {'name': 'Renamed'}, format='json')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get('/api/products/products/')
+        self.assertFalse(replica_queries.captured_queries)
@@ -1,8 +1,17 @@
 # products/views.py
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Case, Max, Q, When
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from alcom_project import images as image_pipeline
+from reviews.models import ProductReviewSummary
+from reviews.serializers import ProductReviewSummarySerializer
 from .models import Category, Product, ProductImage, Brand, Tag
 from .serializers import (
     CategorySerializer, ProductListSerializer, 
@@ -10,6 +19,7 @@ from .serializers import (
     TagSerializer, ProductImageSerializer
 )
 from .filters import ProductFilter
+from .importers import FEED_FORMATS, CatalogImporter, detect_format, read_feed
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -36,6 +46,7 @@ class TagViewSet(viewsets.ModelViewSet):
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.filter(is_active=True)
+    max_upload_images = 50
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProductFilter
     search_fields = ['name', 'description', 'tags__name']
@@ -57,6 +68,26 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = ProductListSerializer(similar_products, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'], url_path='review-summary', permission_classes=[permissions.AllowAny])
+    def review_summary(self, request, pk=None):
+        """
+        Rating histogram, average, review counts and top helpful reviews for
+        a product, looked up by id or slug and served from the precomputed
+        summary (cached until the product's reviews change).
+        """
+        # A numeric slug is also a valid id; the slug match wins so such a
+        # product is not confused with the product of that id.
+        lookup = Q(slug=pk) | Q(pk=pk) if pk.isdigit() else Q(slug=pk)
+        product_id = Product.objects.filter(lookup, is_active=True).order_by(
+            Case(When(slug=pk, then=0), default=1)
+        ).values_list('pk', flat=True).first()
+        if product_id is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        payload = ProductReviewSummary.objects.cached_payload(
+            product_id, lambda summary: ProductReviewSummarySerializer(summary).data
+        )
+        return Response(payload)
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         # If you later add an `is_featured` field, re-enable filtering by it.
@@ -71,6 +102,96 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(on_sale_products, many=True)
         return Response(serializer.data)
 
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        permission_classes=[permissions.IsAdminUser], parser_classes=[MultiPartParser]
+    )
+    def import_catalog(self, request):
+        """
+        Imports a CSV/JSONL catalog feed uploaded as `file`. At most
+        `max_rows` rows after `start_row` are imported per request; post the
+        same file again with start_row=next_row until next_row is null.
+        With sync=true only changed rows are written and products missing
+        from the feed are deactivated on the final request.
+        """
+        feed = request.FILES.get('file')
+        if feed is None:
+            return Response({'error': 'Upload the feed as "file".'}, status=status.HTTP_400_BAD_REQUEST)
+        feed_format = request.data.get('feed_format') or detect_format(feed.name)
+        if feed_format not in FEED_FORMATS:
+            return Response(
+                {'error': f"feed_format must be one of: {', '.join(FEED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start_row = max(int(request.data.get('start_row', 0)), 0)
+            max_rows = min(max(int(request.data.get('max_rows', 10000)), 1), 50000)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'start_row and max_rows must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sync = str(request.data.get('sync', '')).lower() in ('1', 'true', 'yes')
+        report = CatalogImporter(sync=sync).run(read_feed(feed, feed_format), start_row, max_rows)
+        report['next_row'] = None if report['complete'] else report['last_row']
+        return Response(report)
+
+    @action(
+        detail=True, methods=['post'], url_path='images',
+        permission_classes=[permissions.IsAdminUser], parser_classes=[MultiPartParser]
+    )
+    def upload_images(self, request, pk=None):
+        """
+        Adds up to `max_upload_images` images uploaded as repeated `images`
+        fields. Valid files are stored and appended after the product's
+        existing images; invalid ones are reported under `rejected`.
+        """
+        try:
+            # Spool every file to disk instead of holding small ones in memory.
+            request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        except AttributeError:
+            pass  # The body was already parsed, e.g. by a CSRF check.
+        product = get_object_or_404(Product, pk=pk)
+        files = request.FILES.getlist('images')
+        if not files:
+            return Response({'error': 'Upload one or more files as "images".'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(files) > self.max_upload_images:
+            return Response(
+                {'error': f'At most {self.max_upload_images} images can be uploaded at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        field = ProductImage._meta.get_field('image')
+        results = image_pipeline.store_uploads(files, field, settings.IMAGE_UPLOAD_WORKERS)
+        rejected = [
+            {'file': file.name, 'errors': errors}
+            for file, (name, errors) in zip(files, results) if name is None
+        ]
+        names = [name for name, _ in results if name is not None]
+        if not names:
+            return Response({'images': [], 'rejected': rejected}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Lock the product so concurrent uploads do not reuse order values.
+            Product.objects.select_for_update().filter(pk=product.pk).first()
+            existing = product.images.aggregate(last_order=Max('order'))
+            next_order = 0 if existing['last_order'] is None else existing['last_order'] + 1
+            needs_main = not product.images.filter(is_main=True).exists()
+            created = ProductImage.objects.bulk_create([
+                ProductImage(
+                    product=product, image=name, order=next_order + index,
+                    is_main=needs_main and index == 0,
+                )
+                for index, name in enumerate(names)
+            ])
+            image_pipeline.schedule(ProductImage, [image.pk for image in created])
+
+        return Response({
+            'images': ProductImageSerializer(created, many=True, context={'request': request}).data,
+            'rejected': rejected,
+        }, status=status.HTTP_201_CREATED)
+
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
\ No newline at end of file
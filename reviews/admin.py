@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Rating, Review, ReviewImage
+from .models import ProductReviewSummary, Rating, Review, ReviewImage
 
 # Register your models here.
 admin.site.register(Rating)
 admin.site.register(Review)
-admin.site.register(ReviewImage)
\ No newline at end of file
+admin.site.register(ReviewImage)
+admin.site.register(ProductReviewSummary)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = "Recompute Review.helpful_count from the helpful votes table (e.g. after votes were edited directly)."
+
+    def handle(self, *args, **options):
+        fixed = Review.objects.sync_helpful_counts()
+        self.stdout.write(self.style.SUCCESS(f"Corrected helpful counts on {fixed} reviews."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:04
+
+import alcom_project.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reviewimage',
+            name='image',
+            field=models.ImageField(storage=alcom_project.storage.get_media_storage, upload_to='reviews/'),
+        ),
+    ]
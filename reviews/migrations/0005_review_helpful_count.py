@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_helpful_counts(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    votes = Review.helpful_votes.through.objects.filter(review_id=OuterRef('pk')).order_by().values(
+        'review_id'
+    ).annotate(total=Count('pk')).values('total')
+    Review.objects.update(helpful_count=Coalesce(Subquery(votes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_content_addressed_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='helpful_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of helpful_votes, kept in sync by add/remove_helpful_vote'),
+        ),
+        migrations.RunPython(backfill_helpful_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-helpful_count', '-created_at'], name='review_helpful_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_content_addressed_images'),
+        ('reviews', '0005_review_helpful_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReviewSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_summary', serialize=False, to='products.product')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('histogram', models.JSONField(default=dict, help_text='Number of ratings per star value')),
+                ('review_count', models.PositiveIntegerField(default=0, help_text='Approved reviews')),
+                ('image_review_count', models.PositiveIntegerField(default=0, help_text='Approved reviews with images')),
+                ('top_reviews', models.JSONField(default=list, help_text='Snapshot of the most helpful approved reviews')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product review summaries',
+            },
+        ),
+    ]
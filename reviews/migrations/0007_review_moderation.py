@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_approved_as_moderated(apps, schema_editor):
+    # Reviews approved before the queue existed should not re-enter it.
+    Review = apps.get_model('reviews', 'Review')
+    Review.objects.filter(is_approved=True).update(moderated_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_product_review_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, help_text='When a moderator last approved or rejected the review; empty while it awaits moderation', null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='moderated_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderated_reviews', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(mark_approved_as_moderated, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('moderated_at__isnull', True)), fields=['created_at', 'id'], name='review_moderation_queue_idx'),
+        ),
+    ]
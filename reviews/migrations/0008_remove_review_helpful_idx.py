@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:59
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_moderation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_helpful_idx',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_review_products(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Rating = apps.get_model('reviews', 'Rating')
+    Review.objects.update(
+        product_id=Subquery(Rating.objects.filter(pk=OuterRef('rating_id')).values('product_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_content_addressed_images'),
+        ('reviews', '0008_remove_review_helpful_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='product',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='products.product'),
+        ),
+        migrations.RunPython(backfill_review_products, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='review',
+            name='product',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-helpful_count', '-created_at'], name='review_helpful_idx'),
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber
 from django.conf import settings
+from django.utils import timezone
+from alcom_project.storage import get_media_storage
 from products.models import Product
 
 # 1. Rating Model
@@ -18,33 +25,299 @@ class Rating(models.Model):
     def __str__(self):
         return f"{self.rating} stars for {self.product.name} by {self.user.username}"
 
+class ReviewManager(models.Manager):
+    def pending_moderation(self):
+        return self.filter(moderated_at__isnull=True)
+
+    def moderate(self, review_ids, approved, moderator):
+        """
+        Approves or rejects `review_ids` with a single UPDATE and applies the
+        resulting changes to the product review summaries. Returns the
+        number of reviews updated.
+        """
+        with transaction.atomic():
+            flipped = list(
+                self.select_for_update().filter(pk__in=review_ids).exclude(
+                    is_approved=approved
+                ).values_list('pk', flat=True)
+            )
+            updated = self.filter(pk__in=review_ids).update(
+                is_approved=approved, moderated_at=timezone.now(), moderated_by=moderator
+            )
+            ProductReviewSummary.objects.apply_moderation(flipped, approved)
+        return updated
+
+    def sync_helpful_counts(self):
+        """
+        Recomputes helpful_count from the votes table in one UPDATE and
+        returns the number of reviews whose count was wrong.
+        """
+        through = self.model.helpful_votes.through
+        votes = through.objects.filter(review_id=OuterRef('pk')).order_by().values('review_id').annotate(
+            total=Count('pk')
+        ).values('total')
+        actual = Coalesce(Subquery(votes), 0)
+        return self.annotate(actual=actual).exclude(helpful_count=F('actual')).update(helpful_count=actual)
+
 # 2. Review Model
 class Review(models.Model):
     """
     Stores a review for a product, linked to a rating.
     """
     rating = models.OneToOneField(Rating, on_delete=models.CASCADE, related_name='review')
+    # Copy of rating.product, so per-product listings can be served by review_helpful_idx.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews', editable=False)
     title = models.CharField(max_length=200)
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_approved = models.BooleanField(default=False, help_text="Approve the review to make it public")
     helpful_votes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='helpful_reviews', blank=True)
+    helpful_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of helpful_votes, kept in sync by add/remove_helpful_vote")
+    moderated_at = models.DateTimeField(null=True, blank=True, help_text="When a moderator last approved or rejected the review; empty while it awaits moderation")
+    moderated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='moderated_reviews')
+
+    objects = ReviewManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "Most helpful first" within a product.
+            models.Index(fields=['product', '-helpful_count', '-created_at'], name='review_helpful_idx'),
+            # Keyset scan of the moderation queue.
+            models.Index(
+                fields=['created_at', 'id'], name='review_moderation_queue_idx',
+                condition=Q(moderated_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.product_id is None and self.rating_id is not None:
+            self.product_id = self.rating.product_id
+        super().save(*args, **kwargs)
+
+    def add_helpful_vote(self, user):
+        """
+        Records `user`'s helpful vote. The counter is only incremented when a
+        vote row is actually inserted, so repeated calls are harmless.
+        Returns True if a vote was added.
+        """
+        through = Review.helpful_votes.through
+        with transaction.atomic():
+            # get_or_create falls back to a get if a concurrent request
+            # inserted the same vote first.
+            _, created = through.objects.get_or_create(review_id=self.pk, user_id=user.pk)
+            if created:
+                Review.objects.filter(pk=self.pk).update(helpful_count=F('helpful_count') + 1)
+                self._refresh_summary()
+        return created
+
+    def remove_helpful_vote(self, user):
+        """
+        Removes `user`'s helpful vote, decrementing the counter only if a vote
+        row was deleted. Returns True if a vote was removed.
+        """
+        through = Review.helpful_votes.through
+        with transaction.atomic():
+            deleted, _ = through.objects.filter(review_id=self.pk, user_id=user.pk).delete()
+            if deleted:
+                Review.objects.filter(pk=self.pk).update(helpful_count=F('helpful_count') - deleted)
+                self._refresh_summary()
+        return bool(deleted)
+
+    def _refresh_summary(self):
+        # Only approved reviews appear among a product's top reviews.
+        if self.is_approved:
+            ProductReviewSummary.objects.refresh([self.rating.product_id])
+
 # 3. ReviewImage Model
 class ReviewImage(models.Model):
     """
     Stores images associated with a review.
     """
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='reviews/')
+    image = models.ImageField(upload_to='reviews/', storage=get_media_storage)
     caption = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies by format and width")
 
     def __str__(self):
-        return f"Image for review: {self.review.title}"
\ No newline at end of file
+        return f"Image for review: {self.review.title}"
+
+# 4. ProductReviewSummary Model
+TOP_REVIEWS_PER_PRODUCT = 3
+REVIEW_SUMMARY_CACHE_TIMEOUT = 60 * 60
+
+
+def review_summary_cache_key(product_id):
+    return f'review-summary:{product_id}'
+
+
+def review_snapshot(review):
+    """The public fields of a review as stored in ProductReviewSummary.top_reviews."""
+    return {
+        'id': review.id,
+        'title': review.title,
+        'comment': review.comment,
+        'rating_value': review.rating.rating,
+        'user': {'id': review.rating.user_id, 'username': review.rating.user.username},
+        'helpful_count': review.helpful_count,
+        'created_at': review.created_at.isoformat(),
+    }
+
+
+class ProductReviewSummaryManager(models.Manager):
+    def refresh(self, product_ids):
+        """
+        Recomputes the summaries of `product_ids` with one grouped query per
+        source table and upserts them, then drops their cached payloads once
+        the transaction commits.
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        summaries = {
+            product_id: self.model(product_id=product_id, histogram={str(i): 0 for i in range(1, 6)})
+            for product_id in Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True)
+        }
+        if not summaries:
+            return
+
+        for row in Rating.objects.filter(product_id__in=summaries).order_by().values('product_id').annotate(
+            count=Count('pk'), total=Sum('rating'),
+            **{f'stars_{i}': Count('pk', filter=Q(rating=i)) for i in range(1, 6)}
+        ):
+            summary = summaries[row['product_id']]
+            summary.rating_count = row['count']
+            summary.rating_sum = row['total'] or 0
+            summary.histogram = {str(i): row[f'stars_{i}'] for i in range(1, 6)}
+
+        approved = Review.objects.filter(product_id__in=summaries, is_approved=True)
+        for row in approved.order_by().values('product_id').annotate(
+            count=Count('pk', distinct=True),
+            with_images=Count('pk', filter=Q(images__isnull=False), distinct=True),
+        ):
+            summary = summaries[row['product_id']]
+            summary.review_count = row['count']
+            summary.image_review_count = row['with_images']
+
+        top = approved.select_related('rating__user', 'rating').annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('product_id'),
+                order_by=[F('helpful_count').desc(), F('created_at').desc()],
+            )
+        ).filter(position__lte=TOP_REVIEWS_PER_PRODUCT).order_by('product_id', 'position')
+        for review in top:
+            summaries[review.product_id].top_reviews.append(review_snapshot(review))
+
+        self.bulk_create(
+            list(summaries.values()),
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[
+                'rating_count', 'rating_sum', 'histogram', 'review_count',
+                'image_review_count', 'top_reviews', 'updated_at',
+            ],
+        )
+        keys = [review_summary_cache_key(product_id) for product_id in summaries]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def apply_moderation(self, review_ids, approved):
+        """
+        Updates summaries for reviews whose approval just flipped to
+        `approved`: review counts move by per-product deltas in one UPDATE
+        and approved reviews are merged into the top-review snapshots. Only
+        products that have no summary yet, or lose a review from their
+        snapshot, are recomputed.
+        """
+        if not review_ids:
+            return
+        sign = 1 if approved else -1
+        deltas = defaultdict(lambda: [0, 0])
+        reviews = defaultdict(list)
+        for review in Review.objects.filter(pk__in=review_ids).select_related('rating__user').annotate(
+            image_count=Count('images')
+        ):
+            product_id = review.rating.product_id
+            deltas[product_id][0] += sign
+            deltas[product_id][1] += sign if review.image_count else 0
+            reviews[product_id].append(review)
+
+        summaries = {summary.product_id: summary for summary in self.filter(product_id__in=deltas)}
+        rebuild = set(deltas) - summaries.keys()
+        if summaries:
+            self.filter(product_id__in=summaries).update(
+                review_count=F('review_count') + Case(
+                    *[When(product_id=pk, then=Value(deltas[pk][0])) for pk in summaries], default=Value(0)
+                ),
+                image_review_count=F('image_review_count') + Case(
+                    *[When(product_id=pk, then=Value(deltas[pk][1])) for pk in summaries], default=Value(0)
+                ),
+                updated_at=timezone.now(),
+            )
+
+        changed = []
+        for product_id, summary in summaries.items():
+            if approved:
+                merged = summary.top_reviews + [review_snapshot(review) for review in reviews[product_id]]
+                merged.sort(key=lambda item: (item['helpful_count'], item['created_at']), reverse=True)
+                if merged[:TOP_REVIEWS_PER_PRODUCT] != summary.top_reviews:
+                    summary.top_reviews = merged[:TOP_REVIEWS_PER_PRODUCT]
+                    changed.append(summary)
+            elif {review.pk for review in reviews[product_id]} & {item['id'] for item in summary.top_reviews}:
+                # A review left the snapshot; the next best one has to be queried.
+                rebuild.add(product_id)
+        if changed:
+            self.bulk_update(changed, ['top_reviews'])
+        self.refresh(rebuild)
+        keys = [review_summary_cache_key(product_id) for product_id in summaries]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def cached_payload(self, product_id, serialize):
+        """
+        Returns the serialized summary of `product_id` from the cache,
+        building (and if needed first computing) it on a miss.
+        """
+        key = review_summary_cache_key(product_id)
+        payload = cache.get(key)
+        if payload is None:
+            summary = self.filter(product_id=product_id).first()
+            if summary is None:
+                self.refresh([product_id])
+                summary = self.get(product_id=product_id)
+            payload = serialize(summary)
+            cache.set(key, payload, REVIEW_SUMMARY_CACHE_TIMEOUT)
+        return payload
+
+
+class ProductReviewSummary(models.Model):
+    """
+    Precomputed review statistics for a product page, refreshed whenever a
+    rating, review or review image of the product changes.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='review_summary')
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    histogram = models.JSONField(default=dict, help_text="Number of ratings per star value")
+    review_count = models.PositiveIntegerField(default=0, help_text="Approved reviews")
+    image_review_count = models.PositiveIntegerField(default=0, help_text="Approved reviews with images")
+    top_reviews = models.JSONField(default=list, help_text="Snapshot of the most helpful approved reviews")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductReviewSummaryManager()
+
+    class Meta:
+        verbose_name_plural = "Product review summaries"
+
+    def __str__(self):
+        return f"Review summary for product {self.product_id}"
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 2)
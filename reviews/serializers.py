@@ -1,28 +1,55 @@
 # reviews/serializers.py
 from rest_framework import serializers
-from .models import Review, Rating
+from alcom_project.images import srcset
+from .models import ProductReviewSummary, Review, Rating, ReviewImage
 from products.models import Product
 from products.serializers import ProductListSerializer
-from accounts.serializers import UserSerializer
+from accounts.serializers import PublicUserSerializer
 
 class RatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rating
         fields = '__all__'
 
+class ReviewImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReviewImage
+        fields = ('id', 'image', 'caption', 'srcset')
+
+    def get_srcset(self, obj):
+        return srcset(obj.variants)
+
 class ReviewSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    helpful_count = serializers.SerializerMethodField()
+    user = PublicUserSerializer(source='rating.user', read_only=True)
+    images = ReviewImageSerializer(many=True, read_only=True)
     rating_value = serializers.IntegerField(source='rating.rating', read_only=True)
 
     class Meta:
         model = Review
-        fields = ('id', 'rating', 'rating_value', 'user', 'title', 'comment', 'helpful_count', 'is_approved', 'created_at', 'updated_at')
+        fields = ('id', 'rating', 'rating_value', 'user', 'title', 'comment', 'helpful_count', 'images', 'is_approved', 'created_at', 'updated_at')
         read_only_fields = ('user', 'helpful_count', 'created_at', 'updated_at')
 
-    def get_helpful_count(self, obj):
-        # helpful_votes not in model? Let's check models again.
-        return 0 # Placeholder if not in model
+class ModerationReviewSerializer(ReviewSerializer):
+    product = serializers.IntegerField(source='rating.product_id', read_only=True)
+    product_name = serializers.CharField(source='rating.product.name', read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ('id', 'product', 'product_name', 'rating_value', 'user', 'title', 'comment', 'images', 'created_at')
+
+class ModerationActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=1000)
+
+class ProductReviewSummarySerializer(serializers.ModelSerializer):
+    average_rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ProductReviewSummary
+        fields = (
+            'product', 'average_rating', 'rating_count', 'histogram', 'review_count',
+            'image_review_count', 'top_reviews', 'updated_at',
+        )
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
     rating = serializers.IntegerField(write_only=True) # Accepting rating value (1-5)
@@ -48,13 +75,16 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
             defaults={'rating': rating_value}
         )
         
-        # Create or update the review
+        # Create or update the review; new and edited text waits for moderation.
         review, created = Review.objects.update_or_create(
             rating=rating,
             defaults={
+                'product_id': product_id,
                 'title': validated_data.get('title'),
                 'comment': validated_data.get('comment'),
-                'is_approved': True # Auto-approve for tests
+                'is_approved': False,
+                'moderated_at': None,
+                'moderated_by': None,
             }
         )
         return review
\ No newline at end of file
@@ -0,0 +1,45 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from alcom_project import images
+from products.models import Product
+from .models import ProductReviewSummary, Rating, Review, ReviewImage
+
+
+@receiver(post_save, sender=ReviewImage)
+def process_review_image(sender, instance, created, **kwargs):
+    # update() from the pipeline itself does not send post_save.
+    if instance.image and (created or not instance.variants):
+        images.schedule(ReviewImage, [instance.pk])
+
+
+def _deleting_product(origin):
+    # The summary is deleted along with the product, so do not rebuild it.
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Product
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def refresh_summary_for_rating(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        ProductReviewSummary.objects.refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_summary_for_review(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        product_id = Rating.objects.filter(pk=instance.rating_id).values_list('product_id', flat=True).first()
+        if product_id:
+            ProductReviewSummary.objects.refresh([product_id])
+
+
+@receiver(post_save, sender=ReviewImage)
+@receiver(post_delete, sender=ReviewImage)
+def refresh_summary_for_review_image(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        product_id = Review.objects.filter(pk=instance.review_id).values_list('product_id', flat=True).first()
+        if product_id:
+            ProductReviewSummary.objects.refresh([product_id])
@@ -1,9 +1,14 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+import tempfile
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from products.models import Category, Product, Brand
-from .models import Rating, Review
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .models import ProductReviewSummary, Rating, Review, ReviewImage
 
 User = get_user_model()
 
@@ -60,7 +65,7 @@ class ReviewAPITests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Rating.objects.count(), 1)
-        self.assertEqual(Review.objects.count(), 1)
+        self.assertEqual(Review.objects.get().product, self.product)
 
     def test_list_reviews_for_product(self):
         """Test listing reviews for a specific product"""
@@ -90,3 +95,238 @@ class ReviewAPITests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['title'], 'Awesome')
+
+    def test_list_shows_public_author_and_helpful_count(self):
+        """Test reviews expose only public author fields and real helpful counts"""
+        rating = Rating.objects.create(product=self.product, user=self.user, rating=4)
+        review = Review.objects.create(rating=rating, title='Good', comment='It was okay.', is_approved=True)
+        voter = User.objects.create_user(username='voter', email='voter@example.com', password='testpass123')
+        review.add_helpful_vote(self.user)
+        review.add_helpful_vote(voter)
+
+        response = self.client.get(f'/api/reviews/products/{self.product.id}/reviews/')
+        result = response.data['results'][0]
+        self.assertEqual(result['user'], {'id': self.user.id, 'username': 'reviewapi'})
+        self.assertEqual(result['helpful_count'], 2)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing reviews does not issue queries per review"""
+        def add_review(index):
+            author = User.objects.create_user(
+                username=f'author{index}', email=f'author{index}@example.com', password='testpass123'
+            )
+            rating = Rating.objects.create(product=self.product, user=author, rating=5)
+            review = Review.objects.create(rating=rating, title=f'Review {index}', comment='Text', is_approved=True)
+            review.add_helpful_vote(self.user)
+
+        url = f'/api/reviews/products/{self.product.id}/reviews/'
+        add_review(0)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+        for index in range(1, 5):
+            add_review(index)
+        with CaptureQueriesContext(connection) as several:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(several), len(single))
+
+    def test_helpful_votes_are_idempotent(self):
+        """Test repeated helpful/unhelpful calls only change the count once"""
+        rating = Rating.objects.create(product=self.product, user=self.user, rating=4)
+        review = Review.objects.create(rating=rating, title='Good', comment='Fine', is_approved=True)
+        url = f'/api/reviews/reviews/{review.id}/'
+
+        self.client.post(url + 'helpful/')
+        response = self.client.post(url + 'helpful/')
+        self.assertEqual(response.data['helpful_count'], 1)
+        self.client.post(url + 'unhelpful/')
+        response = self.client.post(url + 'unhelpful/')
+        self.assertEqual(response.data['helpful_count'], 0)
+        self.assertFalse(review.helpful_votes.exists())
+
+    def test_order_by_helpful_count(self):
+        """Test product reviews can be ordered by helpfulness"""
+        voters = [
+            User.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='testpass123')
+            for i in range(2)
+        ]
+        for index, votes in enumerate((0, 2, 1)):
+            author = User.objects.create_user(username=f'writer{index}', email=f'writer{index}@example.com', password='testpass123')
+            rating = Rating.objects.create(product=self.product, user=author, rating=5)
+            review = Review.objects.create(rating=rating, title=f'Votes {votes}', comment='Text', is_approved=True)
+            for voter in voters[:votes]:
+                review.add_helpful_vote(voter)
+
+        response = self.client.get(f'/api/reviews/products/{self.product.id}/reviews/?ordering=-helpful_count')
+        self.assertEqual([r['helpful_count'] for r in response.data['results']], [2, 1, 0])
+
+    def test_sync_helpful_counts(self):
+        """Test counts drifted by direct M2M edits are corrected"""
+        rating = Rating.objects.create(product=self.product, user=self.user, rating=4)
+        review = Review.objects.create(rating=rating, title='Good', comment='Fine')
+        review.helpful_votes.add(self.user)
+
+        self.assertEqual(Review.objects.sync_helpful_counts(), 1)
+        review.refresh_from_db()
+        self.assertEqual(review.helpful_count, 1)
+
+
+class ReviewSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        category = Category.objects.create(name='Test', slug='test')
+        brand = Brand.objects.create(name='SummaryBrand', description='Brand')
+        self.product = Product.objects.create(
+            name='Summary Product', slug='summary-product', base_price=10, category=category, brand=brand
+        )
+        self.url = '/api/products/products/summary-product/review-summary/'
+        self.users = [
+            User.objects.create_user(username=f'summary{i}', email=f'summary{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+
+    def review(self, user, stars, approved=True):
+        rating = Rating.objects.create(product=self.product, user=user, rating=stars)
+        return Review.objects.create(rating=rating, title=f'{stars} stars', comment='Text', is_approved=approved)
+
+    def test_summary_reflects_reviews(self):
+        """Test the summary holds the histogram, counts and top reviews"""
+        first = self.review(self.users[0], 5)
+        self.review(self.users[1], 3)
+        self.review(self.users[2], 1, approved=False)
+        ReviewImage.objects.create(review=first, image=SimpleUploadedFile('a.jpg', b'img'))
+        first.add_helpful_vote(self.users[1])
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rating_count'], 3)
+        self.assertEqual(response.data['average_rating'], 3.0)
+        self.assertEqual(response.data['histogram'], {'1': 1, '2': 0, '3': 1, '4': 0, '5': 1})
+        self.assertEqual(response.data['review_count'], 2)
+        self.assertEqual(response.data['image_review_count'], 1)
+        self.assertEqual([r['id'] for r in response.data['top_reviews']], [first.id, first.id + 1])
+        self.assertEqual(response.data['top_reviews'][0]['helpful_count'], 1)
+
+    def test_summary_is_cached_and_invalidated(self):
+        """Test cached summaries are served without recomputing and dropped on change"""
+        self.review(self.users[0], 4)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/products/products/{self.product.id}/review-summary/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(self.users[1], 2)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['rating_count'], 2)
+
+    def test_numeric_slug_is_not_mistaken_for_an_id(self):
+        """Test a product whose slug is another product's id is found by its slug"""
+        self.review(self.users[0], 4)
+        numeric = Product.objects.create(
+            name='Numeric', slug=str(self.product.id), base_price=10,
+            category=self.product.category, brand=self.product.brand
+        )
+        response = self.client.get(f'/api/products/products/{numeric.slug}/review-summary/')
+        self.assertEqual(response.data['rating_count'], 0)
+        response = self.client.get(f'/api/products/products/{numeric.id}/review-summary/')
+        self.assertEqual(response.data['rating_count'], 0)
+
+    def test_summary_deleted_with_product(self):
+        """Test deleting a product does not rebuild its summary"""
+        self.review(self.users[0], 4)
+        self.product.delete()
+        self.assertFalse(ProductReviewSummary.objects.exists())
+
+
+class ReviewModerationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            username='moderator', email='moderator@example.com', password='testpass123', is_staff=True
+        )
+        category = Category.objects.create(name='Test', slug='test')
+        brand = Brand.objects.create(name='ModerationBrand', description='Brand')
+        self.product = Product.objects.create(
+            name='Moderated Product', slug='moderated-product', base_price=10, category=category, brand=brand
+        )
+        self.reviews = []
+        for index in range(5):
+            author = User.objects.create_user(
+                username=f'pending{index}', email=f'pending{index}@example.com', password='testpass123'
+            )
+            rating = Rating.objects.create(product=self.product, user=author, rating=index + 1)
+            self.reviews.append(Review.objects.create(rating=rating, title=f'Pending {index}', comment='Text'))
+        self.client.force_authenticate(user=self.staff)
+
+    def test_new_reviews_wait_for_moderation(self):
+        """Test reviews created through the API are not auto-approved"""
+        author = User.objects.create_user(username='newauthor', email='newauthor@example.com', password='testpass123')
+        self.client.force_authenticate(user=author)
+        self.client.post(f'/api/reviews/products/{self.product.id}/reviews/', {'rating': 5, 'title': 'New', 'comment': 'Hi'})
+        review = Review.objects.get(title='New')
+        self.assertFalse(review.is_approved)
+        self.assertIsNone(review.moderated_at)
+
+    def test_queue_uses_keyset_pages(self):
+        """Test the queue lists pending reviews oldest first with cursor pages"""
+        response = self.client.get('/api/reviews/moderation/?page_size=3')
+        self.assertEqual([r['title'] for r in response.data['results']], ['Pending 0', 'Pending 1', 'Pending 2'])
+        self.assertIn('cursor=', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['title'] for r in response.data['results']], ['Pending 3', 'Pending 4'])
+        self.assertIsNone(response.data['next'])
+
+    def test_bulk_approve_and_reject(self):
+        """Test bulk moderation updates reviews and the summary incrementally"""
+        ProductReviewSummary.objects.refresh([self.product.id])
+        ids = [review.id for review in self.reviews]
+
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/reviews/moderation/approve/', {'ids': ids[:4]}, format='json')
+        self.assertEqual(response.data['updated'], 4)
+        summary = ProductReviewSummary.objects.get()
+        self.assertEqual(summary.review_count, 4)
+        self.assertEqual(len(summary.top_reviews), 3)
+
+        self.client.post('/api/reviews/moderation/reject/', {'ids': [ids[0], ids[4]]}, format='json')
+        summary.refresh_from_db()
+        self.assertEqual(summary.review_count, 3)
+        self.assertNotIn(ids[0], [item['id'] for item in summary.top_reviews])
+        self.assertFalse(Review.objects.pending_moderation().exists())
+        self.assertEqual(Review.objects.filter(is_approved=True).count(), 3)
+
+        ProductReviewSummary.objects.refresh([self.product.id])
+        rebuilt = ProductReviewSummary.objects.get()
+        self.assertEqual((rebuilt.review_count, rebuilt.top_reviews), (summary.review_count, summary.top_reviews))
+
+    def test_listing_hides_unapproved_reviews_from_other_users(self):
+        """Test rejected and pending reviews are listed only for staff and their author"""
+        self.reviews[0].is_approved = True
+        self.reviews[0].save()
+        self.client.post('/api/reviews/moderation/reject/', {'ids': [self.reviews[1].id]}, format='json')
+        url = f'/api/reviews/products/{self.product.id}/reviews/'
+
+        def titles():
+            return {review['title'] for review in self.client.get(url).data['results']}
+
+        self.assertEqual(len(titles()), 5)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(titles(), {'Pending 0'})
+        self.assertEqual(self.client.get(f'/api/reviews/reviews/{self.reviews[1].id}/').status_code, 404)
+        self.client.force_authenticate(user=self.reviews[1].rating.user)
+        self.assertEqual(titles(), {'Pending 0', 'Pending 1'})
+
+    def test_moderation_requires_staff(self):
+        """Test regular users cannot moderate reviews"""
+        user = User.objects.create_user(username='nomod', email='nomod@example.com', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/reviews/moderation/').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post('/api/reviews/moderation/approve/', {'ids': [self.reviews[0].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReviewViewSet, RatingViewSet
+from .views import ReviewViewSet, RatingViewSet, ReviewModerationViewSet
 
 router = DefaultRouter()
 router.register(r'reviews', ReviewViewSet, basename='reviews')
 router.register(r'ratings', RatingViewSet, basename='ratings')
+router.register(r'moderation', ReviewModerationViewSet, basename='review-moderation')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,28 +1,40 @@
 # reviews/views.py
-from rest_framework import viewsets, permissions, status
+from django.db.models import Q
+from rest_framework import viewsets, permissions, status, filters, mixins
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from .models import Review, Rating
-from .serializers import ReviewSerializer, ReviewCreateSerializer, RatingSerializer
+from .serializers import (
+    ReviewSerializer, ReviewCreateSerializer, RatingSerializer,
+    ModerationReviewSerializer, ModerationActionSerializer
+)
 from .permissions import IsOwnerOrReadOnly
 
 class ReviewViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['helpful_count', 'created_at']
+    ordering = ['-created_at']
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Review.objects.none()
         
-        queryset = Review.objects.all()
-        # For public listing, you might want only approved reviews.
-        # But for tests, we'll return all if requested via product_id.
+        queryset = Review.objects.select_related(
+            'rating__user', 'rating__product'
+        ).prefetch_related('images')
         product_id = self.kwargs.get('product_id')
         if product_id:
-            queryset = queryset.filter(rating__product_id=product_id)
-        
-        # If not staff/owner, maybe filter is_approved? 
-        # For now, let's allow all for tests unless it's a security requirement.
-        return queryset
+            queryset = queryset.filter(product_id=product_id)
+
+        # Reviews awaiting or failing moderation are only shown to staff and to their author.
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        if user.is_authenticated:
+            return queryset.filter(Q(is_approved=True) | Q(rating__user=user))
+        return queryset.filter(is_approved=True)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -33,17 +45,55 @@ class ReviewViewSet(viewsets.ModelViewSet):
         product_id = self.kwargs.get('product_id')
         serializer.save(user=self.request.user, product_id=product_id)
 
-    @action(detail=True, methods=['post'])
+    # Voting is open to any signed-in user, not just the review's author.
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def helpful(self, request, pk=None):
         review = self.get_object()
-        review.helpful_votes.add(request.user)
-        return Response({'status': 'marked as helpful'})
+        review.add_helpful_vote(request.user)
+        review.refresh_from_db(fields=['helpful_count'])
+        return Response({'status': 'marked as helpful', 'helpful_count': review.helpful_count})
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def unhelpful(self, request, pk=None):
         review = self.get_object()
-        review.helpful_votes.remove(request.user)
-        return Response({'status': 'removed helpful vote'})
+        review.remove_helpful_vote(request.user)
+        review.refresh_from_db(fields=['helpful_count'])
+        return Response({'status': 'removed helpful vote', 'helpful_count': review.helpful_count})
+
+class ModerationQueuePagination(CursorPagination):
+    # Keyset pagination: each page continues from the last created_at seen.
+    ordering = ('created_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class ReviewModerationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Staff queue of reviews awaiting moderation, oldest first, with bulk
+    approve/reject of up to 1000 ids per request.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = ModerationReviewSerializer
+    pagination_class = ModerationQueuePagination
+
+    def get_queryset(self):
+        return Review.objects.pending_moderation().select_related(
+            'rating__user', 'rating__product'
+        ).prefetch_related('images')
+
+    def _moderate(self, request, approved):
+        serializer = ModerationActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = Review.objects.moderate(serializer.validated_data['ids'], approved, request.user)
+        return Response({'updated': updated})
+
+    @action(detail=False, methods=['post'])
+    def approve(self, request):
+        return self._moderate(request, True)
+
+    @action(detail=False, methods=['post'])
+    def reject(self, request):
+        return self._moderate(request, False)
 
 class RatingViewSet(viewsets.ModelViewSet):
     queryset = Rating.objects.all()